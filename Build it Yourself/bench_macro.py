@@ -0,0 +1,225 @@
+import sys
+import json
+import time
+import argparse
+from array import array
+
+from macro_engine import (
+    EV_MOVE, EV_KEY_DOWN, EV_KEY_UP, EV_CLICK_DOWN, EV_CLICK_UP, OP_PRESS, OP_MOVE, OP_CLICK,
+    ActionConfig, EventStore, FakeInjector, FakeKeyController, FakeMouseController, MacroEngine, resolve_button,
+)
+
+try:
+    import resource
+except ImportError:     #Windows
+    resource = None
+
+# -----------------------------
+# Helpers
+# -----------------------------
+def parse_size(s: str) -> int:
+    s = s.strip().lower()
+    mult = {"k": 1_000, "m": 1_000_000}.get(s[-1:], 1)
+    return int(float(s[:-1] if mult > 1 else s) * mult)
+
+def percentiles(values, ps=(50, 90, 99)) -> dict:
+    if not values:
+        return {f"p{p}": 0.0 for p in ps} | {"max": 0.0}
+    v = sorted(values)
+    out = {f"p{p}": v[min(len(v) - 1, int(len(v) * p / 100))] for p in ps}
+    out["max"] = v[-1]
+    return out
+
+def peak_rss_mb() -> float:
+    if resource is None:
+        return 0.0
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    #kB on Linux, bytes on macOS
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+def synthetic_macro(n: int, spacing_s: float) -> EventStore:
+    """n events, evenly spaced: mostly moves with a click and a key tap every 100 events.
+    Moves carry their event index in x so the fake backend's log maps back to the schedule."""
+    store = EventStore()
+    kid = store.intern("a")
+    for i in range(n):
+        t = i * spacing_s
+        r = i % 100
+        if r == 97:
+            store.append(EV_KEY_DOWN, t, key_id=kid)
+        elif r == 98:
+            store.append(EV_KEY_UP, t, key_id=kid)
+        elif r == 99:
+            store.append(EV_CLICK_DOWN if i % 200 == 99 else EV_CLICK_UP, t, i, 0, 1)
+        else:
+            store.append(EV_MOVE, t, i, 0)
+    return store
+
+def make_engine(cfg: ActionConfig, per_call: bool) -> MacroEngine:
+    #Batched: the fake injector logs whole batches. Per-call: fake controllers behind
+    #the one-call-per-op injector, i.e. the pynput path.
+    if per_call:
+        return MacroEngine(cfg, FakeKeyController(), FakeMouseController())
+    return MacroEngine(cfg, backend="fake")
+
+def op_logs(engine: MacroEngine):
+    """(key log, mouse log): objects with times/ops arrays (the mouse one also has xs)."""
+    if isinstance(engine.injector, FakeInjector):
+        return engine.injector, engine.injector
+    return engine.kctl, engine.mctl
+
+# -----------------------------
+# Benchmarks
+# -----------------------------
+def bench_action_loop(mode: str, interval_ms: float, seconds: float, per_call: bool = False) -> dict:
+    cfg = ActionConfig(mode=mode, spam_key="a", spam_key_obj="a", click_button=resolve_button("left"),
+                       target_fixed=True, fixed_x=10, fixed_y=10, interval_s=interval_ms / 1000.0)
+    engine = make_engine(cfg, per_call)
+    engine.running_event.set()
+    cpu0, wall0 = time.process_time(), time.perf_counter()
+    max_ticks = max(1, int(seconds * 1000.0 / interval_ms))
+    engine.run_action_loop(max_ticks=max_ticks)
+    wall = time.perf_counter() - wall0
+    cpu = time.process_time() - cpu0
+
+    #One tick = press (key mode) or click (mouse mode); measure tick-to-tick spacing
+    klog, mlog = op_logs(engine)
+    if mode == "key":
+        ticks = [t for t, op in zip(klog.times, klog.ops) if op == OP_PRESS]
+    else:
+        ticks = [t for t, op in zip(mlog.times, mlog.ops) if op == OP_CLICK]
+    target = interval_ms / 1000.0
+    err_ms = [abs((b - a) - target) * 1000.0 for a, b in zip(ticks, ticks[1:])]
+    return {
+        "bench": f"action_{mode}",
+        "interval_ms": interval_ms,
+        "actions": len(ticks),
+        "target_per_s": 1000.0 / interval_ms,
+        "achieved_per_s": len(ticks) / wall if wall > 0 else 0.0,
+        "jitter_ms": percentiles(err_ms),
+        "cpu_pct": 100.0 * cpu / wall if wall > 0 else 0.0,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+def bench_playback(n: int, spacing_us: float, lateness_ms: float, window_ms: float = 1.0, per_call: bool = False) -> dict:
+    spacing = spacing_us / 1_000_000
+    t_build = time.perf_counter()
+    store = synthetic_macro(n, spacing)
+    build_s = time.perf_counter() - t_build
+
+    cfg = ActionConfig(repeat_count=1, lateness_s=lateness_ms / 1000.0, batch_window_s=window_ms / 1000.0)
+    engine = make_engine(cfg, per_call)
+    engine.record_events = store
+    t_compile = time.perf_counter()
+    engine.get_plan()
+    compile_s = time.perf_counter() - t_compile
+
+    cpu0, wall0 = time.process_time(), time.perf_counter()
+    engine.playback_worker()
+    wall = time.perf_counter() - wall0
+    cpu = time.process_time() - cpu0
+
+    #Lateness of each injected move relative to the first one (x = event index;
+    #clicks also position the cursor, those land on indexes ending in 99 and are skipped)
+    klog, mlog = op_logs(engine)
+    times, ops, xs = mlog.times, mlog.ops, mlog.xs
+    late_ms = array("d")
+    first_t = first_i = None
+    for t, op, x in zip(times, ops, xs):
+        if op != OP_MOVE or x % 100 >= 97:
+            continue
+        if first_t is None:
+            first_t, first_i = t, x
+        late_ms.append(((t - first_t) - (x - first_i) * spacing) * 1000.0)
+    moves_played = len(late_ms)
+    moves_total = sum(1 for i in range(n) if i % 100 < 97)
+    drift_ms = late_ms[-1] if late_ms else 0.0
+    injected = len(times) + (len(klog.times) if klog is not mlog else 0)
+    #Per-call injection has no batches to count
+    batches = len(engine.injector.batch_sizes) if isinstance(engine.injector, FakeInjector) else 0
+    return {
+        "bench": "playback",
+        "events": n,
+        "spacing_us": spacing_us,
+        "window_ms": window_ms,
+        "batches": batches,
+        "ops_per_batch": injected / batches if batches else 0.0,
+        "build_s": build_s,
+        "compile_s": compile_s,
+        "wall_s": wall,
+        "scheduled_s": (n - 1) * spacing,
+        "injected_calls": injected,
+        "injected_per_s": injected / wall if wall > 0 else 0.0,
+        "moves_coalesced": moves_total - moves_played,
+        "lateness_ms": percentiles(list(late_ms)),
+        "end_drift_ms": drift_ms,
+        "cpu_pct": 100.0 * cpu / wall if wall > 0 else 0.0,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+# -----------------------------
+# Report
+# -----------------------------
+def _flat(result: dict) -> dict:
+    out = {}
+    for k, v in result.items():
+        if isinstance(v, dict):
+            for k2, v2 in v.items():
+                out[f"{k}.{k2}"] = v2
+        else:
+            out[k] = v
+    return out
+
+def _key(result: dict) -> str:
+    return f"{result['bench']}:{result.get('events', result.get('interval_ms'))}"
+
+def print_report(results: list, baseline: list = None):
+    base = {_key(r): _flat(r) for r in baseline or ()}
+    for r in results:
+        flat = _flat(r)
+        old = base.get(_key(r), {})
+        print(f"== {_key(r)}")
+        for k, v in flat.items():
+            if k == "bench":
+                continue
+            line = f"  {k:<22} {v:>14.3f}" if isinstance(v, float) else f"  {k:<22} {v:>14}"
+            ov = old.get(k)
+            if isinstance(v, (int, float)) and isinstance(ov, (int, float)) and ov:
+                line += f"   ({100.0 * (v - ov) / abs(ov):+.1f}% vs baseline)"
+            print(line)
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(description="MacroTool timing benchmarks on the fake input backend.")
+    p.add_argument("--sizes", default="1k,100k", help="playback macro sizes, e.g. 1k,100k,10m")
+    p.add_argument("--spacing-us", type=float, default=100.0, help="gap between synthetic events (µs)")
+    p.add_argument("--lateness-ms", type=float, default=20.0, help="playback lateness budget")
+    p.add_argument("--batch-window-ms", type=float, default=1.0, help="playback batching window")
+    p.add_argument("--per-call", action="store_true", help="inject one controller call per op (the pynput path)")
+    p.add_argument("--interval-ms", type=float, default=5.0, help="action loop interval")
+    p.add_argument("--action-seconds", type=float, default=2.0, help="how long to run each action loop")
+    p.add_argument("--skip-action", action="store_true", help="only run playback benchmarks")
+    p.add_argument("--json", help="write results to this file")
+    p.add_argument("--baseline", help="compare against a previous --json output")
+    args = p.parse_args(argv)
+
+    results = []
+    if not args.skip_action:
+        for mode in ("key", "mouse"):
+            results.append(bench_action_loop(mode, args.interval_ms, args.action_seconds, args.per_call))
+    for size in args.sizes.split(","):
+        if size.strip():
+            results.append(bench_playback(parse_size(size), args.spacing_us, args.lateness_ms,
+                                          args.batch_window_ms, args.per_call))
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(results, baseline)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
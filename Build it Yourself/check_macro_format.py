@@ -0,0 +1,205 @@
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+from macro_engine import (
+    EV_MOVE, EV_KEY_DOWN, EV_KEY_UP, EV_CLICK_DOWN, EV_CLICK_UP, EV_SCROLL, MACRO_HEADER,
+    EventStore, MappedMacro, MacroLogWriter,
+    save_macro_file, load_macro_file, convert_macro_file, read_unfinished_log, recover_macro_log, is_unfinished_log,
+)
+
+#Round trips, streamed logs, torn writes and empty files for the v1 JSON / v2 binary
+#formats. No display or pynput needed; exits non-zero if any check fails.
+
+# -----------------------------
+# Helpers
+# -----------------------------
+KEYS = ("a", "space", "ctrl_l", "ä", "f12", "<65437>")
+
+def sample_macro(n: int) -> EventStore:
+    """n events covering every record type, key names outside ASCII, negative position and
+    scroll deltas, and whole-microsecond times (what v2 stores)."""
+    store = EventStore()
+    t_us = 0
+    for i in range(n):
+        t_us += (i * 7919) % 5000
+        t = t_us / 1_000_000
+        r = i % 11
+        x, y = (i * 37) % 3000 - 500, (i * 53) % 2000 - 300
+        if r in (3, 4):
+            store.append(EV_KEY_DOWN if r == 3 else EV_KEY_UP, t, key_id=store.intern(KEYS[i % len(KEYS)]))
+        elif r in (6, 7):
+            store.append(EV_CLICK_DOWN if r == 6 else EV_CLICK_UP, t, x, y, i % 2 + 1)
+        elif r == 9:
+            store.append(EV_SCROLL, t, x, y, 0, (i % 5) - 2, -((i % 7) - 3))
+        else:
+            store.append(EV_MOVE, t, x, y)
+    return store
+
+def same_rows(a, b) -> bool:
+    ra, rb = list(a), list(b)
+    if len(ra) != len(rb):
+        return False
+    for x, y in zip(ra, rb):
+        if x[0] != y[0] or abs(x[1] - y[1]) > 1e-9 or x[2:] != y[2:]:
+            return False
+    return True
+
+def load_rows(path) -> tuple:
+    events, meta = load_macro_file(path)
+    try:
+        return list(events), meta
+    finally:
+        if isinstance(events, MappedMacro):
+            events.close()
+
+def file_bytes(path) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+def streamed_log(path, store: EventStore, finish: bool):
+    """Write store through MacroLogWriter; with finish=False the log is left unfinished (as after a crash)."""
+    w = MacroLogWriter(path, flush_interval=0.01)
+    for row in store:
+        key = row[7]
+        w.append(*row[:7], key_id=w.intern(key) if key else 0)
+    if finish:
+        w.close()
+        return
+    deadline = time.monotonic() + 5.0
+    while len(w._pending) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.05)
+    return w
+
+# -----------------------------
+# Checks
+# -----------------------------
+def check_round_trip(tmp, n: int):
+    src = sample_macro(n)
+    v1, v2, back = (os.path.join(tmp, name) for name in ("rt.json", "rt.mtm", "rt_back.json"))
+    save_macro_file(v1, src, {"repeat_suggestion": 3})
+    convert_macro_file(v1, v2)
+    convert_macro_file(v2, back)
+    rows2, meta2 = load_rows(v2)
+    rows1, meta1 = load_rows(back)
+    assert same_rows(src, rows2), "v1 → v2 changed the events"
+    assert same_rows(src, rows1), "v1 → v2 → v1 changed the events"
+    assert meta2.get("repeat_suggestion") == 3 and meta1.get("repeat_suggestion") == 3, "meta lost"
+    mac = MappedMacro(v2)
+    try:
+        assert len(mac) == n and abs(mac.duration() - src.duration()) < 1e-9, "v2 header count/duration"
+    finally:
+        mac.close()
+
+def check_streamed_log(tmp, n: int):
+    src = sample_macro(n)
+    path = os.path.join(tmp, "stream.mtm")
+    streamed_log(path, src, finish=True)
+    assert not is_unfinished_log(path), "finished log still flagged as streaming"
+    rows, _ = load_rows(path)
+    assert same_rows(src, rows), "streamed log changed the events"
+
+def check_live_log(tmp, n: int):
+    #Reading a log that is still being written must not change it
+    src = sample_macro(n)
+    path = os.path.join(tmp, "live.mtm")
+    w = streamed_log(path, src, finish=False)
+    try:
+        before = file_bytes(path)
+        assert is_unfinished_log(path), "live log not flagged as streaming"
+        rows, meta = load_rows(path)
+        assert meta.get("unfinished"), "live log not reported as unfinished"
+        assert same_rows(src, rows), "live log read back different events"
+        assert file_bytes(path) == before, "loading a live log modified it"
+    finally:
+        w.close()
+    rows, _ = load_rows(path)
+    assert same_rows(src, rows), "log closed after a live read lost events"
+
+def check_truncated_records(tmp, n: int):
+    #A crash can cut the log anywhere; every cut must decode to a prefix of what was written
+    src = sample_macro(n)
+    full = os.path.join(tmp, "crash_full.mtm")
+    w = streamed_log(full, src, finish=False)
+    data = file_bytes(full)
+    w.close()
+    want = list(src)
+    cut = os.path.join(tmp, "crash.mtm")
+    last = -1
+    for size in range(MACRO_HEADER.size, len(data) + 1):
+        with open(cut, "wb") as f:
+            f.write(data[:size])
+        store, _ = read_unfinished_log(cut)
+        got = list(store)
+        assert len(got) >= last, f"cut at {size} bytes decoded fewer events than a shorter cut"
+        assert same_rows(want[:len(got)], got), f"cut at {size} bytes decoded wrong events"
+        assert file_bytes(cut) == data[:size], f"reading a cut at {size} bytes modified it"
+        last = len(got)
+    assert last == n, "untruncated log did not decode every event"
+    #Recovery of a torn tail keeps exactly the complete records
+    size = len(data) - 2
+    with open(cut, "wb") as f:
+        f.write(data[:size])
+    expected, _ = read_unfinished_log(cut)
+    recovered = recover_macro_log(cut)
+    assert recovered == len(expected), "recover_macro_log count"
+    assert not is_unfinished_log(cut), "recovered log still flagged as streaming"
+    rows, meta = load_rows(cut)
+    assert meta.get("recovered") and same_rows(expected, rows), "recovered log"
+
+def check_empty(tmp, n: int):
+    path = os.path.join(tmp, "empty.mtm")
+    streamed_log(path, EventStore(), finish=True)
+    rows, _ = load_rows(path)
+    assert rows == [], "empty finished log"
+    w = streamed_log(path, EventStore(), finish=False)
+    try:
+        shutil.copy(path, path + ".copy")
+    finally:
+        w.close()
+    store, _ = read_unfinished_log(path + ".copy")
+    assert len(store) == 0, "empty unfinished log"
+    assert recover_macro_log(path + ".copy") == 0 and load_rows(path + ".copy")[0] == [], "empty log recovery"
+    v1 = os.path.join(tmp, "empty.json")
+    with open(v1, "w", encoding="utf-8") as f:
+        f.write('{"version": 1, "events": []}')
+    try:
+        load_macro_file(v1)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("empty v1 file loaded without an error")
+
+CHECKS = (check_round_trip, check_streamed_log, check_live_log, check_truncated_records, check_empty)
+
+# -----------------------------
+# Entry point
+# -----------------------------
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(description="Check the macro file formats (round trips, logs, torn writes).")
+    p.add_argument("--events", type=int, default=2000, help="events per sample macro (the cut check is ~bytes²)")
+    args = p.parse_args(argv)
+
+    failed = 0
+    tmp = tempfile.mkdtemp(prefix="macro_format_")
+    try:
+        for check in CHECKS:
+            name = check.__name__[len("check_"):]
+            n = min(args.events, 300) if check is check_truncated_records else args.events
+            try:
+                check(tmp, n)
+                print(f"  ok    {name}")
+            except Exception as e:
+                failed += 1
+                print(f"  FAIL  {name}: {e!r}")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    print(f"{len(CHECKS) - failed}/{len(CHECKS)} checks passed")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
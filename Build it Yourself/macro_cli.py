@@ -0,0 +1,392 @@
+import re
+import sys
+import time
+import argparse
+import threading
+from dataclasses import replace
+
+from macro_engine import (
+    BACKENDS, CATCHUP_POLICIES, MACRO_EXT, SCRIPT_EXT, WAIT_BACKENDS, NUDGE_DISTS, NUDGE_PATHS, KEY_REPEAT_MODES, MacroEngine, MappedMacro, load_script,
+    configure_waiter, get_waiter,
+    config_from_settings, format_telemetry, job_from_dict, load_settings_file, load_macro_file, convert_macro_file,
+    is_unfinished_log, recover_macro_log,
+    library_from_settings, resolve_button, str_to_key,
+)
+
+# -----------------------------
+# Commands
+# -----------------------------
+def _base_config():
+    #Start from the GUI's saved settings so hotkeys/tolerances match
+    return config_from_settings(load_settings_file())
+
+def _run_for(engine: MacroEngine, duration: float):
+    """Stop the action loop after duration seconds (0 = until Ctrl+C)."""
+    if duration > 0:
+        timer = threading.Timer(duration, engine.running_event.clear)
+        timer.daemon = True
+        timer.start()
+
+def _export_stats(engine: MacroEngine, args):
+    """Print the run's telemetry and write it to --stats (JSON for .json, else CSV)."""
+    if not args.stats:
+        return
+    print(format_telemetry(engine.telemetry.snapshot()))
+    engine.telemetry.export(args.stats)
+    print(f"Stats → {args.stats}")
+
+def cmd_play(args) -> int:
+    engine = MacroEngine(on_status=print, backend=args.backend)
+    if args.library or args.file.lower().endswith(SCRIPT_EXT):
+        #Scripts may call library macros by name
+        engine.library = library_from_settings(load_settings_file())
+    if args.library:
+        meta = engine.load_from_library(args.file)
+    else:
+        meta = engine.load_macro(args.file)
+    repeat = args.repeat
+    if repeat is None:
+        rep = meta.get("repeat_suggestion")
+        repeat = rep if isinstance(rep, int) and rep > 0 else 1
+    cfg = replace(_base_config(), repeat_count=max(0, repeat))
+    if args.lateness_ms is not None:
+        cfg = replace(cfg, lateness_s=max(0, args.lateness_ms) / 1000.0)
+    if args.batch_window_ms is not None:
+        cfg = replace(cfg, batch_window_s=max(0.0, args.batch_window_ms) / 1000.0)
+    if args.speed is not None:
+        if args.speed <= 0:
+            raise ValueError("--speed must be > 0")
+        cfg = replace(cfg, playback_speed=args.speed)
+    if args.trim_gaps_ms is not None:
+        cfg = replace(cfg, trim_gaps_s=max(0.0, args.trim_gaps_ms) / 1000.0)
+    if args.max_speed:
+        cfg = replace(cfg, max_speed=True)
+    if args.key_repeat is not None:
+        cfg = replace(cfg, key_repeat=args.key_repeat)
+    if args.key_repeat_hz is not None:
+        cfg = replace(cfg, key_repeat="custom", key_repeat_hz=max(1.0, args.key_repeat_hz))
+    if args.key_repeat_delay_ms is not None:
+        cfg = replace(cfg, key_repeat_delay_s=max(0.0, args.key_repeat_delay_ms) / 1000.0)
+    engine.config = cfg
+    engine.playback_stop.clear()
+    try:
+        engine.playback_worker()
+    except KeyboardInterrupt:
+        engine.stop_playback()
+    finally:
+        engine.shutdown()
+    _export_stats(engine, args)
+    return 0
+
+def _parse_track(spec: str):
+    """'MACRO' or 'MACRO@OFFSET_MS[xSPEED][rREPEATS]' → (macro, offset_s, speed, repeats)."""
+    what, sep, opts = spec.rpartition("@")
+    if not sep:
+        return spec, 0.0, 1.0, 1
+    m = re.fullmatch(r"(\d+(?:\.\d*)?)(?:x(\d+(?:\.\d*)?))?(?:r(\d+))?", opts)
+    if m is None:
+        raise ValueError(f"track options must look like @OFFSET_MS[xSPEED][rREPEATS] (got {spec!r})")
+    offset_ms, speed, repeats = m.groups()
+    return what, float(offset_ms) / 1000.0, float(speed or 1.0), int(repeats or 1)
+
+def cmd_mix(args) -> int:
+    engine = MacroEngine(on_status=print, backend=args.backend)
+    if args.library:
+        engine.library = library_from_settings(load_settings_file())
+    engine.config = _base_config()
+    tracks = []
+    for spec in args.macros:
+        macro, offset_s, speed, repeats = _parse_track(spec)
+        track = engine.make_track(macro, offset_s, speed, repeats, from_library=args.library)
+        print(f"  {track.name}: {len(track.plan)} events from {offset_s * 1000:g} ms, "
+              f"×{speed:g}, {repeats or '∞'} time(s)")
+        tracks.append(track)
+    engine.playback_stop.clear()
+    try:
+        engine.tracks_worker(tracks)
+    except KeyboardInterrupt:
+        engine.stop_playback()
+    finally:
+        engine.shutdown()
+    _export_stats(engine, args)
+    return 0
+
+def cmd_record(args) -> int:
+    engine = MacroEngine(on_status=print, backend=args.backend)
+    engine.config = _base_config()
+    #Straight-to-disk for v2 output, so long sessions don't grow in memory
+    stream = args.out.lower().endswith(MACRO_EXT)
+    engine.start_recording(log_path=args.out if stream else None)
+    print("Recording… press Ctrl+C to stop" + (f" (or wait {args.duration:g} s)" if args.duration else ""))
+    try:
+        if args.duration > 0:
+            time.sleep(args.duration)
+        else:
+            while True:
+                time.sleep(1.0)
+    except KeyboardInterrupt:
+        pass
+    print(engine.stop_recording())
+    if not stream:
+        print(engine.save_macro(args.out))
+    engine.shutdown()
+    _export_stats(engine, args)
+    return 0
+
+def _run_action(engine: MacroEngine, args) -> int:
+    engine.running_event.set()
+    _run_for(engine, args.duration)
+    try:
+        engine.run_action_loop(max_ticks=max(0, args.count))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        engine.running_event.clear()
+    _export_stats(engine, args)
+    return 0
+
+def cmd_click(args) -> int:
+    engine = MacroEngine(on_status=print, backend=args.backend)
+    cfg = replace(_base_config(), mode="mouse",
+                  interval_s=max(0.0005, args.interval_ms / 1000.0),
+                  click_button=resolve_button(args.button),
+                  click_count=2 if args.double else 1,
+                  catchup_policy=args.policy, nudge_on=False)
+    if args.pos:
+        try:
+            x, y = (int(v) for v in args.pos.split(","))
+        except ValueError:
+            print(f"--pos must look like X,Y (got {args.pos!r})", file=sys.stderr)
+            return 2
+        cfg = replace(cfg, target_fixed=True, fixed_x=x, fixed_y=y)
+    else:
+        cfg = replace(cfg, target_fixed=False)
+    if args.nudge:
+        try:
+            dx, dy = (int(v) for v in args.nudge.split(","))
+        except ValueError:
+            print(f"--nudge must look like DX,DY (got {args.nudge!r})", file=sys.stderr)
+            return 2
+        cfg = replace(cfg, nudge_on=True, nudge_x=dx, nudge_y=dy, nudge_random=not args.fixed_nudge,
+                      nudge_dist=args.nudge_dist, nudge_path=args.path,
+                      nudge_move_s=max(0.0, args.move_ms / 1000.0), nudge_rate_hz=args.path_hz)
+    engine.config = cfg
+    return _run_action(engine, args)
+
+def cmd_key(args) -> int:
+    engine = MacroEngine(on_status=print, backend=args.backend)
+    key = args.key.strip().lower()
+    engine.config = replace(_base_config(), mode="key", spam_key=key, spam_key_obj=str_to_key(key),
+                            interval_s=max(0.0005, args.interval_ms / 1000.0), catchup_policy=args.policy)
+    return _run_action(engine, args)
+
+def _parse_job(kind: str, spec: str) -> dict:
+    """'X,Y@MS' or '@MS' (cursor) for clicks, 'KEY@MS' for keys."""
+    what, sep, ms = spec.rpartition("@")
+    if not sep:
+        raise ValueError(f"--{kind} must end in @INTERVAL_MS (got {spec!r})")
+    if kind == "key":
+        return {"mode": "key", "key": what, "interval_ms": float(ms)}
+    d = {"mode": "mouse", "interval_ms": float(ms)}
+    if what:
+        try:
+            x, y = (int(v) for v in what.split(","))
+        except ValueError:
+            raise ValueError(f"--click position must look like X,Y (got {what!r})")
+        d.update(target="fixed", x=x, y=y)
+    return d
+
+def cmd_jobs(args) -> int:
+    engine = MacroEngine(on_status=print, backend=args.backend)
+    settings = load_settings_file()
+    engine.config = replace(config_from_settings(settings), catchup_policy=args.policy)
+    specs = [_parse_job("click", c) for c in args.click] + [_parse_job("key", k) for k in args.key]
+    if not specs:
+        #No jobs on the command line: run the ones saved from the GUI
+        specs = settings.get("jobs") or []
+    if not specs:
+        print("No jobs (use --click/--key, or add some in the GUI)", file=sys.stderr)
+        return 2
+    engine.jobs.set_jobs([job_from_dict(d) for d in specs])
+    for _, job in engine.jobs.jobs():
+        print(f"  {job.describe()} every {job.interval_s * 1000:g} ms")
+    engine.start_jobs()
+    try:
+        if args.duration > 0:
+            time.sleep(args.duration)
+        else:
+            while True:
+                time.sleep(1.0)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        engine.shutdown()
+    print(f"Status: IDLE ({engine.telemetry.injected} actions, missed {engine.telemetry.missed})")
+    _export_stats(engine, args)
+    return 0
+
+def cmd_library(args) -> int:
+    lib = library_from_settings(load_settings_file())
+    for src in args.add:
+        entry = lib.add(src)
+        print(f"Added {src} as {entry['name']!r}")
+    for name in args.remove:
+        lib.remove(name)
+        print(f"Removed {name!r}")
+    entries = lib.entries()
+    print(f"{lib.root}: {len(entries)} macro(s)")
+    for e in entries:
+        print(f"  {e['name']:<24} {e['events']:>9} events {e['duration']:>9.2f} s  {e['file']}")
+    return 0
+
+def cmd_timer(args) -> int:
+    waiter = get_waiter()
+    for _ in range(max(1, args.rounds)):
+        waiter.calibrate(args.request_ms / 1000.0)
+        print(waiter.describe())
+    return 0
+
+def cmd_convert(args) -> int:
+    convert_macro_file(args.src, args.dst)
+    print(f"Converted {args.src} → {args.dst}")
+    return 0
+
+def cmd_info(args) -> int:
+    if args.file.lower().endswith(SCRIPT_EXT):
+        program = load_script(args.file, library_from_settings(load_settings_file()))
+        print(f"{args.file}: script, {len(program)} instructions")
+        return 0
+    events, meta = load_macro_file(args.file)
+    try:
+        kind = "v2 binary" if isinstance(events, MappedMacro) else "unfinished v2 log" if meta.get("unfinished") else "v1 JSON"
+        print(f"{args.file}: {kind}, {len(events)} events, {events.duration():.3f} s")
+        if meta:
+            print(f"meta: {meta}")
+    finally:
+        if isinstance(events, MappedMacro):
+            events.close()
+    return 0
+
+def cmd_recover(args) -> int:
+    if not is_unfinished_log(args.file):
+        print(f"{args.file}: not an unfinished recording log, nothing to do")
+        return 0
+    n = recover_macro_log(args.file)
+    print(f"Recovered {n} events into {args.file}")
+    return 0
+
+# -----------------------------
+# Entry point
+# -----------------------------
+STATS_HELP = "write run telemetry here when done (.json, otherwise CSV)"
+
+def build_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(prog="macro_tool", description="Headless MacroTool (run without arguments for the GUI).")
+    p.add_argument("--backend", choices=BACKENDS, default="auto",
+                   help="input backend: 'native' batches via SendInput/XTest, 'pynput' one call per event, "
+                        "'auto' = native when available; 'fake' only logs calls (dry run, no display needed)")
+    p.add_argument("--timer", choices=WAIT_BACKENDS, default=None,
+                   help="wait primitive: 'nanosleep' (Linux), 'waitable' (Windows), 'sleep'; default: saved setting or auto")
+    p.add_argument("--spin-us", type=float, default=None,
+                   help="spin-wait this long before each deadline (default: saved setting, -1 = calibrate)")
+    sub = p.add_subparsers(dest="command", required=True)
+
+    sp = sub.add_parser("play", help=f"play a macro file or script ({SCRIPT_EXT})")
+    sp.add_argument("file")
+    sp.add_argument("--library", action="store_true", help="FILE is the name of a macro in the library")
+    sp.add_argument("--repeat", type=int, default=None, help="repeat count, 0 = infinite (default: file's suggestion)")
+    sp.add_argument("--lateness-ms", type=int, default=None, help="coalesce moves that fall further behind than this")
+    sp.add_argument("--batch-window-ms", type=float, default=None, help="send events due within this window as one batch")
+    sp.add_argument("--speed", type=float, default=None, help="timeline multiplier, e.g. 2 = twice as fast")
+    sp.add_argument("--trim-gaps-ms", type=float, default=None, help="shorten idle gaps longer than this (0 = keep)")
+    sp.add_argument("--max-speed", action="store_true",
+                    help="drop all gaps except the short ones between dependent events (press→release, move→click)")
+    sp.add_argument("--key-repeat", choices=KEY_REPEAT_MODES, default=None,
+                    help="auto-repeat held keys: 'os' = system delay/rate, 'custom' = the values below (default: saved setting)")
+    sp.add_argument("--key-repeat-hz", type=float, default=None, help="custom repeats per second (implies --key-repeat custom)")
+    sp.add_argument("--key-repeat-delay-ms", type=float, default=None, help="custom delay before the first repeat")
+    sp.add_argument("--stats", help=STATS_HELP)
+    sp.set_defaults(func=cmd_play)
+
+    sp = sub.add_parser("mix", help="play several macros at once on one timeline")
+    sp.add_argument("macros", nargs="+",
+                    help="MACRO or MACRO@OFFSET_MS[xSPEED][rREPEATS] (r0 = forever), e.g. walk.mtm jump.mtm@1500x2r3")
+    sp.add_argument("--library", action="store_true", help="the macros are names in the library")
+    sp.add_argument("--stats", help=STATS_HELP)
+    sp.set_defaults(func=cmd_mix)
+
+    sp = sub.add_parser("record", help="record keyboard/mouse input to a file")
+    sp.add_argument("--out", required=True, help=f"output file ({MACRO_EXT} streams to disk, .json = v1)")
+    sp.add_argument("--duration", type=float, default=0.0, help="seconds to record (default: until Ctrl+C)")
+    sp.add_argument("--stats", help=STATS_HELP)
+    sp.set_defaults(func=cmd_record)
+
+    for name, func, helptext in (("click", cmd_click, "auto-click"), ("key", cmd_key, "spam a key")):
+        sp = sub.add_parser(name, help=helptext)
+        if name == "key":
+            sp.add_argument("key", help="key name, e.g. r, space, enter, f7")
+        else:
+            sp.add_argument("--pos", help="fixed X,Y target (default: current cursor)")
+            sp.add_argument("--button", choices=["left", "right"], default="left")
+            sp.add_argument("--double", action="store_true", help="double-click")
+            sp.add_argument("--nudge", help="nudge each click by up to DX,DY pixels (default: no nudge)")
+            sp.add_argument("--fixed-nudge", action="store_true", help="always nudge by exactly DX,DY")
+            sp.add_argument("--nudge-dist", choices=NUDGE_DISTS, default="uniform", help="random offset distribution")
+            sp.add_argument("--path", choices=NUDGE_PATHS, default="jump", help="how the cursor moves to the nudged point")
+            sp.add_argument("--move-ms", type=float, default=30.0, help="duration of a minjerk/bezier move")
+            sp.add_argument("--path-hz", type=float, default=500.0, help="path samples sent per second")
+        sp.add_argument("--interval-ms", type=float, default=50.0)
+        sp.add_argument("--count", type=int, default=0, help="stop after N actions (default: no limit)")
+        sp.add_argument("--duration", type=float, default=0.0, help="stop after N seconds (default: until Ctrl+C)")
+        sp.add_argument("--policy", choices=CATCHUP_POLICIES, default="skip", help="catch-up policy when behind")
+        sp.add_argument("--stats", help=STATS_HELP)
+        sp.set_defaults(func=func)
+
+    sp = sub.add_parser("jobs", help="run several click/key jobs together (default: the GUI's saved jobs)")
+    sp.add_argument("--click", action="append", default=[], metavar="X,Y@MS",
+                    help="click X,Y every MS milliseconds ('@MS' = at the cursor); repeatable")
+    sp.add_argument("--key", action="append", default=[], metavar="KEY@MS", help="press KEY every MS milliseconds; repeatable")
+    sp.add_argument("--duration", type=float, default=0.0, help="stop after N seconds (default: until Ctrl+C)")
+    sp.add_argument("--policy", choices=CATCHUP_POLICIES, default="skip", help="catch-up policy when behind")
+    sp.add_argument("--stats", help=STATS_HELP)
+    sp.set_defaults(func=cmd_jobs)
+
+    sp = sub.add_parser("library", help="list the macro library (and add/remove macros)")
+    sp.add_argument("--add", action="append", default=[], metavar="FILE", help="copy a macro file into the library; repeatable")
+    sp.add_argument("--remove", action="append", default=[], metavar="NAME", help="delete a library macro; repeatable")
+    sp.set_defaults(func=cmd_library)
+
+    sp = sub.add_parser("timer", help="calibrate the wait primitive and show its accuracy")
+    sp.add_argument("--request-ms", type=float, default=1.0, help="sleep length to measure")
+    sp.add_argument("--rounds", type=int, default=3)
+    sp.set_defaults(func=cmd_timer)
+
+    sp = sub.add_parser("convert", help="convert between v1 JSON and v2 binary macros")
+    sp.add_argument("src")
+    sp.add_argument("dst", help=f"destination ({MACRO_EXT} = v2, .json = v1)")
+    sp.set_defaults(func=cmd_convert)
+
+    sp = sub.add_parser("info", help="show a macro file's event count and duration")
+    sp.add_argument("file")
+    sp.set_defaults(func=cmd_info)
+
+    sp = sub.add_parser("recover", help="finalize a recording log left unfinished by a crash (edits the file in place)")
+    sp.add_argument("file")
+    sp.set_defaults(func=cmd_recover)
+    return p
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        settings = load_settings_file()
+        timer = args.timer or settings.get("wait_backend", "auto")
+        spin_us = args.spin_us if args.spin_us is not None else float(settings.get("spin_us", -1))
+        if timer != "auto" or spin_us >= 0:
+            configure_waiter(timer, spin_us)
+        return args.func(args)
+    except (RuntimeError, ValueError, OSError) as e:
+        print(f"[ERROR] {e}", file=sys.stderr)
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
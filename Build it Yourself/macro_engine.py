@@ -0,0 +1,4154 @@
+import threading
+import time
+import sys
+import json
+import random
+import os
+import csv
+import heapq
+import hashlib
+import shutil
+import itertools
+import mmap
+import multiprocessing
+import struct
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import deque, OrderedDict
+from itertools import compress
+from pathlib import Path
+from datetime import datetime
+from dataclasses import dataclass
+
+#pynput is optional here so macro files can be inspected/converted on machines
+#without it (or without a display); anything that injects input needs it.
+try:
+    from pynput import keyboard, mouse
+    from pynput.keyboard import Key, Controller as KeyController, KeyCode
+    from pynput.mouse import Button, Controller as MouseController
+    PYNPUT_ERROR = None
+except Exception as e:
+    keyboard = mouse = Key = KeyController = KeyCode = Button = MouseController = None
+    PYNPUT_ERROR = e
+
+APP_NAME = "MacroTool"
+SETTINGS_FILE = "settings.json"
+
+# -----------------------------
+# Helpers
+# -----------------------------
+def clamp(v, lo, hi):
+    return max(lo, min(hi, v))
+
+def require_pynput():
+    if PYNPUT_ERROR is not None:
+        raise RuntimeError(f"The 'pynput' package is required (pip install pynput): {PYNPUT_ERROR}")
+
+def key_to_str(k) -> str:
+    if isinstance(k, KeyCode):
+        return (k.char or "").lower()
+    if isinstance(k, Key):
+        return str(k).split(".")[-1].lower()
+    return str(k).lower()
+
+SPECIAL_KEY_MAP = {} if Key is None else {
+    "enter": Key.enter, "return": Key.enter,
+    "space": Key.space, "tab": Key.tab,
+    "esc": Key.esc, "escape": Key.esc,
+    "backspace": Key.backspace, "delete": Key.delete,
+    "home": Key.home, "end": Key.end,
+    "page_up": Key.page_up, "pageup": Key.page_up,
+    "page_down": Key.page_down, "pagedown": Key.page_down,
+    "up": Key.up, "down": Key.down, "left": Key.left, "right": Key.right,
+    "shift": Key.shift, "ctrl": Key.ctrl, "alt": Key.alt, "cmd": Key.cmd, "win": Key.cmd,
+    "caps_lock": Key.caps_lock,
+    "f1": Key.f1, "f2": Key.f2, "f3": Key.f3, "f4": Key.f4, "f5": Key.f5, "f6": Key.f6,
+    "f7": Key.f7, "f8": Key.f8, "f9": Key.f9, "f10": Key.f10, "f11": Key.f11, "f12": Key.f12
+}
+
+def str_to_key(s: str):
+    s = (s or "").strip().lower()
+    if s in SPECIAL_KEY_MAP:
+        return SPECIAL_KEY_MAP[s]
+    if KeyCode is None:
+        return None
+    if len(s) == 1:
+        return KeyCode.from_char(s)
+    if s.startswith("f") and s[1:].isdigit():
+        idx = int(s[1:])
+        try:
+            return getattr(Key, f"f{idx}")
+        except AttributeError:
+            pass
+    return None
+
+def get_config_dir() -> Path:
+    if os.name == "nt":
+        base = os.environ.get("APPDATA")
+        if base:
+            return Path(base) / APP_NAME
+        return Path.home() / f"AppData/Roaming/{APP_NAME}"
+    if sys.platform == "darwin":
+        return Path.home() / "Library/Application Support" / APP_NAME
+    return Path.home() / ".config" / APP_NAME
+
+def get_settings_path() -> Path:
+    cfg_dir = get_config_dir()
+    cfg_dir.mkdir(parents=True, exist_ok=True)
+    return cfg_dir / SETTINGS_FILE
+
+# -----------------------------
+# Scheduling
+# -----------------------------
+#Catch-up policies when a tick is missed (action took longer than the interval)
+#  skip  = drop the missed ticks, stay on the original phase
+#  burst = fire the missed ticks back-to-back until caught up (capped)
+#  shift = restart the timeline from "now" (phase moves)
+CATCHUP_POLICIES = ("skip", "burst", "shift")
+
+#OS sleeps overshoot by anything from ~50 µs (Linux timer slack) to 1-15 ms (older Windows
+#timers). PreciseWaiter OS-sleeps until spin_s before the deadline, then spins on the
+#clock for the rest; spin_s comes from calibrate() (the backend's measured overshoot)
+#unless set explicitly. Backends ("auto" = first available):
+#  nanosleep  Linux clock_nanosleep with the thread's timer slack lowered to 1 ns
+#  waitable   Windows high-resolution waitable timer (Windows 10 1803+)
+#  sleep      time.sleep (every platform)
+WAIT_BACKENDS = ("auto", "nanosleep", "waitable", "sleep")
+SPIN_MAX_S = 0.004      #calibrated spin budgets are capped here (it's busy CPU time)
+
+def _nanosleep_backend():
+    if not sys.platform.startswith("linux"):
+        return None
+    import ctypes
+    import ctypes.util
+
+    class Timespec(ctypes.Structure):
+        _fields_ = [("tv_sec", ctypes.c_long), ("tv_nsec", ctypes.c_long)]
+
+    libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+    nanosleep = libc.clock_nanosleep
+    nanosleep.argtypes = (ctypes.c_int, ctypes.c_int, ctypes.POINTER(Timespec), ctypes.c_void_p)
+    prctl = libc.prctl
+    CLOCK_MONOTONIC, PR_SET_TIMERSLACK = 1, 29
+    local = threading.local()
+
+    def sleep(seconds: float):
+        if not getattr(local, "slack_set", False):
+            #Timer slack is per thread; the default 50 µs shows up as lateness
+            prctl(PR_SET_TIMERSLACK, 1, 0, 0, 0)
+            local.slack_set = True
+        ns = int(seconds * 1e9)
+        ts = Timespec(ns // 1_000_000_000, ns % 1_000_000_000)
+        nanosleep(CLOCK_MONOTONIC, 0, ctypes.byref(ts), None)
+
+    return sleep
+
+def _waitable_backend():
+    if os.name != "nt":
+        return None
+    import ctypes
+    k32 = ctypes.WinDLL("kernel32", use_last_error=True)
+    k32.CreateWaitableTimerExW.restype = ctypes.c_void_p
+    k32.CreateWaitableTimerExW.argtypes = (ctypes.c_void_p, ctypes.c_wchar_p, ctypes.c_ulong, ctypes.c_ulong)
+    k32.SetWaitableTimer.argtypes = (ctypes.c_void_p, ctypes.POINTER(ctypes.c_longlong), ctypes.c_long,
+                                     ctypes.c_void_p, ctypes.c_void_p, ctypes.c_int)
+    k32.WaitForSingleObject.argtypes = (ctypes.c_void_p, ctypes.c_ulong)
+    CREATE_WAITABLE_TIMER_HIGH_RESOLUTION, TIMER_ALL_ACCESS, INFINITE = 0x2, 0x1F0003, 0xFFFFFFFF
+
+    def create():
+        return k32.CreateWaitableTimerExW(None, None, CREATE_WAITABLE_TIMER_HIGH_RESOLUTION, TIMER_ALL_ACCESS)
+
+    probe = create()
+    if not probe:
+        return None     #flag unsupported before Windows 10 1803
+    k32.CloseHandle(probe)
+    local = threading.local()
+
+    def sleep(seconds: float):
+        #One timer per thread; a shared one would be re-armed under another waiter
+        h = getattr(local, "timer", None)
+        if h is None:
+            h = local.timer = create()
+        due = ctypes.c_longlong(-max(1, int(seconds * 10_000_000)))     #relative, 100 ns units
+        k32.SetWaitableTimer(h, ctypes.byref(due), 0, None, None, 0)
+        k32.WaitForSingleObject(h, INFINITE)
+
+    return sleep
+
+_WAIT_FACTORIES = {"nanosleep": _nanosleep_backend, "waitable": _waitable_backend,
+                   "sleep": lambda: time.sleep}
+
+class PreciseWaiter:
+    """OS sleep for the bulk of a wait, spin on the clock for the last spin_s."""
+
+    def __init__(self, backend: str = "auto", spin_s: float = None, clock=time.perf_counter):
+        self.clock = clock
+        self.backend, self._sleep = self._pick(backend)
+        self.spin_s = 0.0 if spin_s is None else max(0.0, spin_s)
+        self.auto_spin = spin_s is None
+        self.accuracy = {}
+
+    @staticmethod
+    def _pick(backend: str):
+        names = [n for n in WAIT_BACKENDS[1:]] if backend == "auto" else [backend]
+        for name in names:
+            factory = _WAIT_FACTORIES.get(name)
+            try:
+                fn = factory() if factory is not None else None
+            except Exception:
+                fn = None
+            if fn is not None:
+                return name, fn
+        if backend != "auto":
+            print(f"[WARN] Wait backend {backend!r} unavailable here; using time.sleep")
+        return "sleep", time.sleep
+
+    def calibrate(self, request_s: float = 0.001, samples: int = 40, max_s: float = 0.25) -> dict:
+        """Measure OS-sleep overshoot (sets spin_s when auto) and the resulting wait error."""
+        clock = self.clock
+        over = []
+        t_end = clock() + max_s
+        while len(over) < samples and clock() < t_end:
+            t0 = clock()
+            self._sleep(request_s)
+            over.append(clock() - t0 - request_s)
+        over.sort()
+        p = lambda v, q: v[min(len(v) - 1, int(len(v) * q))] if v else 0.0
+        if self.auto_spin:
+            #Cover nearly every overshoot, plus a little for the wake-up itself
+            self.spin_s = min(SPIN_MAX_S, max(0.0, p(over, 0.9) * 1.25 + 0.00005))
+        err = []
+        t_end = clock() + max_s / 2
+        while len(err) < samples // 2 and clock() < t_end:
+            deadline = clock() + request_s
+            self.wait_until(deadline)
+            err.append(clock() - deadline)
+        err.sort()
+        self.accuracy = {
+            "backend": self.backend,
+            "spin_us": self.spin_s * 1e6,
+            "sleep_overshoot_p50_us": p(over, 0.5) * 1e6,
+            "sleep_overshoot_p99_us": p(over, 0.99) * 1e6,
+            "wait_error_p50_us": p(err, 0.5) * 1e6,
+            "wait_error_p99_us": p(err, 0.99) * 1e6,
+        }
+        return self.accuracy
+
+    def describe(self) -> str:
+        a = self.accuracy
+        if not a:
+            return f"timer {self.backend}, spin {self.spin_s * 1e6:.0f} µs (not calibrated)"
+        return (f"timer {a['backend']}, spin {a['spin_us']:.0f} µs, sleep overshoot p99 "
+                f"{a['sleep_overshoot_p99_us']:.0f} µs, wait error p50 {a['wait_error_p50_us']:.0f} / "
+                f"p99 {a['wait_error_p99_us']:.0f} µs")
+
+    def wait_until(self, deadline: float, should_stop=None, slice_s: float = 0.05) -> bool:
+        """Block until clock() >= deadline. Returns False if should_stop() became true first."""
+        clock = self.clock
+        spin = self.spin_s
+        sleep = self._sleep
+        while True:
+            remaining = deadline - clock()
+            if remaining <= 0:
+                return True
+            if should_stop is not None and should_stop():
+                return False
+            if remaining > spin:
+                #Sleep in slices so a stop request is noticed even with long intervals
+                sleep(min(remaining - spin, slice_s))
+                continue
+            #Last stretch: spin (sleep(0) would pay the timer slack again). Other threads
+            #still get the GIL at the interpreter's switch interval.
+            while clock() < deadline:
+                pass
+            return True
+
+_waiter = None
+_waiter_lock = threading.Lock()
+
+def get_waiter() -> PreciseWaiter:
+    """The process-wide waiter used by sleep_until; calibrated on first use."""
+    global _waiter
+    if _waiter is None:
+        with _waiter_lock:
+            if _waiter is None:
+                w = PreciseWaiter()
+                w.calibrate()
+                _waiter = w
+    return _waiter
+
+def configure_waiter(backend: str = "auto", spin_us: float = -1) -> PreciseWaiter:
+    """Replace the process-wide waiter (spin_us < 0 = calibrate the spin budget)."""
+    global _waiter
+    w = PreciseWaiter(backend if backend in WAIT_BACKENDS else "auto", None if spin_us < 0 else spin_us / 1e6)
+    w.calibrate()
+    with _waiter_lock:
+        _waiter = w
+    return w
+
+def sleep_until(deadline: float, should_stop=None, clock=time.perf_counter, slice_s: float = 0.05) -> bool:
+    """Sleep until clock() >= deadline. Returns False if should_stop() became true first."""
+    if clock is time.perf_counter:
+        return get_waiter().wait_until(deadline, should_stop, slice_s)
+    while True:
+        remaining = deadline - clock()
+        if remaining <= 0:
+            return True
+        if should_stop is not None and should_stop():
+            return False
+        time.sleep(min(remaining, slice_s))
+
+def advance_deadline(deadline: float, interval: float, now: float, policy: str = "skip", max_burst: int = 10):
+    """Next deadline after one that just fired, per catch-up policy. Returns (deadline, ticks missed)."""
+    deadline += interval
+    if now <= deadline:
+        return deadline, 0
+    behind = int((now - deadline) / interval)
+    if policy == "burst":
+        #Fire the backlog immediately, but never more than max_burst ticks
+        if behind >= max_burst:
+            return deadline + (behind - max_burst + 1) * interval, behind - max_burst + 1
+        return deadline, 0
+    if policy == "shift":
+        return now + interval, 0
+    return deadline + (behind + 1) * interval, behind + 1
+
+class DeadlineScheduler:
+    """Fixed-rate ticker on absolute deadlines (monotonic clock), so action cost doesn't add to the period."""
+
+    def __init__(self, interval_s: float, policy: str = "skip", max_burst: int = 10, clock=time.perf_counter):
+        self.interval_s = interval_s
+        self.policy = policy if policy in CATCHUP_POLICIES else "skip"
+        self.max_burst = max(1, int(max_burst))
+        self.clock = clock
+        self.started = clock()
+        self.next_deadline = self.started
+        self.ticks = 0
+        self.missed = 0
+        self.late = 0.0         #how far past its deadline the last tick fired (s)
+
+    def wait(self, should_stop=None) -> bool:
+        """Block until the next tick is due. Returns False if stopped while waiting."""
+        if not sleep_until(self.next_deadline, should_stop, self.clock):
+            return False
+        self.late = self.clock() - self.next_deadline
+        self.ticks += 1
+        self._advance()
+        return True
+
+    def _advance(self):
+        self.next_deadline, missed = advance_deadline(self.next_deadline, self.interval_s, self.clock(),
+                                                      self.policy, self.max_burst)
+        self.missed += missed
+
+    def set_interval(self, interval_s: float):
+        if interval_s == self.interval_s:
+            return
+        #Re-phase from the last tick so the new rate applies immediately
+        self.next_deadline += interval_s - self.interval_s
+        self.interval_s = interval_s
+
+    @property
+    def target_rate(self) -> float:
+        return 1.0 / self.interval_s if self.interval_s > 0 else 0.0
+
+    def achieved_rate(self) -> float:
+        elapsed = self.clock() - self.started
+        return self.ticks / elapsed if elapsed > 0 else 0.0
+
+    def rate_report(self) -> str:
+        target = self.target_rate
+        achieved = self.achieved_rate()
+        pct = (100.0 * achieved / target) if target > 0 else 0.0
+        return f"{achieved:.1f}/{target:.1f} per s ({pct:.0f}%), missed {self.missed}"
+
+# -----------------------------
+# Telemetry
+# -----------------------------
+#Lateness histogram bucket edges (s); bucket i counts late <= edge i, the last one everything above
+LATE_BUCKETS_S = (0.0001, 0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.5)
+LATE_BUCKET_LABELS = tuple(f"<={b * 1000:g}ms" for b in LATE_BUCKETS_S) + (f">{LATE_BUCKETS_S[-1] * 1000:g}ms",)
+
+class Telemetry:
+    """Counters for one run (action loop, playback or recording).
+
+    Updated by the run's worker thread with plain adds (no locks, a few hundred ns
+    per event); snapshot() may be called from any thread, e.g. a UI timer, and
+    progress() is cheap enough to poll every frame."""
+
+    def __init__(self, kind: str = "idle", target_rate: float = 0.0, clock=time.perf_counter):
+        self.kind = kind
+        self.clock = clock
+        self.started = clock()
+        self.ended = None
+        self.target_rate = target_rate
+        #Injection
+        self.injected = 0
+        self.dropped = 0
+        self.missed = 0
+        self.call_s = 0.0
+        self.call_max_s = 0.0
+        #Per event type: histogram counts, lateness sum and max
+        self.late_hist = {}
+        self.late_sum = {}
+        self.late_max = {}
+        #Listener callbacks (recording) and the hook → recorder hand-off
+        self.callbacks = 0
+        self.callback_s = 0.0
+        self.callback_max_s = 0.0
+        self.hook_dropped = 0
+        self.hook_backlog_max = 0
+        self.hook_lag_max_s = 0.0
+        self.key_repeats = 0        #auto-repeat key_downs folded into their hold
+        #Progress: steps handled so far (playback counts coalesced moves, recording stored
+        #events; 0 = use injected) and, when known, the run's size and length
+        self.done = 0
+        self.total = 0
+        self.per_repeat = 0
+        self.repeats = 0
+        self.duration_s = 0.0
+
+    def record(self, etype: str, late_s: float, call_s: float):
+        """One injected event: how late it fired and how long the controller call took."""
+        self.injected += 1
+        self.call_s += call_s
+        if call_s > self.call_max_s:
+            self.call_max_s = call_s
+        hist = self.late_hist.get(etype)
+        if hist is None:
+            self.late_sum[etype] = 0.0
+            self.late_max[etype] = 0.0
+            hist = self.late_hist[etype] = [0] * len(LATE_BUCKET_LABELS)
+        hist[bisect_left(LATE_BUCKETS_S, late_s)] += 1
+        self.late_sum[etype] += late_s
+        if late_s > self.late_max[etype]:
+            self.late_max[etype] = late_s
+
+    def record_callback(self, dur_s: float):
+        self.callbacks += 1
+        self.callback_s += dur_s
+        if dur_s > self.callback_max_s:
+            self.callback_max_s = dur_s
+
+    def finish(self):
+        self.ended = self.clock()
+
+    def set_extent(self, per_repeat: int, span_s: float, repeats: int):
+        """Size of a playback run: steps and seconds per repeat, repeats (0 = forever)."""
+        self.per_repeat = per_repeat
+        self.repeats = repeats
+        self.total = per_repeat * repeats
+        self.duration_s = span_s * repeats
+
+    def progress(self) -> dict:
+        """Where the run is: steps done (of total, 0 = open-ended), current repeat, average rate
+        and time left (None when unknown)."""
+        ended = self.ended
+        elapsed = (ended or self.clock()) - self.started
+        done = self.done or self.injected
+        per = self.per_repeat
+        repeat = done // per + 1 if per else 0
+        if self.repeats and repeat > self.repeats:
+            repeat = self.repeats
+        left = None
+        if self.duration_s > 0:
+            left = max(0.0, self.duration_s - elapsed) if ended is None else 0.0
+        return {
+            "kind": self.kind,
+            "running": ended is None,
+            "done": done,
+            "total": self.total,
+            "repeat": repeat,
+            "repeats": self.repeats,
+            "rate": done / elapsed if elapsed > 0 else 0.0,
+            "elapsed_s": elapsed,
+            "remaining_s": left,
+        }
+
+    def snapshot(self) -> dict:
+        """Plain-dict copy of the counters (ms for durations), safe to JSON-encode."""
+        elapsed = (self.ended or self.clock()) - self.started
+        rate = self.injected / elapsed if elapsed > 0 else 0.0
+        lateness = {}
+        for etype, hist in list(self.late_hist.items()):
+            hist = list(hist)
+            n = sum(hist)
+            lateness[etype] = {
+                "count": n,
+                "mean_ms": 1000.0 * self.late_sum.get(etype, 0.0) / n if n else 0.0,
+                "p50_ms": _hist_percentile_ms(hist, 0.50, self.late_max.get(etype, 0.0)),
+                "p99_ms": _hist_percentile_ms(hist, 0.99, self.late_max.get(etype, 0.0)),
+                "max_ms": 1000.0 * self.late_max.get(etype, 0.0),
+                "hist": dict(zip(LATE_BUCKET_LABELS, hist)),
+            }
+        return {
+            "kind": self.kind,
+            "running": self.ended is None,
+            "elapsed_s": elapsed,
+            "injected": self.injected,
+            "achieved_rate": rate,
+            "target_rate": self.target_rate,
+            "missed": self.missed,
+            "dropped": self.dropped,
+            "call_ms_total": 1000.0 * self.call_s,
+            "call_ms_mean": 1000.0 * self.call_s / self.injected if self.injected else 0.0,
+            "call_ms_max": 1000.0 * self.call_max_s,
+            "callbacks": self.callbacks,
+            "callback_ms_mean": 1000.0 * self.callback_s / self.callbacks if self.callbacks else 0.0,
+            "callback_ms_max": 1000.0 * self.callback_max_s,
+            "hook_dropped": self.hook_dropped,
+            "hook_backlog_max": self.hook_backlog_max,
+            "hook_lag_ms_max": 1000.0 * self.hook_lag_max_s,
+            "key_repeats": self.key_repeats,
+            "progress": self.progress(),
+            "lateness": lateness,
+            "timer": dict(_waiter.accuracy) if _waiter is not None else {},
+        }
+
+    def export(self, path):
+        export_snapshot(self.snapshot(), path)
+
+def export_snapshot(snap: dict, path):
+    """Write a telemetry snapshot to path: JSON for .json, otherwise CSV (metric,value rows)."""
+    snap = dict(snap, exported_at=datetime.now().isoformat(timespec="seconds"))
+    if str(path).lower().endswith(".json"):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(snap, f, indent=2)
+        return
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["metric", "value"])
+        for key, value in _flatten(snap):
+            w.writerow([key, value])
+
+def _hist_percentile_ms(hist: list, q: float, max_s: float) -> float:
+    #Upper edge of the bucket holding the q-th sample, capped at the observed max
+    n = sum(hist)
+    if not n:
+        return 0.0
+    seen = 0
+    for i, c in enumerate(hist):
+        seen += c
+        if seen >= q * n:
+            return 1000.0 * (min(LATE_BUCKETS_S[i], max_s) if i < len(LATE_BUCKETS_S) else max_s)
+    return 1000.0 * max_s
+
+def _flatten(d: dict, prefix: str = ""):
+    for k, v in d.items():
+        if isinstance(v, dict):
+            yield from _flatten(v, f"{prefix}{k}.")
+        else:
+            yield f"{prefix}{k}", v
+
+def format_telemetry(snap: dict) -> str:
+    """A few human-readable lines for a status panel or console."""
+    if snap["kind"] == "idle":
+        return "No runs yet"
+    state = "running" if snap["running"] else "finished"
+    lines = [f"{snap['kind']} ({state}, {snap['elapsed_s']:.1f} s)"]
+    if snap["kind"] == "record":
+        lines.append(f"callbacks {snap['callbacks']}  mean {snap['callback_ms_mean']:.3f} ms  max {snap['callback_ms_max']:.2f} ms")
+        lines.append(f"dropped {snap['hook_dropped']}  backlog max {snap['hook_backlog_max']}  hand-off lag max {snap['hook_lag_ms_max']:.1f} ms")
+        lines.append(f"key repeats folded {snap.get('key_repeats', 0)}")
+        return "\n".join(lines)
+    rate = f"{snap['achieved_rate']:.1f}/s"
+    if snap["target_rate"]:
+        rate += f" of {snap['target_rate']:.1f}/s"
+    lines.append(f"injected {snap['injected']}  {rate}  missed {snap['missed']}  coalesced {snap['dropped']}")
+    lines.append(f"in calls {snap['call_ms_total']:.0f} ms  mean {snap['call_ms_mean']:.3f} ms  max {snap['call_ms_max']:.2f} ms")
+    for etype, st in sorted(snap["lateness"].items()):
+        lines.append(f"late {etype:<8} p50 {st['p50_ms']:.2f}  p99 {st['p99_ms']:.2f}  max {st['max_ms']:.2f} ms")
+    timer = snap.get("timer")
+    if timer:
+        lines.append(f"timer {timer['backend']}  spin {timer['spin_us']:.0f} µs  wait error p50 "
+                     f"{timer['wait_error_p50_us']:.0f} / p99 {timer['wait_error_p99_us']:.0f} µs")
+    return "\n".join(lines)
+
+def format_progress(p: dict) -> str:
+    """One line for a progress label, from Telemetry.progress()."""
+    if p["kind"] == "idle":
+        return ""
+    done = f"{p['done']}/{p['total']}" if p["total"] else str(p["done"])
+    parts = [f"{p['kind']}: {done} events"]
+    if p["repeat"] and p["repeats"] != 1:
+        parts.append(f"repeat {p['repeat']}/{p['repeats'] or '∞'}")
+    parts.append(f"{p['rate']:.0f}/s")
+    if p["running"] and p["remaining_s"] is not None:
+        parts.append(f"{p['remaining_s']:.1f} s left")
+    elif not p["running"]:
+        parts.append(f"done in {p['elapsed_s']:.1f} s")
+    return "  ".join(parts)
+
+# -----------------------------
+# Event Store
+# -----------------------------
+#Compact type codes for recorded events (v1 JSON uses the names on the right)
+EV_KEY_DOWN, EV_KEY_UP, EV_MOVE, EV_CLICK_DOWN, EV_CLICK_UP, EV_SCROLL = 1, 2, 3, 4, 5, 6
+EV_NAMES = {EV_KEY_DOWN: "key_down", EV_KEY_UP: "key_up", EV_MOVE: "move",
+            EV_CLICK_DOWN: "click", EV_CLICK_UP: "click", EV_SCROLL: "scroll"}
+BUTTON_NAMES = ("", "left", "right")
+BUTTON_CODES = {"left": 1, "right": 2}
+
+class EventStore:
+    """Columnar recording: one typed array per field instead of one dict per event (~30 bytes/event)."""
+
+    __slots__ = ("types", "times", "xs", "ys", "buttons", "dxs", "dys", "key_ids", "keys", "_key_index", "_lock")
+
+    def __init__(self):
+        self.types = array("B")
+        self.times = array("d")
+        self.xs = array("i")
+        self.ys = array("i")
+        self.buttons = array("B")
+        self.dxs = array("i")
+        self.dys = array("i")
+        self.key_ids = array("H")
+        #Interned key names; id 0 means "no key"
+        self.keys = [""]
+        self._key_index = {"": 0}
+        #Keyboard and mouse listeners append from different threads; keep the columns aligned
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.types)
+
+    def intern(self, name: str) -> int:
+        kid = self._key_index.get(name)
+        if kid is None:
+            with self._lock:
+                kid = self._key_index.get(name)
+                if kid is None:
+                    kid = len(self.keys)
+                    self.keys.append(name)
+                    self._key_index[name] = kid
+        return kid
+
+    def append(self, code: int, t: float, x: int = 0, y: int = 0, button: int = 0, dx: int = 0, dy: int = 0, key_id: int = 0):
+        with self._lock:
+            self.types.append(code)
+            self.times.append(t)
+            self.xs.append(x)
+            self.ys.append(y)
+            self.buttons.append(button)
+            self.dxs.append(dx)
+            self.dys.append(dy)
+            self.key_ids.append(key_id)
+
+    def clear(self):
+        with self._lock:
+            for col in (self.types, self.times, self.xs, self.ys, self.buttons, self.dxs, self.dys, self.key_ids):
+                del col[:]
+
+    def __iter__(self):
+        """Yield (code, t, x, y, button, dx, dy, key_name) rows."""
+        keys = self.keys
+        for row in zip(self.types, self.times, self.xs, self.ys, self.buttons, self.dxs, self.dys, self.key_ids):
+            yield row[:7] + (keys[row[7]],)
+
+    def duration(self) -> float:
+        return (self.times[-1] - self.times[0]) if self.times else 0.0
+
+    def select(self, mask) -> "EventStore":
+        """New store with only the rows where mask is truthy (with a copy of the key table)."""
+        out = EventStore()
+        for name in ("types", "times", "xs", "ys", "buttons", "dxs", "dys", "key_ids"):
+            col = getattr(self, name)
+            setattr(out, name, array(col.typecode, compress(col, mask)))
+        out.keys = list(self.keys)
+        out._key_index = dict(self._key_index)
+        return out
+
+    def nbytes(self) -> int:
+        return sum(col.itemsize * len(col) for col in
+                   (self.types, self.times, self.xs, self.ys, self.buttons, self.dxs, self.dys, self.key_ids))
+
+    #v1 JSON conversion
+    def to_v1(self) -> list:
+        return rows_to_v1(self)
+
+    @classmethod
+    def from_rows(cls, rows, keys=None) -> "EventStore":
+        store = cls()
+        for k in keys or ():
+            store.intern(k)
+        for code, t, x, y, button, dx, dy, key in rows:
+            store.append(code, t, x, y, button, dx, dy, store.intern(key) if key else 0)
+        return store
+
+    @classmethod
+    def from_v1(cls, events: list) -> "EventStore":
+        store = cls()
+        for e in events:
+            typ = e.get("type")
+            t = float(e.get("t", 0.0))
+            x, y = int(e.get("x", 0)), int(e.get("y", 0))
+            if typ == "move":
+                store.append(EV_MOVE, t, x, y)
+            elif typ == "click":
+                code = EV_CLICK_DOWN if e.get("pressed", False) else EV_CLICK_UP
+                store.append(code, t, x, y, BUTTON_CODES.get(e.get("button"), 2))
+            elif typ == "scroll":
+                store.append(EV_SCROLL, t, x, y, 0, int(e.get("dx", 0)), int(e.get("dy", 0)))
+            elif typ in ("key_down", "key_up"):
+                code = EV_KEY_DOWN if typ == "key_down" else EV_KEY_UP
+                store.append(code, t, key_id=store.intern(str(e.get("key", ""))))
+        return store
+
+# -----------------------------
+# Hook Hand-off
+# -----------------------------
+#OS input hooks must return fast (Windows silently unhooks slow low-level hooks), so
+#the listener callbacks only push raw fields into a HookRing; a HookRecorder thread
+#does key naming, filtering and storage.
+class HookRing:
+    """Preallocated single-producer/single-consumer ring of raw hook events.
+
+    One ring per listener thread. The producer fills a slot and then advances head;
+    the consumer reads up to head and advances tail. A full ring drops the event and
+    counts it rather than blocking the hook."""
+
+    __slots__ = ("mask", "clock", "codes", "times", "xs", "ys", "dxs", "dys", "objs",
+                 "head", "tail", "dropped", "cb_count", "cb_total", "cb_max")
+
+    def __init__(self, capacity: int = 1 << 16, clock=time.perf_counter):
+        cap = 1 << max(4, (capacity - 1).bit_length())
+        self.mask = cap - 1
+        self.clock = clock
+        self.codes = array("B", bytes(cap))
+        self.times = array("d", bytes(8 * cap))
+        self.xs = array("d", bytes(8 * cap))
+        self.ys = array("d", bytes(8 * cap))
+        self.dxs = array("d", bytes(8 * cap))
+        self.dys = array("d", bytes(8 * cap))
+        self.objs = [None] * cap        #raw pynput key / button
+        self.head = 0
+        self.tail = 0
+        self.dropped = 0
+        #Hook callback latency (start of callback → event published)
+        self.cb_count = 0
+        self.cb_total = 0.0
+        self.cb_max = 0.0
+
+    def __len__(self):
+        return self.head - self.tail
+
+    def push(self, code: int, t: float, x=0, y=0, obj=None, dx=0, dy=0) -> bool:
+        """Producer side; t is the clock() reading taken on entry to the hook."""
+        h = self.head
+        if h - self.tail > self.mask:
+            self.dropped += 1
+            return False
+        i = h & self.mask
+        self.codes[i] = code
+        self.times[i] = t
+        self.xs[i] = x
+        self.ys[i] = y
+        self.dxs[i] = dx
+        self.dys[i] = dy
+        self.objs[i] = obj
+        self.head = h + 1
+        d = self.clock() - t
+        self.cb_count += 1
+        self.cb_total += d
+        if d > self.cb_max:
+            self.cb_max = d
+        return True
+
+    def take(self) -> list:
+        """Consumer side: every published event as (t, code, x, y, obj, dx, dy), oldest first."""
+        tail, head, mask = self.tail, self.head, self.mask
+        out = []
+        codes, times, xs, ys, dxs, dys, objs = self.codes, self.times, self.xs, self.ys, self.dxs, self.dys, self.objs
+        for n in range(tail, head):
+            i = n & mask
+            out.append((times[i], codes[i], xs[i], ys[i], objs[i], dxs[i], dys[i]))
+            objs[i] = None
+        self.tail = head
+        return out
+
+class HookRecorder:
+    """Consumer thread: drains the keyboard and mouse rings in time order into rec
+    (an EventStore or MacroLogWriter), reporting drops and hand-off lag to telemetry.
+
+    OS auto-repeat (key_downs for a key that is already down) is dropped here, so a held
+    key is stored as one press/release span; playback can regenerate the repeats.
+
+    hotkeys ({action: hotkey string}) are matched with the same HotkeyDispatcher the global
+    listener uses: a keystroke that fires a binding is dropped along with its release and the
+    chord's modifier presses. Modifier presses are held back until the next key decides which
+    way they go; a plain key that only shares a hotkey's main key is recorded as usual."""
+
+    def __init__(self, rec, start_time: float, hotkeys: dict = None, telemetry: Telemetry = None,
+                 capacity: int = 1 << 16, poll_s: float = 0.002, clock=time.perf_counter):
+        self.rec = rec
+        self.start_time = start_time
+        self.hotkeys = HotkeyDispatcher()
+        self.hotkeys.set_bindings(hotkeys or {})
+        self.telemetry = telemetry or Telemetry("record")
+        self.poll_s = poll_s
+        self.clock = clock
+        self.keyboard = HookRing(capacity, clock)
+        self.mouse = HookRing(capacity, clock)
+        self.stored = 0
+        self._held = set()
+        self._pending = []      #(t, key) modifier presses not yet known to be part of a hotkey
+        self._swallowed = {}    #key -> is modifier, for dropped presses whose release is still due
+        self._last_t = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+
+    @property
+    def dropped(self) -> int:
+        return self.keyboard.dropped + self.mouse.dropped
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        """Stop after a final drain (call once the hooks are stopped)."""
+        self._stop.set()
+        self._thread.join()
+        self.drain()
+        if self._pending:
+            self.stored += self._flush_pending()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            if not self.drain():
+                time.sleep(self.poll_s)
+
+    def drain(self) -> int:
+        kb, ms = self.keyboard, self.mouse
+        backlog = len(kb) + len(ms)
+        a, b = kb.take(), ms.take()
+        oldest = min(a[0][0] if a else float("inf"), b[0][0] if b else float("inf"))
+        events = heapq.merge(a, b, key=_event_time) if a and b else (a or b)
+        rec, start, held, pending, swallowed = self.rec, self.start_time, self._held, self._pending, self._swallowed
+        disp = self.hotkeys
+        tel = self.telemetry
+        n = 0
+        for t, code, x, y, obj, dx, dy in events:
+            t -= start
+            if code == EV_KEY_DOWN:
+                ks = key_to_str(obj)
+                if ks in held or ks in swallowed:
+                    tel.key_repeats += 1
+                    continue
+                action = disp.on_press(obj)
+                if MODIFIER_BITS.get(disp.name(obj)):
+                    held.add(ks)
+                    pending.append((t, ks))
+                    continue
+                if action is not None:
+                    #Fired a hotkey: drop it, its release, and the chord's buffered modifiers
+                    for _, mk in pending:
+                        held.discard(mk)
+                        swallowed[mk] = True
+                    pending.clear()
+                    swallowed[ks] = False
+                    continue
+                n += self._flush_pending(t)
+                held.add(ks)
+            elif code == EV_KEY_UP:
+                ks = key_to_str(obj)
+                disp.on_release(obj)
+                if swallowed.pop(ks, None) is not None:
+                    continue
+                if pending:
+                    n += self._flush_pending(t)
+                held.discard(ks)
+            elif code == EV_MOVE:
+                #Moves don't depend on modifier state, so they don't flush held-back presses
+                rec.append(code, max(t, self._last_t), int(x), int(y))
+                self._last_t = max(t, self._last_t)
+                n += 1
+                continue
+            elif pending or swallowed:
+                n += self._flush_pending(t)
+            t = self._last_t = max(t, self._last_t)
+            if code == EV_KEY_DOWN or code == EV_KEY_UP:
+                rec.append(code, t, key_id=rec.intern(ks))
+            elif code == EV_SCROLL:
+                rec.append(code, t, int(x), int(y), 0, int(dx), int(dy))
+            else:
+                btn = BUTTON_CODES.get(_button_name(obj), 2)
+                rec.append(code, t, int(x), int(y), btn)
+            n += 1
+        self.stored += n
+        tel.done = self.stored
+        #Telemetry: hook latency from the rings (each written by one thread only), plus hand-off stats
+        tel.callbacks = kb.cb_count + ms.cb_count
+        tel.callback_s = kb.cb_total + ms.cb_total
+        tel.callback_max_s = max(kb.cb_max, ms.cb_max)
+        tel.hook_dropped = kb.dropped + ms.dropped
+        if backlog > tel.hook_backlog_max:
+            tel.hook_backlog_max = backlog
+        if n:
+            lag = self.clock() - oldest
+            if lag > tel.hook_lag_max_s:
+                tel.hook_lag_max_s = lag
+        return n
+
+    def _flush_pending(self, t: float = 0.0) -> int:
+        """Record held-back modifier presses (and any still held after a hotkey) before event t."""
+        rec, n = self.rec, 0
+        #A modifier kept down after a hotkey fired now belongs to a recorded chord again
+        for ks, is_mod in list(self._swallowed.items()):
+            if is_mod:
+                del self._swallowed[ks]
+                self._held.add(ks)
+                self._pending.append((t, ks))
+        for pt, ks in self._pending:
+            pt = self._last_t = max(pt, self._last_t)
+            rec.append(EV_KEY_DOWN, pt, key_id=rec.intern(ks))
+            n += 1
+        self._pending.clear()
+        return n
+
+def _event_time(ev):
+    return ev[0]
+
+# -----------------------------
+# Path Simplification
+# -----------------------------
+def _rdp_window(xs, ys, ts, eps2: float) -> list:
+    """Iterative RDP over one window of (x, y, scaled t) columns; returns the interior indices to keep."""
+    kept = []
+    stack = [(0, len(xs) - 1)]
+    while stack:
+        a, b = stack.pop()
+        if b - a < 2:
+            continue
+        ax, ay, at = xs[a], ys[a], ts[a]
+        vx, vy, vt = xs[b] - ax, ys[b] - ay, ts[b] - at
+        vv = (vx * vx + vy * vy + vt * vt) or 1.0
+        best, best_d = -1, eps2
+        m = a
+        for px, py, pt in zip(xs[a + 1:b], ys[a + 1:b], ts[a + 1:b]):
+            m += 1
+            px -= ax
+            py -= ay
+            pt -= at
+            u = (px * vx + py * vy + pt * vt) / vv
+            if u < 0.0:
+                u = 0.0
+            elif u > 1.0:
+                u = 1.0
+            px -= u * vx
+            py -= u * vy
+            pt -= u * vt
+            d = px * px + py * py + pt * pt
+            if d > best_d:
+                best, best_d = m, d
+        if best >= 0:
+            kept.append(best)
+            stack.append((a, best))
+            stack.append((best, b))
+    return kept
+
+def simplify_mouse_paths(store: EventStore, px_tol: float = 2.0, ms_tol: float = 10.0, max_gap_ms: float = 50.0):
+    """Ramer–Douglas–Peucker over each run of consecutive 'move' events in (t, x, y).
+
+    Time is scaled so that ms_tol milliseconds count as px_tol pixels. The first and last
+    move of every run are always kept, so the position right before a click, scroll or key
+    event is exact. Runs are cut into windows of at most max_gap_ms whose end points are kept,
+    so the cursor still travels the path instead of jumping, and RDP only ever scans one
+    window. Returns (new_store, moves_before, moves_after)."""
+    types, times, xs, ys = store.types, store.times, store.xs, store.ys
+    n = len(types)
+    keep = bytearray(b"\x01") * n
+    tscale = (px_tol / (ms_tol / 1000.0)) if ms_tol > 0 else 0.0
+    eps2 = float(px_tol) * float(px_tol)
+    max_gap = max_gap_ms / 1000.0
+    before = after = 0
+    i = 0
+    while i < n:
+        if types[i] != EV_MOVE:
+            i += 1
+            continue
+        j = i
+        while j + 1 < n and types[j + 1] == EV_MOVE:
+            j += 1
+        before += j - i + 1
+        if j - i > 1:
+            keep[i + 1:j] = bytes(j - i - 1)
+            a = i
+            while a < j:
+                b = bisect_right(times, times[a] + max_gap, a + 2, j + 1) - 1 if max_gap > 0 else j
+                if b - a > 1:
+                    tw = [t * tscale for t in times[a:b + 1]]
+                    for m in _rdp_window(xs[a:b + 1], ys[a:b + 1], tw, eps2):
+                        keep[a + m] = 1
+                keep[b] = 1
+                a = b
+        after += sum(keep[i:j + 1])
+        i = j + 1
+    return store.select(keep), before, after
+
+def collapse_key_repeats(store: EventStore):
+    """Drop auto-repeat key_downs (a key_down for a key that is already down), leaving one
+    press/release span per hold. Returns (new_store, repeats_removed)."""
+    types, key_ids = store.types, store.key_ids
+    keep = bytearray(b"\x01") * len(types)
+    held = set()
+    removed = 0
+    for i, code in enumerate(types):
+        if code == EV_KEY_DOWN:
+            k = key_ids[i]
+            if k in held:
+                keep[i] = 0
+                removed += 1
+            else:
+                held.add(k)
+        elif code == EV_KEY_UP:
+            held.discard(key_ids[i])
+    return (store.select(keep) if removed else store), removed
+
+# -----------------------------
+# Macro Files
+# -----------------------------
+#v1 = JSON ("version": 1, list of event dicts). v2 = binary:
+#  header   MACRO_HEADER (magic, version, flags, event count, data/trailer offsets, duration)
+#  records  type byte + zigzag varints: dt (µs), then dx/dy of the position for mouse
+#           events (+ button byte for clicks, + wheel dx/dy for scroll), or key id for keys
+#  trailer  key-name table (u32 count, u16 len + utf-8 each) and a u32-length JSON meta blob
+#The key table sits after the records so files can be written in one streaming pass.
+#Streamed recording logs also carry EV_KEY_DEF records (varint length + utf-8 name,
+#next key id) so a log cut short by a crash still knows its key names.
+MACRO_MAGIC = b"MTMACRO\x00"
+MACRO_VERSION = 2
+MACRO_EXT = ".mtm"
+MACRO_HEADER = struct.Struct("<8sHHQQQq")
+FLAG_STREAMING = 0x1    #log still being written (or the writer crashed); no trailer yet
+EV_KEY_DEF = 0xFF
+
+def _put_varint(buf: bytearray, n: int):
+    #Zigzag so small negative deltas stay small
+    n = (n << 1) ^ (n >> 63)
+    while n > 0x7F:
+        buf.append((n & 0x7F) | 0x80)
+        n >>= 7
+    buf.append(n)
+
+def _get_varint(data, pos: int):
+    shift = 0
+    n = 0
+    while True:
+        b = data[pos]
+        pos += 1
+        n |= (b & 0x7F) << shift
+        if b < 0x80:
+            return (n >> 1) ^ -(n & 1), pos
+        shift += 7
+
+def rows_to_v1(rows) -> list:
+    out = []
+    for code, t, x, y, button, dx, dy, key in rows:
+        if code == EV_MOVE:
+            out.append({"t": t, "type": "move", "x": x, "y": y})
+        elif code in (EV_CLICK_DOWN, EV_CLICK_UP):
+            out.append({"t": t, "type": "click", "x": x, "y": y, "button": BUTTON_NAMES[button],
+                        "pressed": code == EV_CLICK_DOWN})
+        elif code == EV_SCROLL:
+            out.append({"t": t, "type": "scroll", "x": x, "y": y, "dx": dx, "dy": dy})
+        else:
+            out.append({"t": t, "type": EV_NAMES[code], "key": key})
+    return out
+
+class MacroEncoder:
+    """Incremental v2 record encoder; keeps only the previous time/position and the key table."""
+
+    def __init__(self, inline_keys: bool = False):
+        self.inline_keys = inline_keys
+        self.keys = []
+        self._key_index = {}
+        self.count = 0
+        self.first_us = None
+        self._t = 0
+        self._x = 0
+        self._y = 0
+
+    def encode(self, buf: bytearray, code: int, t: float, x: int, y: int, button: int, dx: int, dy: int, key: str):
+        t_us = int(round(t * 1_000_000))
+        if self.first_us is None:
+            self.first_us = t_us
+        if self.inline_keys and code in (EV_KEY_DOWN, EV_KEY_UP) and key not in self._key_index:
+            raw = key.encode("utf-8")
+            buf.append(EV_KEY_DEF)
+            _put_varint(buf, len(raw))
+            buf += raw
+        buf.append(code)
+        _put_varint(buf, t_us - self._t)
+        self._t = t_us
+        if code in (EV_KEY_DOWN, EV_KEY_UP):
+            kid = self._key_index.get(key)
+            if kid is None:
+                kid = self._key_index[key] = len(self.keys)
+                self.keys.append(key)
+            _put_varint(buf, kid)
+        else:
+            _put_varint(buf, x - self._x)
+            _put_varint(buf, y - self._y)
+            self._x, self._y = x, y
+            if code in (EV_CLICK_DOWN, EV_CLICK_UP):
+                buf.append(button)
+            elif code == EV_SCROLL:
+                _put_varint(buf, dx)
+                _put_varint(buf, dy)
+        self.count += 1
+
+    def duration_us(self) -> int:
+        return (self._t - self.first_us) if self.first_us is not None else 0
+
+    def trailer(self, meta: dict) -> bytes:
+        out = bytearray(struct.pack("<I", len(self.keys)))
+        for k in self.keys:
+            raw = k.encode("utf-8")
+            out += struct.pack("<H", len(raw)) + raw
+        blob = json.dumps(meta, ensure_ascii=False).encode("utf-8")
+        out += struct.pack("<I", len(blob)) + blob
+        return bytes(out)
+
+def write_macro_v2(path, rows, meta: dict, chunk_bytes: int = 1 << 20):
+    enc = MacroEncoder()
+    with open(path, "wb") as f:
+        f.write(b"\x00" * MACRO_HEADER.size)
+        buf = bytearray()
+        for row in rows:
+            enc.encode(buf, *row)
+            if len(buf) >= chunk_bytes:
+                f.write(buf)
+                buf.clear()
+        f.write(buf)
+        trailer_offset = f.tell()
+        f.write(enc.trailer(meta))
+        f.seek(0)
+        f.write(MACRO_HEADER.pack(MACRO_MAGIC, MACRO_VERSION, 0, enc.count,
+                                  MACRO_HEADER.size, trailer_offset, enc.duration_us()))
+
+def _iter_records(data, pos: int, end: int, keys: list):
+    """Decode v2 records, yielding (row, position after the record). Inline key defs extend keys."""
+    get = _get_varint
+    t_us = x = y = 0
+    defs = 0
+    while pos < end:
+        code = data[pos]
+        if code == EV_KEY_DEF:
+            ln, pos = get(data, pos + 1)
+            if pos + ln > end:
+                raise IndexError("truncated key definition")
+            if defs == len(keys):
+                keys.append(bytes(data[pos:pos + ln]).decode("utf-8"))
+            defs += 1
+            pos += ln
+            continue
+        if not EV_KEY_DOWN <= code <= EV_SCROLL:
+            raise ValueError(f"bad record type {code} at offset {pos}")
+        d, pos = get(data, pos + 1)
+        t_us += d
+        t = t_us / 1_000_000
+        if code in (EV_KEY_DOWN, EV_KEY_UP):
+            kid, pos = get(data, pos)
+            yield (code, t, 0, 0, 0, 0, 0, keys[kid]), pos
+            continue
+        d, pos = get(data, pos)
+        x += d
+        d, pos = get(data, pos)
+        y += d
+        button = dx = dy = 0
+        if code in (EV_CLICK_DOWN, EV_CLICK_UP):
+            button = data[pos]
+            pos += 1
+        elif code == EV_SCROLL:
+            dx, pos = get(data, pos)
+            dy, pos = get(data, pos)
+        yield (code, t, x, y, button, dx, dy, ""), pos
+
+class MappedMacro:
+    """Read-only v2 macro decoded lazily from an mmap; iterating yields EventStore-style rows."""
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._file = open(path, "rb")
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self._file.close()
+            raise
+        magic, version, self.flags, self.count, self.data_offset, self.trailer_offset, dur_us = \
+            MACRO_HEADER.unpack_from(self._mm, 0)
+        if magic != MACRO_MAGIC or version != MACRO_VERSION:
+            self.close()
+            raise ValueError("Not a v2 macro file.")
+        if self.flags & FLAG_STREAMING:
+            self.close()
+            raise ValueError("Unfinished recording log; recover it first.")
+        self._duration = dur_us / 1_000_000
+        self.keys, self.meta = self._read_trailer(self.trailer_offset)
+
+    def _read_trailer(self, pos: int):
+        mm = self._mm
+        (n,) = struct.unpack_from("<I", mm, pos)
+        pos += 4
+        keys = []
+        for _ in range(n):
+            (ln,) = struct.unpack_from("<H", mm, pos)
+            pos += 2
+            keys.append(mm[pos:pos + ln].decode("utf-8"))
+            pos += ln
+        (ln,) = struct.unpack_from("<I", mm, pos)
+        meta = json.loads(mm[pos + 4:pos + 4 + ln].decode("utf-8")) if ln else {}
+        return keys, meta
+
+    def __len__(self):
+        return self.count
+
+    def duration(self) -> float:
+        return self._duration
+
+    def __iter__(self):
+        for row, _pos in _iter_records(self._mm, self.data_offset, self.trailer_offset, self.keys):
+            yield row
+
+    def to_v1(self) -> list:
+        return rows_to_v1(self)
+
+    def close(self):
+        try:
+            self._mm.close()
+        except Exception:
+            pass
+        self._file.close()
+
+class MacroLogWriter:
+    """Append-only v2 recording log. Same append/intern API as EventStore; a background
+    thread encodes queued events in chunks, writes them and fsyncs periodically, so
+    memory stays flat however long the recording runs."""
+
+    def __init__(self, path, meta: dict = None, flush_interval: float = 0.1, fsync_interval: float = 1.0):
+        self.path = str(path)
+        self.meta = dict(meta or {})
+        self.flush_interval = flush_interval
+        self.fsync_interval = fsync_interval
+        self.keys = [""]
+        self._key_index = {"": 0}
+        self._lock = threading.Lock()
+        self._pending = deque()
+        self._appended = 0
+        self._enc = MacroEncoder(inline_keys=True)
+        self._f = open(self.path, "wb")
+        self._f.write(MACRO_HEADER.pack(MACRO_MAGIC, MACRO_VERSION, FLAG_STREAMING, 0, MACRO_HEADER.size, 0, 0))
+        self._f.flush()
+        self._closing = threading.Event()
+        self._thread = threading.Thread(target=self._writer_loop, daemon=True)
+        self._thread.start()
+
+    def __len__(self):
+        return self._appended
+
+    def intern(self, name: str) -> int:
+        kid = self._key_index.get(name)
+        if kid is None:
+            with self._lock:
+                kid = self._key_index.get(name)
+                if kid is None:
+                    kid = len(self.keys)
+                    self.keys.append(name)
+                    self._key_index[name] = kid
+        return kid
+
+    def append(self, code: int, t: float, x: int = 0, y: int = 0, button: int = 0, dx: int = 0, dy: int = 0, key_id: int = 0):
+        #deque.append is atomic, so listener threads never block on the disk
+        self._pending.append((code, t, x, y, button, dx, dy, key_id))
+        self._appended += 1
+
+    def _drain(self):
+        pending = self._pending
+        if not pending:
+            return
+        buf = bytearray()
+        enc = self._enc
+        keys = self.keys
+        while pending:
+            code, t, x, y, button, dx, dy, kid = pending.popleft()
+            enc.encode(buf, code, t, x, y, button, dx, dy, keys[kid])
+        self._f.write(buf)
+        self._f.flush()
+
+    def _writer_loop(self):
+        last_sync = time.monotonic()
+        while not self._closing.wait(self.flush_interval):
+            try:
+                self._drain()
+                now = time.monotonic()
+                if now - last_sync >= self.fsync_interval:
+                    os.fsync(self._f.fileno())
+                    last_sync = now
+            except Exception as e:
+                print(f"[WARN] Recording log write failed ({self.path}): {e}")
+                return
+
+    def close(self):
+        """Stop the writer, flush what's left and finalize the header/trailer."""
+        self._closing.set()
+        self._thread.join()
+        self._drain()
+        trailer_offset = self._f.tell()
+        self._f.write(self._enc.trailer(self.meta))
+        self._f.seek(0)
+        self._f.write(MACRO_HEADER.pack(MACRO_MAGIC, MACRO_VERSION, 0, self._enc.count,
+                                        MACRO_HEADER.size, trailer_offset, self._enc.duration_us()))
+        self._f.flush()
+        os.fsync(self._f.fileno())
+        self._f.close()
+
+def _complete_records(data, pos: int, end: int, keys: list):
+    """_iter_records for an unfinished log: stops quietly at a torn (or still being written) record."""
+    try:
+        yield from _iter_records(data, pos, end, keys)
+    except (IndexError, ValueError, UnicodeDecodeError):
+        return
+
+def read_unfinished_log(path):
+    """Decode an unfinished log up to its last complete record without touching the file
+    (it may be a recording still in progress). Returns (EventStore, meta)."""
+    store = EventStore()
+    with open(path, "rb") as f:
+        data_offset = MACRO_HEADER.unpack(f.read(MACRO_HEADER.size))[4]
+        if os.fstat(f.fileno()).st_size > data_offset:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                intern, append = store.intern, store.append
+                for (code, t, x, y, button, dx, dy, key), _pos in _complete_records(mm, data_offset, len(mm), []):
+                    append(code, t, x, y, button, dx, dy, intern(key) if key else 0)
+    return store, {"unfinished": True}
+
+def recover_macro_log(path) -> int:
+    """Finalize a log left unfinished by a crash in place: drop a torn last record, add the
+    trailer. Only for logs no recorder is writing any more. Returns the number of events recovered."""
+    with open(path, "r+b") as f:
+        data_offset = MACRO_HEADER.unpack(f.read(MACRO_HEADER.size))[4]
+        keys = []
+        enc = MacroEncoder()
+        good = data_offset
+        first = last = None
+        size = os.fstat(f.fileno()).st_size
+        if size > data_offset:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                for row, pos in _complete_records(mm, data_offset, size, keys):
+                    good = pos
+                    enc.count += 1
+                    if first is None:
+                        first = row[1]
+                    last = row[1]
+        enc.keys = keys
+        f.truncate(good)
+        f.seek(good)
+        f.write(enc.trailer({"recovered": True}))
+        dur_us = int(round(((last or 0.0) - (first or 0.0)) * 1_000_000))
+        f.seek(0)
+        f.write(MACRO_HEADER.pack(MACRO_MAGIC, MACRO_VERSION, 0, enc.count, data_offset, good, dur_us))
+    return enc.count
+
+def is_macro_v2(path) -> bool:
+    with open(path, "rb") as f:
+        return f.read(len(MACRO_MAGIC)) == MACRO_MAGIC
+
+def is_unfinished_log(path) -> bool:
+    with open(path, "rb") as f:
+        head = f.read(MACRO_HEADER.size)
+    if len(head) < MACRO_HEADER.size or not head.startswith(MACRO_MAGIC):
+        return False
+    return bool(MACRO_HEADER.unpack(head)[2] & FLAG_STREAMING)
+
+def load_macro_file(path):
+    """Open a v1 JSON or v2 binary macro. Returns (events, meta); v2 stays memory-mapped.
+    Never writes: unfinished logs are decoded read-only (see recover_macro_log to finalize one)."""
+    if is_macro_v2(path):
+        if is_unfinished_log(path):
+            return read_unfinished_log(path)
+        mac = MappedMacro(path)
+        return mac, mac.meta
+    with open(path, "r", encoding="utf-8") as f:
+        payload = json.load(f)
+    events = payload.get("events")
+    if not isinstance(events, list) or not events:
+        raise ValueError("No events found in file.")
+    return EventStore.from_v1(events), payload.get("meta") or {}
+
+def save_macro_file(path, events, meta: dict):
+    """Write v1 JSON for *.json paths, v2 binary otherwise."""
+    created = datetime.utcnow().isoformat() + "Z"
+    if str(path).lower().endswith(".json"):
+        payload = {
+            "version": 1,
+            "created": created,
+            "meta": meta,
+            "events": rows_to_v1(events)
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False, indent=2)
+    else:
+        write_macro_v2(path, events, dict(meta, created=created))
+
+def convert_macro_file(src, dst):
+    """Convert between v1 JSON and v2 binary (direction picked from dst's extension)."""
+    events, meta = load_macro_file(src)
+    #The copy of an unfinished log is a complete file
+    meta = {k: v for k, v in meta.items() if k != "unfinished"}
+    try:
+        save_macro_file(dst, events, meta)
+    finally:
+        if isinstance(events, MappedMacro):
+            events.close()
+
+# -----------------------------
+# Input Backends
+# -----------------------------
+#"pynput" injects one controller call per event; "native" sends whole batches through
+#SendInput (Windows) or XTest (X11); "auto" picks native when available, else pynput;
+#"fake" records what would have been injected (perf_counter timestamps), no display needed.
+BACKENDS = ("auto", "pynput", "native", "fake")
+
+#Op codes: injection batches are lists of (op, *args) tuples, and the fake backend logs them
+#  (OP_PRESS|OP_RELEASE, key)   (OP_TYPE, text)   (OP_MOVE, x, y)   (OP_CLICK, button, count)
+#  (OP_MOUSE_DOWN|OP_MOUSE_UP, button)   (OP_SCROLL, dx, dy)
+OP_PRESS, OP_RELEASE, OP_TYPE, OP_MOVE, OP_CLICK, OP_MOUSE_DOWN, OP_MOUSE_UP, OP_SCROLL = range(1, 9)
+
+class FakeKeyController:
+    """Drop-in for pynput's keyboard Controller that only logs calls."""
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.times = array("d")
+        self.ops = array("B")
+
+    def _log(self, op):
+        self.times.append(self.clock())
+        self.ops.append(op)
+
+    def press(self, key):
+        self._log(OP_PRESS)
+
+    def release(self, key):
+        self._log(OP_RELEASE)
+
+    def type(self, text):
+        self._log(OP_TYPE)
+
+class FakeMouseController:
+    """Drop-in for pynput's mouse Controller; logs every call with the cursor position."""
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self._pos = (0, 0)
+        self.times = array("d")
+        self.ops = array("B")
+        self.xs = array("i")
+        self.ys = array("i")
+
+    def _log(self, op):
+        self.times.append(self.clock())
+        self.ops.append(op)
+        self.xs.append(self._pos[0])
+        self.ys.append(self._pos[1])
+
+    @property
+    def position(self):
+        return self._pos
+
+    @position.setter
+    def position(self, pos):
+        self._pos = (int(pos[0]), int(pos[1]))
+        self._log(OP_MOVE)
+
+    def click(self, button, count=1):
+        self._log(OP_CLICK)
+
+    def press(self, button):
+        self._log(OP_MOUSE_DOWN)
+
+    def release(self, button):
+        self._log(OP_MOUSE_UP)
+
+    def scroll(self, dx, dy):
+        self._log(OP_SCROLL)
+
+def make_controllers(backend: str = "auto"):
+    """(keyboard controller, mouse controller) for the named backend."""
+    if backend == "fake":
+        return FakeKeyController(), FakeMouseController()
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown input backend {backend!r} (expected one of {', '.join(BACKENDS)})")
+    require_pynput()
+    return KeyController(), MouseController()
+
+# -----------------------------
+# Batched Injection
+# -----------------------------
+def _button_name(button) -> str:
+    #pynput Button member or plain "left"/"right" (fake backend)
+    return getattr(button, "name", button) or "left"
+
+class ControllerInjector:
+    """Sends a batch one controller call at a time (pynput, or the fake controllers).
+
+    Button ops right after a move wait settle_s first, like the old click path did."""
+
+    def __init__(self, kctl, mctl, settle_s: float = 0.001):
+        self.kctl = kctl
+        self.mctl = mctl
+        self.settle_s = settle_s
+
+    def send(self, ops):
+        k, m = self.kctl, self.mctl
+        moved = False
+        for op in ops:
+            code = op[0]
+            try:
+                if code == OP_MOVE:
+                    m.position = (op[1], op[2])
+                    moved = True
+                    continue
+                if moved and self.settle_s and code in (OP_CLICK, OP_MOUSE_DOWN, OP_MOUSE_UP, OP_SCROLL):
+                    time.sleep(self.settle_s)
+                if code == OP_PRESS:
+                    k.press(op[1])
+                elif code == OP_RELEASE:
+                    k.release(op[1])
+                elif code == OP_CLICK:
+                    m.click(op[1], op[2])
+                elif code == OP_TYPE:
+                    k.type(op[1])
+                elif code == OP_SCROLL:
+                    m.scroll(op[1], op[2])
+                elif code == OP_MOUSE_DOWN:
+                    m.press(op[1])
+                elif code == OP_MOUSE_UP:
+                    m.release(op[1])
+            except Exception:
+                pass
+            moved = False
+
+class FakeInjector:
+    """Logs each op with its batch's timestamp (x/y for mouse ops) and each batch's size."""
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.times = array("d")
+        self.ops = array("B")
+        self.xs = array("i")
+        self.ys = array("i")
+        self.batch_times = array("d")
+        self.batch_sizes = array("I")
+
+    def send(self, ops):
+        now = self.clock()
+        self.batch_times.append(now)
+        self.batch_sizes.append(len(ops))
+        for op in ops:
+            self.times.append(now)
+            self.ops.append(op[0])
+            if op[0] == OP_MOVE:
+                self.xs.append(int(op[1]))
+                self.ys.append(int(op[2]))
+            else:
+                self.xs.append(0)
+                self.ys.append(0)
+
+class SendInputInjector:
+    """Windows: one SendInput call per batch (moves are absolute on the virtual desktop)."""
+
+    def __init__(self):
+        import ctypes
+        from ctypes import wintypes
+        self._ctypes = ctypes
+        user32 = ctypes.WinDLL("user32", use_last_error=True)
+        ULONG_PTR = ctypes.c_size_t
+
+        class MOUSEINPUT(ctypes.Structure):
+            _fields_ = [("dx", wintypes.LONG), ("dy", wintypes.LONG), ("mouseData", wintypes.DWORD),
+                        ("dwFlags", wintypes.DWORD), ("time", wintypes.DWORD), ("dwExtraInfo", ULONG_PTR)]
+
+        class KEYBDINPUT(ctypes.Structure):
+            _fields_ = [("wVk", wintypes.WORD), ("wScan", wintypes.WORD), ("dwFlags", wintypes.DWORD),
+                        ("time", wintypes.DWORD), ("dwExtraInfo", ULONG_PTR)]
+
+        class HARDWAREINPUT(ctypes.Structure):
+            _fields_ = [("uMsg", wintypes.DWORD), ("wParamL", wintypes.WORD), ("wParamH", wintypes.WORD)]
+
+        class _U(ctypes.Union):
+            _fields_ = [("mi", MOUSEINPUT), ("ki", KEYBDINPUT), ("hi", HARDWAREINPUT)]
+
+        class INPUT(ctypes.Structure):
+            _fields_ = [("type", wintypes.DWORD), ("u", _U)]
+
+        self.INPUT = INPUT
+        self._send = user32.SendInput
+        self._send.argtypes = (wintypes.UINT, ctypes.POINTER(INPUT), ctypes.c_int)
+        self._send.restype = wintypes.UINT
+        self._vk_scan = user32.VkKeyScanW
+        self._vk_scan.argtypes = (wintypes.WCHAR,)
+        self._vk_scan.restype = ctypes.c_short
+        self._metrics = user32.GetSystemMetrics
+        self._lock = threading.Lock()
+
+    #INPUT types / flags (winuser.h)
+    _MOUSE, _KEYBOARD = 0, 1
+    _MOVE, _ABSOLUTE, _VIRTUALDESK = 0x0001, 0x8000, 0x4000
+    _DOWN_UP = {"left": (0x0002, 0x0004), "right": (0x0008, 0x0010), "middle": (0x0020, 0x0040)}
+    _WHEEL, _HWHEEL, _WHEEL_DELTA = 0x0800, 0x1000, 120
+    _KEYUP, _UNICODE, _EXTENDED = 0x0002, 0x0004, 0x0001
+    #Keys that need KEYEVENTF_EXTENDEDKEY (arrows, nav block, right ctrl/alt, win, numlock, divide)
+    _EXTENDED_VKS = frozenset((0x21, 0x22, 0x23, 0x24, 0x25, 0x26, 0x27, 0x28, 0x2D, 0x2E,
+                               0x5B, 0x5C, 0x6F, 0x90, 0xA3, 0xA5))
+
+    def _key_inputs(self, key, up: bool, out: list):
+        vk = getattr(getattr(key, "value", key), "vk", None)
+        ch = getattr(key, "char", None) or (key if isinstance(key, str) and len(key) == 1 else None)
+        if not vk and ch:
+            r = self._vk_scan(ch)
+            if r != -1 and (r & 0xFF) != 0xFF:
+                vk = r & 0xFF
+        flags = self._KEYUP if up else 0
+        inp = self.INPUT(type=self._KEYBOARD)
+        if vk:
+            inp.u.ki.wVk = vk
+            inp.u.ki.dwFlags = flags | (self._EXTENDED if vk in self._EXTENDED_VKS else 0)
+        elif ch:
+            #No virtual key for this character on the current layout: send it as unicode
+            inp.u.ki.wScan = ord(ch)
+            inp.u.ki.dwFlags = flags | self._UNICODE
+        else:
+            return
+        out.append(inp)
+
+    def _mouse_input(self, flags: int, dx: int = 0, dy: int = 0, data: int = 0):
+        inp = self.INPUT(type=self._MOUSE)
+        inp.u.mi.dx = dx
+        inp.u.mi.dy = dy
+        inp.u.mi.mouseData = data & 0xFFFFFFFF
+        inp.u.mi.dwFlags = flags
+        return inp
+
+    def send(self, ops):
+        inputs = []
+        #Absolute coordinates are 0..65535 across the virtual desktop (all monitors)
+        vx, vy = self._metrics(76), self._metrics(77)
+        vw, vh = max(2, self._metrics(78)), max(2, self._metrics(79))
+        for op in ops:
+            code = op[0]
+            if code == OP_MOVE:
+                ax = ((op[1] - vx) * 65535 + (vw - 1) // 2) // (vw - 1)
+                ay = ((op[2] - vy) * 65535 + (vh - 1) // 2) // (vh - 1)
+                inputs.append(self._mouse_input(self._MOVE | self._ABSOLUTE | self._VIRTUALDESK, ax, ay))
+            elif code in (OP_CLICK, OP_MOUSE_DOWN, OP_MOUSE_UP):
+                down, up = self._DOWN_UP.get(_button_name(op[1]), self._DOWN_UP["left"])
+                if code == OP_MOUSE_DOWN:
+                    inputs.append(self._mouse_input(down))
+                elif code == OP_MOUSE_UP:
+                    inputs.append(self._mouse_input(up))
+                else:
+                    for _ in range(max(1, op[2])):
+                        inputs.append(self._mouse_input(down))
+                        inputs.append(self._mouse_input(up))
+            elif code == OP_SCROLL:
+                if op[2]:
+                    inputs.append(self._mouse_input(self._WHEEL, data=int(op[2]) * self._WHEEL_DELTA))
+                if op[1]:
+                    inputs.append(self._mouse_input(self._HWHEEL, data=int(op[1]) * self._WHEEL_DELTA))
+            elif code == OP_PRESS or code == OP_RELEASE:
+                self._key_inputs(op[1], code == OP_RELEASE, inputs)
+            elif code == OP_TYPE:
+                for ch in op[1]:
+                    self._key_inputs(ch, False, inputs)
+                    self._key_inputs(ch, True, inputs)
+        if not inputs:
+            return
+        arr = (self.INPUT * len(inputs))(*inputs)
+        with self._lock:
+            self._send(len(inputs), arr, self._ctypes.sizeof(self.INPUT))
+
+class XTestInjector:
+    """X11: queue a batch with XTest fake events and push it with a single XFlush."""
+
+    def __init__(self, fallback: ControllerInjector = None):
+        import ctypes
+        import ctypes.util
+        x11_name, xtst_name = ctypes.util.find_library("X11"), ctypes.util.find_library("Xtst")
+        if not x11_name or not xtst_name:
+            raise OSError("libX11/libXtst not found")
+        self._x11 = x11 = ctypes.cdll.LoadLibrary(x11_name)
+        self._xtst = xtst = ctypes.cdll.LoadLibrary(xtst_name)
+        x11.XOpenDisplay.restype = ctypes.c_void_p
+        x11.XOpenDisplay.argtypes = (ctypes.c_char_p,)
+        x11.XFlush.argtypes = (ctypes.c_void_p,)
+        x11.XKeysymToKeycode.argtypes = (ctypes.c_void_p, ctypes.c_ulong)
+        x11.XKeysymToKeycode.restype = ctypes.c_ubyte
+        xtst.XTestFakeMotionEvent.argtypes = (ctypes.c_void_p, ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_ulong)
+        xtst.XTestFakeButtonEvent.argtypes = (ctypes.c_void_p, ctypes.c_uint, ctypes.c_int, ctypes.c_ulong)
+        xtst.XTestFakeKeyEvent.argtypes = (ctypes.c_void_p, ctypes.c_uint, ctypes.c_int, ctypes.c_ulong)
+        self._display = x11.XOpenDisplay(None)
+        if not self._display:
+            raise OSError("cannot open X display")
+        self._fallback = fallback
+        self._keycodes = {}
+        self._lock = threading.Lock()
+
+    #X button numbers; wheel "buttons" 4/5 = up/down, 6/7 = left/right
+    _BUTTONS = {"left": 1, "middle": 2, "right": 3}
+
+    def _keycode(self, key) -> int:
+        kc = self._keycodes.get(key)
+        if kc is None:
+            #pynput's xorg Key values carry the keysym as vk; characters map to Latin-1/unicode keysyms
+            sym = getattr(getattr(key, "value", key), "vk", None)
+            ch = getattr(key, "char", None) or (key if isinstance(key, str) and len(key) == 1 else None)
+            if not sym and ch:
+                sym = ord(ch) if ord(ch) < 0x100 else 0x01000000 | ord(ch)
+            kc = self._x11.XKeysymToKeycode(self._display, sym) if sym else 0
+            try:
+                self._keycodes[key] = kc
+            except TypeError:
+                pass
+        return kc
+
+    def send(self, ops):
+        d, xt = self._display, self._xtst
+        leftovers = []
+        with self._lock:
+            for op in ops:
+                code = op[0]
+                if code == OP_MOVE:
+                    xt.XTestFakeMotionEvent(d, -1, int(op[1]), int(op[2]), 0)
+                elif code in (OP_CLICK, OP_MOUSE_DOWN, OP_MOUSE_UP):
+                    b = self._BUTTONS.get(_button_name(op[1]), 1)
+                    if code == OP_MOUSE_DOWN:
+                        xt.XTestFakeButtonEvent(d, b, 1, 0)
+                    elif code == OP_MOUSE_UP:
+                        xt.XTestFakeButtonEvent(d, b, 0, 0)
+                    else:
+                        for _ in range(max(1, op[2])):
+                            xt.XTestFakeButtonEvent(d, b, 1, 0)
+                            xt.XTestFakeButtonEvent(d, b, 0, 0)
+                elif code == OP_SCROLL:
+                    for b, n in ((4 if op[2] > 0 else 5, abs(int(op[2]))), (7 if op[1] > 0 else 6, abs(int(op[1])))):
+                        for _ in range(n):
+                            xt.XTestFakeButtonEvent(d, b, 1, 0)
+                            xt.XTestFakeButtonEvent(d, b, 0, 0)
+                elif code == OP_PRESS or code == OP_RELEASE:
+                    kc = self._keycode(op[1])
+                    if kc:
+                        xt.XTestFakeKeyEvent(d, kc, 1 if code == OP_PRESS else 0, 0)
+                    else:
+                        leftovers.append(op)
+                elif code == OP_TYPE:
+                    leftovers.append(op)
+            self._x11.XFlush(d)
+        if leftovers and self._fallback is not None:
+            #Keys with no keycode on this layout (and typed text) go through pynput, which remaps
+            self._fallback.send(leftovers)
+
+def make_injector(backend: str, kctl, mctl):
+    """Injector for the backend: native batches where possible, else controller calls."""
+    if backend == "fake":
+        return FakeInjector()
+    fallback = ControllerInjector(kctl, mctl)
+    if backend == "pynput":
+        return fallback
+    try:
+        if sys.platform == "win32":
+            return SendInputInjector()
+        if os.environ.get("DISPLAY") and sys.platform.startswith("linux"):
+            return XTestInjector(fallback)
+        raise OSError(f"no batched injection on {sys.platform}")
+    except Exception as e:
+        if backend == "native":
+            raise RuntimeError(f"Native input injection unavailable: {e}")
+        print(f"[WARN] Batched injection unavailable ({e}); using pynput calls")
+        return fallback
+
+# -----------------------------
+# Playback Plan
+# -----------------------------
+class PlaybackPlan:
+    """Pre-resolved playback: steps are (offset_s, ops, next_move_offset, code).
+
+    ops is the injection batch for the event with keys/buttons/coordinates already
+    resolved. next_move_offset is set when this step and the next are both moves (so
+    this one may be coalesced when playback falls behind), else None. code is the
+    EV_* type, used to label telemetry."""
+
+    __slots__ = ("steps", "span")
+
+    def __init__(self, steps: list, span: float):
+        self.steps = steps
+        self.span = span
+
+    def __len__(self):
+        return len(self.steps)
+
+def resolve_button(name: str):
+    """pynput Button for 'left'/'right' (the name itself without pynput)."""
+    if Button is None:
+        return name
+    return Button.left if name == "left" else Button.right
+
+def resolve_key(name: str):
+    """Key object for a recorded key name (special key, or the first character)."""
+    k = str_to_key(name)
+    if k is None and name:
+        #Without pynput (fake backend) the name itself stands in for the key
+        k = KeyCode.from_char(name[0]) if KeyCode is not None else name
+    return k
+
+def compile_plan(events) -> PlaybackPlan:
+    """Turn recorded rows into a PlaybackPlan of injection batches."""
+    buttons = {1: resolve_button("left"), 2: resolve_button("right")}
+    key_cache = {}
+    steps = []
+    t0 = None
+    prev_move = False
+    for code, t, x, y, button, dx, dy, key in events:
+        if t0 is None:
+            t0 = t
+        off = t - t0
+        if code == EV_MOVE:
+            if prev_move:
+                #The previous move can be coalesced into this one
+                o, ops, _, c = steps[-1]
+                steps[-1] = (o, ops, off, c)
+            steps.append((off, ((OP_MOVE, x, y),), None, code))
+            prev_move = True
+            continue
+        prev_move = False
+        if code in (EV_KEY_DOWN, EV_KEY_UP):
+            k = key_cache.get(key)
+            if k is None:
+                k = key_cache[key] = resolve_key(key)
+            if k is not None:
+                steps.append((off, ((OP_PRESS if code == EV_KEY_DOWN else OP_RELEASE, k),), None, code))
+        elif code == EV_CLICK_DOWN:
+            steps.append((off, ((OP_MOVE, x, y), (OP_CLICK, buttons.get(button, buttons[2]), 1)), None, code))
+        elif code == EV_SCROLL:
+            steps.append((off, ((OP_MOVE, x, y), (OP_SCROLL, dx, dy)), None, code))
+    span = (t - t0) if t0 is not None else 0.0
+    return PlaybackPlan(steps, span)
+
+#Shortest gap kept between dependent events when playback is sped up or compressed:
+#a key's release after its press, and a click/scroll after the move or click before it
+DEPENDENT_GAP_S = 0.005
+
+def retime_plan(plan: PlaybackPlan, speed: float = 1.0, max_gap_s: float = 0.0, max_speed: bool = False,
+                dep_gap_s: float = DEPENDENT_GAP_S) -> PlaybackPlan:
+    """Compress a plan's timeline: divide gaps by speed, cap them at max_gap_s (0 = no cap),
+    or drop them entirely (max_speed). Dependent events stay at least dep_gap_s apart."""
+    if speed == 1.0 and max_gap_s <= 0 and not max_speed:
+        return plan
+    speed = speed if speed > 0 else 1.0
+    steps = plan.steps
+    offs = []
+    pressed_at = {}
+    prev_old = prev_new = 0.0
+    prev_code = None
+    for off, ops, _, code in steps:
+        gap = off - prev_old
+        if max_speed:
+            gap = 0.0
+        else:
+            gap /= speed
+            if max_gap_s > 0 and gap > max_gap_s:
+                gap = max_gap_s
+        new = prev_new + gap
+        if code == EV_KEY_UP:
+            t = pressed_at.pop(ops[0][1], None)
+            if t is not None and new < t + dep_gap_s:
+                new = t + dep_gap_s
+        elif code in (EV_CLICK_DOWN, EV_SCROLL) and prev_code in (EV_MOVE, EV_CLICK_DOWN, EV_SCROLL):
+            if new < prev_new + dep_gap_s:
+                new = prev_new + dep_gap_s
+        if code == EV_KEY_DOWN:
+            pressed_at[ops[0][1]] = new
+        offs.append(new)
+        prev_old, prev_new, prev_code = off, new, code
+    #next_move offsets point at the following step's (new) offset
+    new_steps = [(offs[i], ops, offs[i + 1] if nxt is not None else None, code)
+                 for i, (_, ops, nxt, code) in enumerate(steps)]
+    return PlaybackPlan(new_steps, offs[-1] if offs else 0.0)
+
+#Held keys: recordings store one press/release span per hold (see HookRecorder), and
+#playback can put auto-repeat presses back in: "os" uses the system's repeat delay/rate,
+#"custom" the configured ones
+KEY_REPEAT_MODES = ("off", "os", "custom")
+KEY_REPEAT_DEFAULT = (0.5, 1.0 / 30)     #(delay_s, interval_s) when the OS setting can't be read
+_os_key_repeat = None
+
+def _query_key_repeat():
+    import ctypes
+    if sys.platform == "win32":
+        user32 = ctypes.windll.user32
+        delay, speed = ctypes.c_uint(), ctypes.c_uint()
+        #SPI_GETKEYBOARDDELAY: 0..3 = 250..1000 ms; SPI_GETKEYBOARDSPEED: 0..31 = ~2.5..30 per second
+        if user32.SystemParametersInfoW(0x16, 0, ctypes.byref(delay), 0) and \
+                user32.SystemParametersInfoW(0x0A, 0, ctypes.byref(speed), 0):
+            return 0.25 * (delay.value + 1), 1.0 / (2.5 + speed.value * 27.5 / 31)
+        return None
+    import ctypes.util
+    name = ctypes.util.find_library("X11")
+    if not name or not os.environ.get("DISPLAY"):
+        return None
+    x11 = ctypes.cdll.LoadLibrary(name)
+    x11.XOpenDisplay.restype = ctypes.c_void_p
+    x11.XOpenDisplay.argtypes = (ctypes.c_char_p,)
+    x11.XCloseDisplay.argtypes = (ctypes.c_void_p,)
+    x11.XkbGetAutoRepeatRate.argtypes = (ctypes.c_void_p, ctypes.c_uint,
+                                         ctypes.POINTER(ctypes.c_uint), ctypes.POINTER(ctypes.c_uint))
+    dpy = x11.XOpenDisplay(None)
+    if not dpy:
+        return None
+    try:
+        delay, interval = ctypes.c_uint(), ctypes.c_uint()
+        #XkbUseCoreKbd = 0x100; both values in ms
+        if x11.XkbGetAutoRepeatRate(dpy, 0x100, ctypes.byref(delay), ctypes.byref(interval)) and interval.value:
+            return delay.value / 1000.0, interval.value / 1000.0
+    finally:
+        x11.XCloseDisplay(dpy)
+    return None
+
+def os_key_repeat() -> tuple:
+    """(delay_s, interval_s) of the system keyboard auto-repeat (read once), else KEY_REPEAT_DEFAULT."""
+    global _os_key_repeat
+    if _os_key_repeat is None:
+        try:
+            _os_key_repeat = _query_key_repeat() or KEY_REPEAT_DEFAULT
+        except Exception:
+            _os_key_repeat = KEY_REPEAT_DEFAULT
+    return _os_key_repeat
+
+def key_repeat_timing(cfg):
+    """(delay_s, interval_s) held keys should repeat at during playback, or None."""
+    if cfg.key_repeat == "os":
+        return os_key_repeat()
+    if cfg.key_repeat == "custom":
+        return cfg.key_repeat_delay_s, 1.0 / cfg.key_repeat_hz
+    return None
+
+def expand_key_repeat(plan: PlaybackPlan, delay_s: float, interval_s: float) -> PlaybackPlan:
+    """Re-insert auto-repeat presses into every key hold: delay_s after the press, then every
+    interval_s until the release. Repeats already in the recording (older files) are replaced.
+    Run it on the retimed plan so repeats keep real-time spacing."""
+    interval_s = max(interval_s, 0.001)
+    steps = plan.steps
+    held = {}
+    extra = []
+    recorded = 0
+    for off, ops, _, code in steps:
+        if code == EV_KEY_DOWN:
+            if ops[0][1] in held:
+                recorded += 1
+            else:
+                held[ops[0][1]] = (off, ops)
+        elif code == EV_KEY_UP:
+            down = held.pop(ops[0][1], None)
+            if down is None:
+                continue
+            t = down[0] + delay_s
+            while t < off:
+                extra.append((t, down[1], None, EV_KEY_DOWN))
+                t += interval_s
+    if not extra and not recorded:
+        return plan
+    if recorded:
+        kept = []
+        down = set()
+        for step in steps:
+            code = step[3]
+            if code == EV_KEY_DOWN:
+                k = step[1][0][1]
+                if k in down:
+                    continue
+                down.add(k)
+            elif code == EV_KEY_UP:
+                down.discard(step[1][0][1])
+            kept.append(step)
+        steps = kept
+    extra.sort(key=_event_time)
+    #Ties go to the recorded step (merge is stable), so a repeat never lands after its release
+    return PlaybackPlan(list(heapq.merge(steps, extra, key=_event_time)), plan.span)
+
+# -----------------------------
+# Humanized Movement
+# -----------------------------
+#Random nudge offsets are drawn NUDGE_BATCH at a time from a distribution over [-|dx|, |dx|] x
+#[-|dy|, |dy|] ("gaussian" uses sigma = bound / 2, clipped to the bound). The move to the nudged
+#point either jumps, or follows a straight line ("minjerk") or a bowed cubic Bezier curve ("bezier"),
+#both with a minimum-jerk speed profile, sampled at rate_hz and streamed out one sample at a time.
+NUDGE_DISTS = ("uniform", "gaussian")
+NUDGE_PATHS = ("jump", "minjerk", "bezier")
+NUDGE_BATCH = 256
+
+def minjerk_profile(n: int) -> array:
+    """Progress (0..1] at n evenly spaced times along a minimum-jerk move; the last value is 1."""
+    out = array("d")
+    for i in range(1, n + 1):
+        t = i / n
+        out.append(t * t * t * (10.0 - t * (15.0 - 6.0 * t)))
+    return out
+
+def bezier_weights(profile) -> tuple:
+    """Cubic Bernstein weights (w0, w1, w2, w3) at each progress value."""
+    w0, w1, w2, w3 = array("d"), array("d"), array("d"), array("d")
+    for s in profile:
+        u = 1.0 - s
+        w0.append(u * u * u)
+        w1.append(3.0 * u * u * s)
+        w2.append(3.0 * u * s * s)
+        w3.append(s * s * s)
+    return w0, w1, w2, w3
+
+class Humanizer:
+    """Pre-generated nudge offsets and movement paths for the click loop.
+
+    Offsets come out of a refilled batch and paths reuse one weight table per sample count, so a
+    click costs an array read plus one multiply-add pass over its path samples."""
+
+    def __init__(self, dx: int = 0, dy: int = 0, randomize: bool = True, dist: str = "uniform",
+                 path: str = "jump", move_s: float = 0.0, rate_hz: float = 500.0, rng=None):
+        self.dx, self.dy = int(dx), int(dy)
+        self.randomize = randomize
+        self.dist = dist if dist in NUDGE_DISTS else "uniform"
+        self.path_kind = path if path in NUDGE_PATHS else "jump"
+        self.rate_hz = clamp(float(rate_hz), 10.0, 2000.0)
+        self.sample_s = 1.0 / self.rate_hz
+        self.steps = max(1, int(round(max(0.0, move_s) * self.rate_hz)))
+        self.rng = rng or random.Random()
+        self._xs = self._ys = array("i")
+        self._pos = 0
+        self._tables = {}
+
+    def streams(self) -> bool:
+        """True if moves are streamed as a path rather than a single jump."""
+        return self.path_kind != "jump" and self.steps > 1
+
+    def _axis(self, bound: int, n: int) -> array:
+        bound = abs(bound)
+        if not bound:
+            return array("i", [0]) * n
+        if self.dist == "gaussian":
+            gauss, sigma = self.rng.gauss, bound / 2.0
+            return array("i", [max(-bound, min(bound, round(gauss(0.0, sigma)))) for _ in range(n)])
+        rnd, span = self.rng.random, 2 * bound + 1
+        return array("i", [int(rnd() * span) - bound for _ in range(n)])
+
+    def refill(self, n: int = NUDGE_BATCH):
+        self._xs = self._axis(self.dx, n)
+        self._ys = self._axis(self.dy, n)
+        self._pos = 0
+
+    def offset(self):
+        """Next (dx, dy) nudge: the fixed offset, or the next pre-drawn random one."""
+        if not self.randomize:
+            return self.dx, self.dy
+        i = self._pos
+        if i >= len(self._xs):
+            self.refill()
+            i = 0
+        self._pos = i + 1
+        return self._xs[i], self._ys[i]
+
+    def _weights(self, steps: int) -> tuple:
+        w = self._tables.get(steps)
+        if w is None:
+            w = self._tables[steps] = bezier_weights(minjerk_profile(steps))
+        return w
+
+    def path(self, x0: int, y0: int, x1: int, y1: int, max_s: float = 0.0) -> list:
+        """Cursor samples from (x0, y0) to (x1, y1), one per sample_s; the last one is (x1, y1).
+
+        max_s caps the move's duration (the click loop keeps it under its interval)."""
+        steps = self.steps if self.path_kind != "jump" else 1
+        if max_s > 0:
+            steps = max(1, min(steps, int(max_s * self.rate_hz)))
+        if steps == 1 or (x0 == x1 and y0 == y1):
+            return [(x1, y1)]
+        ex, ey = x1 - x0, y1 - y0
+        #Control points a third of the way in from each end make the cubic a straight line...
+        c1x, c1y = x0 + ex / 3.0, y0 + ey / 3.0
+        c2x, c2y = x1 - ex / 3.0, y1 - ey / 3.0
+        if self.path_kind == "bezier":
+            #...and pushing them sideways (same side, random amounts) bows it like a wrist arc
+            bow1 = self.rng.gauss(0.0, 0.2)
+            bow2 = bow1 * self.rng.uniform(0.3, 1.0)
+            c1x, c1y = c1x - ey * bow1, c1y + ex * bow1
+            c2x, c2y = c2x - ey * bow2, c2y + ex * bow2
+        w0, w1, w2, w3 = self._weights(steps)
+        return [(round(a * x0 + b * c1x + c * c2x + d * x1), round(a * y0 + b * c1y + c * c2y + d * y1))
+                for a, b, c, d in zip(w0, w1, w2, w3)]
+
+def humanizer_for(cfg) -> Humanizer:
+    """Humanizer matching an ActionConfig's nudge settings."""
+    return Humanizer(cfg.nudge_x, cfg.nudge_y, randomize=cfg.nudge_random, dist=cfg.nudge_dist,
+                     path=cfg.nudge_path, move_s=cfg.nudge_move_s, rate_hz=cfg.nudge_rate_hz)
+
+# -----------------------------
+# Config Snapshot
+# -----------------------------
+@dataclass(frozen=True)
+class ActionConfig:
+    """Immutable copy of the UI settings for worker and listener threads.
+
+    Built on the Tk thread whenever a traced variable changes and swapped in with a
+    single attribute assignment, so other threads never call into Tcl."""
+    mode: str = "key"
+    spam_key: str = "r"
+    spam_key_obj: object = None          #resolved pynput key, or None to type spam_key[:1]
+    click_button: object = None
+    click_count: int = 1
+    target_fixed: bool = False
+    fixed_x: int = 0
+    fixed_y: int = 0
+    nudge_on: bool = False
+    nudge_x: int = 0
+    nudge_y: int = 0
+    nudge_random: bool = False
+    nudge_dist: str = "uniform"          #random offsets: see NUDGE_DISTS
+    nudge_path: str = "jump"             #how the cursor gets to the nudged point: see NUDGE_PATHS
+    nudge_move_s: float = 0.03           #duration of a streamed move
+    nudge_rate_hz: float = 500.0         #streamed path samples per second
+    interval_s: float = 0.05
+    catchup_policy: str = "skip"
+    action_hotkey: str = "f7"            #hotkeys: see HOTKEY_SLOTS
+    record_hotkey: str = "f8"
+    play_hotkey: str = "f9"
+    stop_play_hotkey: str = ""
+    jobs_hotkey: str = ""
+    stop_all_hotkey: str = ""
+    repeat_count: int = 1
+    lateness_s: float = 0.02
+    batch_window_s: float = 0.001        #playback events due within this of each other go out in one batch
+    playback_speed: float = 1.0          #timeline multiplier (2 = twice as fast)
+    trim_gaps_s: float = 0.0             #cap idle gaps at this length (0 = keep them)
+    max_speed: bool = False              #drop all gaps except between dependent events
+    key_repeat: str = "off"              #regenerate auto-repeat on held keys: see KEY_REPEAT_MODES
+    key_repeat_delay_s: float = 0.5      #"custom" repeat: delay before the first repeat...
+    key_repeat_hz: float = 30.0          #...and repeats per second after it
+    record_to_disk: bool = False
+    simplify_paths: bool = False
+    simplify_px: int = 2
+    simplify_ms: int = 10
+    library_hotkeys: tuple = ()          #((macro name, hotkey), ...): load and play a library macro
+
+# -----------------------------
+# Macro Programs
+# -----------------------------
+#A Program is a flat list of (opcode, a, b) instructions that MacroVM runs on the playback
+#thread. A recording compiles to one VM_PLAY of its PlaybackPlan; scripts (SCRIPT_EXT text
+#files, see compile_script) add loops, calls, waits and variables. Loops and calls jump
+#back into the same instructions, so N iterations cost O(body) memory, not O(N·body).
+#  VM_PLAY  plan, -                 play a PlaybackPlan from the current time, then advance by its span
+#  VM_SEND  ops, telemetry label    inject one batch at the current time
+#  VM_WAIT  seconds | var, -        advance the current time (divided by the playback speed)
+#  VM_SET / VM_ADD  var, value      variables are floats (seconds for waits, counts for loops)
+#  VM_LOOP  count | var | None, pc of its VM_END   (None = forever; <= 0 skips the body)
+#  VM_END   pc of its VM_LOOP, -
+#  VM_CALL  Program, -
+VM_PLAY, VM_SEND, VM_WAIT, VM_SET, VM_ADD, VM_LOOP, VM_END, VM_CALL = range(1, 9)
+SCRIPT_EXT = ".mts"
+
+class Program:
+    __slots__ = ("code", "name")
+
+    def __init__(self, code: list, name: str = ""):
+        self.code = code
+        self.name = name
+
+    def __len__(self):
+        return len(self.code)
+
+def program_for_plan(plan: PlaybackPlan, name: str = "") -> Program:
+    return Program([(VM_PLAY, plan, None)], name)
+
+def plan_of(program: Program):
+    """The plan a program_for_plan() program plays, else None (scripts)."""
+    code = program.code
+    return code[0][1] if len(code) == 1 and code[0][0] == VM_PLAY else None
+
+def compile_program(events, name: str = "") -> Program:
+    """Program for a recording (EventStore, MappedMacro or v1 rows via EventStore.from_v1)."""
+    return program_for_plan(compile_plan(events), name)
+
+def repeat_program(body: Program, repeats: int) -> Program:
+    """body run repeats times (0 = forever)."""
+    if repeats == 1:
+        return body
+    return Program([(VM_LOOP, repeats if repeats > 0 else None, 2), (VM_CALL, body, None), (VM_END, 0, None)],
+                   body.name)
+
+def _parse_seconds(tok: str) -> float:
+    t = tok.lower()
+    if t.endswith("ms"):
+        return float(t[:-2]) / 1000.0
+    if t.endswith("s"):
+        return float(t[:-1])
+    return float(t)
+
+def _number_or_var(tok: str):
+    try:
+        return _parse_seconds(tok)
+    except ValueError:
+        if tok.isidentifier():
+            return tok
+        raise ValueError(f"expected a number or variable name, got {tok!r}")
+
+def _var_name(tok: str) -> str:
+    if not tok.isidentifier():
+        raise ValueError(f"bad variable name {tok!r}")
+    return tok
+
+def compile_script(text: str, resolve=None, name: str = "") -> Program:
+    """Compile macro script text, one command per line ('#' starts a comment line):
+
+        loop [N | var] … end        repeat the block (no count = until stopped)
+        call NAME                   run another macro or script (resolve(NAME) -> PlaybackPlan | Program)
+        wait 1.5 | 250ms | var      pause
+        set var VALUE / add var VALUE
+        key K / press K / release K / type TEXT
+        move X Y / click [left|right] [X Y] / scroll DX DY"""
+    code = []
+    open_loops = []
+    buttons = {"left": resolve_button("left"), "right": resolve_button("right")}
+    key_cache = {}
+
+    def key(tok):
+        k = key_cache.get(tok)
+        if k is None:
+            k = str_to_key(tok)
+            if k is None and (len(tok) == 1 or Key is None):
+                #Without pynput (fake backend) the name stands in for the key
+                k = resolve_key(tok.lower())
+            if k is None:
+                raise ValueError(f"unknown key {tok!r}")
+            key_cache[tok] = k
+        return k
+
+    for lineno, raw in enumerate(text.splitlines(), 1):
+        line = raw.strip()
+        if not line or line.startswith("#"):
+            continue
+        parts = line.split()
+        cmd, args = parts[0].lower(), parts[1:]
+        try:
+            if cmd == "loop":
+                open_loops.append(len(code))
+                code.append((VM_LOOP, _number_or_var(args[0]) if args else None, None))
+            elif cmd == "end":
+                if not open_loops:
+                    raise ValueError("'end' without 'loop'")
+                start = open_loops.pop()
+                count = code[start][1]
+                code[start] = (VM_LOOP, int(count) if isinstance(count, float) else count, len(code))
+                code.append((VM_END, start, None))
+            elif cmd == "wait":
+                code.append((VM_WAIT, _number_or_var(args[0]), None))
+            elif cmd in ("set", "add"):
+                code.append((VM_SET if cmd == "set" else VM_ADD, _var_name(args[0]), _parse_seconds(args[1])))
+            elif cmd == "call":
+                if resolve is None:
+                    raise ValueError("'call' is not available here")
+                target = resolve(args[0])
+                code.append((VM_CALL, target, None) if isinstance(target, Program) else (VM_PLAY, target, None))
+            elif cmd == "key":
+                k = key(args[0])
+                code.append((VM_SEND, ((OP_PRESS, k), (OP_RELEASE, k)), "key"))
+            elif cmd in ("press", "release"):
+                code.append((VM_SEND, ((OP_PRESS if cmd == "press" else OP_RELEASE, key(args[0])),), "key"))
+            elif cmd == "type":
+                code.append((VM_SEND, ((OP_TYPE, line[4:].strip()),), "key"))
+            elif cmd == "move":
+                code.append((VM_SEND, ((OP_MOVE, int(args[0]), int(args[1])),), "move"))
+            elif cmd == "click":
+                button = "left"
+                if args and args[0].lower() in buttons:
+                    button = args.pop(0).lower()
+                click = (OP_CLICK, buttons[button], 1)
+                ops = ((OP_MOVE, int(args[0]), int(args[1])), click) if args else (click,)
+                code.append((VM_SEND, ops, "click"))
+            elif cmd == "scroll":
+                code.append((VM_SEND, ((OP_SCROLL, int(args[0]), int(args[1])),), "scroll"))
+            else:
+                raise ValueError(f"unknown command {cmd!r}")
+        except IndexError:
+            raise ValueError(f"{name or 'script'} line {lineno}: missing argument for {cmd!r}") from None
+        except ValueError as e:
+            raise ValueError(f"{name or 'script'} line {lineno}: {e}") from None
+    if open_loops:
+        raise ValueError(f"{name or 'script'}: 'loop' without 'end'")
+    return Program(code, name)
+
+def load_script(path, library=None, _active=None) -> Program:
+    """Compile a script file. `call NAME` looks next to the script first (NAME, or NAME with
+    SCRIPT_EXT/MACRO_EXT/.json), then in library; recordings are compiled to plans here."""
+    path = Path(path).resolve()
+    active = _active if _active is not None else []
+    if path in active:
+        chain = " → ".join(p.name for p in active + [path])
+        raise ValueError(f"Script calls itself: {chain}")
+    active.append(path)
+    resolved = {}
+
+    def resolve(name):
+        target = resolved.get(name)
+        if target is not None:
+            return target
+        for cand in [path.parent / name] + [path.parent / f"{name}{ext}" for ext in (SCRIPT_EXT, MACRO_EXT, ".json")]:
+            if not cand.is_file():
+                continue
+            if cand.suffix.lower() == SCRIPT_EXT:
+                target = load_script(cand, library, active)
+            else:
+                events, _ = load_macro_file(cand)
+                try:
+                    target = compile_plan(events)
+                finally:
+                    if isinstance(events, MappedMacro):
+                        events.close()
+            break
+        else:
+            if library is None:
+                raise ValueError(f"no macro named {name!r}")
+            target = library.get(name)[1]
+        resolved[name] = target
+        return target
+
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return compile_script(f.read(), resolve, path.name)
+    finally:
+        active.pop()
+
+class MacroVM:
+    """Runs a Program on the calling thread.
+
+    Every instruction is due at start + the program's running time, so sleep overshoot
+    and injection cost never accumulate; inside VM_PLAY blocks, events due within the
+    batch window go out together and overdue moves are coalesced, as in plain playback."""
+
+    def __init__(self, send, telemetry: Telemetry, cfg: ActionConfig, stopped, retime=None, clock=time.perf_counter):
+        self.send = send
+        self.telemetry = telemetry
+        self.budget = cfg.lateness_s
+        self.window = cfg.batch_window_s
+        self.speed = cfg.playback_speed if cfg.playback_speed > 0 else 1.0
+        self.stopped = stopped
+        self.retime = retime or (lambda plan: plan)
+        self.clock = clock
+        self.vars = {}
+        self.start = 0.0
+        self.elapsed = 0.0      #program time so far (seconds after start)
+        self.dropped = 0
+        self.max_late = 0.0
+
+    def run(self, program: Program) -> bool:
+        """Run to completion; False if stopped first."""
+        self.start = self.clock()
+        self.elapsed = 0.0
+        return self._exec(program.code)
+
+    def _exec(self, code: list) -> bool:
+        n = len(code)
+        pc = 0
+        loops = []      #[iterations left (0 = forever), body pc]
+        v = self.vars
+        stopped = self.stopped
+        while pc < n:
+            op, a, b = code[pc]
+            if op == VM_PLAY:
+                if not self._play(self.retime(a)):
+                    return False
+            elif op == VM_SEND:
+                due = self.start + self.elapsed
+                if not sleep_until(due, stopped):
+                    return False
+                self._send_now(a, b, due)
+            elif op == VM_WAIT:
+                secs = v.get(a, 0.0) if a.__class__ is str else a
+                if secs > 0:
+                    self.elapsed += secs / self.speed
+            elif op == VM_LOOP:
+                count = int(v.get(a, 0)) if a.__class__ is str else a
+                if count is not None and count <= 0:
+                    pc = b + 1
+                    continue
+                loops.append([count or 0, pc + 1])
+            elif op == VM_END:
+                top = loops[-1]
+                if top[0] != 1:
+                    if stopped():
+                        return False
+                    if top[0]:
+                        top[0] -= 1
+                    pc = top[1]
+                    continue
+                loops.pop()
+            elif op == VM_SET:
+                v[a] = b
+            elif op == VM_ADD:
+                v[a] = v.get(a, 0.0) + b
+            elif op == VM_CALL:
+                if not self._exec(a.code):
+                    return False
+            pc += 1
+        return True
+
+    def _send_now(self, ops, label: str, due: float):
+        now = self.clock()
+        late = now - due
+        if late > self.max_late:
+            self.max_late = late
+        try:
+            self.send(ops)
+        except Exception:
+            pass
+        self.telemetry.record(label, late, self.clock() - now)
+        self.telemetry.done += 1
+
+    def run_tracks(self, tracks) -> bool:
+        """Play several retimed Tracks at once, merged on one timeline; False if stopped first."""
+        self.start = self.clock()
+        self.elapsed = 0.0
+        return self._play_steps(merge_tracks(tracks))
+
+    def _play(self, plan: PlaybackPlan) -> bool:
+        ok = self._play_steps(plan.steps)
+        self.elapsed += plan.span
+        return ok
+
+    def _play_steps(self, steps) -> bool:
+        #steps: any iterable of plan steps in offset order (a plan's list, or merge_tracks())
+        it = iter(steps)
+        step = next(it, None)
+        base = self.start + self.elapsed
+        budget = self.budget
+        window = self.window
+        send = self.send
+        clock = self.clock
+        stopped = self.stopped
+        tel = self.telemetry
+        record = tel.record
+        names = EV_NAMES
+        dropped = self.dropped
+        max_late = self.max_late
+        done = tel.done
+        ok = True
+        i = 0
+        while step is not None:
+            off, ops, next_move, code = step
+            due = base + off
+            if not sleep_until(due, stopped):
+                ok = False
+                break
+            #Everything due by now + window goes out in one batch
+            now = clock()
+            horizon = now + window
+            batch = []
+            sent = []
+            while True:
+                late = now - due
+                if late > budget and next_move is not None and base + next_move <= now:
+                    #Too far behind: coalesce runs of overdue moves into the newest one
+                    dropped += 1
+                else:
+                    if late > max_late:
+                        max_late = late
+                    batch.extend(ops)
+                    sent.append((code, late))
+                i += 1
+                step = next(it, None)
+                if step is None:
+                    break
+                off, ops, next_move, code = step
+                due = base + off
+                if due > horizon:
+                    break
+            if batch:
+                try:
+                    send(batch)
+                except Exception:
+                    pass
+                share = (clock() - now) / len(sent)
+                for c, late in sent:
+                    record(names[c], late, share)
+            tel.dropped = dropped
+            tel.done = done + i
+        self.dropped = dropped
+        self.max_late = max_late
+        return ok
+
+# -----------------------------
+# Multi-Macro Playback
+# -----------------------------
+#Several recordings on one timeline, each with its own start offset, speed and repeat count.
+#merge_tracks() k-way merges them lazily by absolute time (heapq.merge over one generator per
+#track), so one thread injects everything without building the merged list, and events due
+#at the same moment always go out in track order.
+@dataclass(frozen=True)
+class Track:
+    """One macro in a multi-macro playback."""
+    plan: PlaybackPlan
+    offset_s: float = 0.0       #start, in seconds after playback begins
+    speed: float = 1.0
+    repeats: int = 1            #0 = forever
+    name: str = ""
+
+    def end_s(self) -> float:
+        """When the track's last event is due (inf if it repeats forever)."""
+        return self.offset_s + self.plan.span * self.repeats if self.repeats else float("inf")
+
+def _track_steps(track: Track):
+    steps, span = track.plan.steps, track.plan.span
+    repeats = track.repeats if track.repeats or span > 0 else 1
+    base = track.offset_s
+    r = 0
+    while not repeats or r < repeats:
+        for off, ops, next_move, code in steps:
+            yield (base + off, ops, base + next_move if next_move is not None else None, code)
+        base += span
+        r += 1
+
+def merge_tracks(tracks):
+    """Steps of every track in absolute time order (offsets from playback start), lazily."""
+    return heapq.merge(*(_track_steps(t) for t in tracks), key=_event_time)
+
+def retime_track(track: Track, key_repeat=None) -> Track:
+    """track with its speed (and key auto-repeat, as (delay_s, interval_s)) applied to the plan."""
+    plan = retime_plan(track.plan, track.speed)
+    if key_repeat is not None:
+        plan = expand_key_repeat(plan, *key_repeat)
+    return Track(plan, track.offset_s, 1.0, track.repeats, track.name)
+
+# -----------------------------
+# Jobs
+# -----------------------------
+@dataclass(frozen=True)
+class ActionJob:
+    """One of several auto-actions run together: spam a key, or click (at a fixed spot or the cursor).
+
+    ops is the pre-resolved injection batch for one tick (see job_from_dict)."""
+    mode: str = "key"
+    key: str = "r"
+    button: str = "left"
+    click_count: int = 1
+    target_fixed: bool = False
+    x: int = 0
+    y: int = 0
+    interval_s: float = 0.05
+    ops: tuple = ()
+
+    def describe(self) -> str:
+        if self.mode == "key":
+            return f"key {self.key}"
+        what = f"{'double' if self.click_count == 2 else 'click'} {self.button}"
+        return f"{what} @ {self.x},{self.y}" if self.target_fixed else f"{what} @ cursor"
+
+def job_from_dict(d: dict) -> ActionJob:
+    """ActionJob from its settings.json form; raises ValueError on bad fields."""
+    mode = d.get("mode", "key")
+    if mode not in ("key", "mouse"):
+        raise ValueError(f"Unknown job mode {mode!r}")
+    interval_s = max(0.0005, float(d.get("interval_ms", 50)) / 1000.0)
+    if mode == "key":
+        key = str(d.get("key", "")).strip().lower()
+        if not key:
+            raise ValueError("Key job without a key")
+        k = str_to_key(key)
+        ops = ((OP_PRESS, k), (OP_RELEASE, k)) if k is not None else ((OP_TYPE, key[:1]),)
+        return ActionJob(mode=mode, key=key, interval_s=interval_s, ops=ops)
+    button = d.get("button", "left")
+    count = 2 if d.get("double") else 1
+    fixed = d.get("target", "cursor") == "fixed"
+    x, y = int(d.get("x", 0)), int(d.get("y", 0))
+    click = (OP_CLICK, resolve_button(button), count)
+    ops = ((OP_MOVE, x, y), click) if fixed else (click,)
+    return ActionJob(mode=mode, button=button, click_count=count, target_fixed=fixed, x=x, y=y,
+                     interval_s=interval_s, ops=ops)
+
+def job_to_dict(job: ActionJob) -> dict:
+    d = {"mode": job.mode, "interval_ms": round(job.interval_s * 1000.0, 3)}
+    if job.mode == "key":
+        d["key"] = job.key
+    else:
+        d.update(button=job.button, double=job.click_count == 2,
+                 target="fixed" if job.target_fixed else "cursor", x=job.x, y=job.y)
+    return d
+
+class JobScheduler:
+    """Runs any number of ActionJobs from one dispatch thread.
+
+    A heap holds (deadline, seq, job id, job); the thread sleeps until the earliest
+    deadline, pops every job due within window_s and sends their ops as one batch.
+    Jobs can be added/removed while running (removed entries are skipped when popped)."""
+
+    def __init__(self, send, policy: str = "skip", window_s: float = 0.001, clock=time.perf_counter):
+        self.send = send
+        self.policy = policy
+        self.window_s = window_s
+        self.clock = clock
+        self.telemetry = Telemetry()
+        self._jobs = {}
+        self._heap = []
+        self._seq = itertools.count()
+        self._next_id = itertools.count(1)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def jobs(self) -> list:
+        """[(job id, ActionJob)] in the order they were added."""
+        with self._lock:
+            return sorted(self._jobs.items())
+
+    def add(self, job: ActionJob) -> int:
+        with self._lock:
+            job_id = next(self._next_id)
+            self._jobs[job_id] = job
+            if self.running:
+                heapq.heappush(self._heap, (self.clock(), next(self._seq), job_id, job))
+        self._wake.set()
+        return job_id
+
+    def remove(self, job_id: int) -> bool:
+        with self._lock:
+            found = self._jobs.pop(job_id, None) is not None
+        self._wake.set()
+        return found
+
+    def set_jobs(self, jobs):
+        """Replace every job (e.g. from settings)."""
+        with self._lock:
+            self._jobs.clear()
+            self._heap.clear()
+        for job in jobs:
+            self.add(job)
+
+    def start(self, telemetry: Telemetry = None) -> bool:
+        if self.running:
+            return False
+        if telemetry is not None:
+            self.telemetry = telemetry
+        now = self.clock()
+        with self._lock:
+            #All jobs fire once right away, then keep their own phase
+            self._heap = [(now, next(self._seq), job_id, job) for job_id, job in self._jobs.items()]
+            heapq.heapify(self._heap)
+        #A fresh stop event per run: a thread from an earlier run that outlived stop()'s join
+        #(e.g. stuck in send) keeps its own set event and exits instead of being revived
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, args=(self._stop,), daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self, timeout: float = 1.0) -> bool:
+        """Stop the dispatch thread; False if it was still busy (e.g. in send) after timeout."""
+        self._stop.set()
+        self._wake.set()
+        t, self._thread = self._thread, None
+        if t is not None and t is not threading.current_thread():
+            t.join(timeout)
+            return not t.is_alive()
+        return True
+
+    def _loop(self, stop: threading.Event):
+        heap, lock, clock = self._heap, self._lock, self.clock
+        stopped = stop.is_set
+        woken = self._wake.is_set
+        tel = self.telemetry
+        while not stopped():
+            self._wake.clear()
+            with lock:
+                due = heap[0][0] if heap else None
+            if due is None:
+                self._wake.wait(0.5)
+                continue
+            remaining = due - clock()
+            if remaining > 0.02:
+                #Coarse wait that an add/remove can interrupt; the last stretch is slept precisely
+                self._wake.wait(remaining - 0.015)
+                continue
+            if not sleep_until(due, woken):
+                continue
+
+            now = clock()
+            horizon = now + self.window_s
+            batch = []
+            fired = []
+            with lock:
+                while heap and heap[0][0] <= horizon:
+                    due, _, job_id, job = heapq.heappop(heap)
+                    if self._jobs.get(job_id) is not job:
+                        continue        #removed (or replaced) since it was queued
+                    batch.extend(job.ops)
+                    fired.append((job.mode, now - due))
+                    nxt, missed = advance_deadline(due, job.interval_s, now, self.policy)
+                    tel.missed += missed
+                    heapq.heappush(heap, (nxt, next(self._seq), job_id, job))
+            if not batch:
+                continue
+            try:
+                self.send(batch)
+            except Exception:
+                pass
+            share = (clock() - now) / len(fired)
+            for mode, late in fired:
+                tel.record("key" if mode == "key" else "click", late, share)
+        tel.finish()
+
+# -----------------------------
+# Hotkeys
+# -----------------------------
+#(settings key, action, label, default); "" = unbound. Values are chords like "ctrl+shift+f7".
+HOTKEY_SLOTS = (
+    ("action_hotkey", "action", "Action Start/Stop", "f7"),
+    ("record_hotkey", "record", "Record Start/Stop", "f8"),
+    ("play_hotkey", "play", "Playback", "f9"),
+    ("stop_play_hotkey", "stop_play", "Stop Playback", ""),
+    ("jobs_hotkey", "jobs", "Jobs Start/Stop", ""),
+    ("stop_all_hotkey", "stop_all", "Stop Everything", ""),
+)
+
+MOD_CTRL, MOD_SHIFT, MOD_ALT, MOD_CMD = 1, 2, 4, 8
+MODIFIER_BITS = {
+    "ctrl": MOD_CTRL, "ctrl_l": MOD_CTRL, "ctrl_r": MOD_CTRL,
+    "shift": MOD_SHIFT, "shift_l": MOD_SHIFT, "shift_r": MOD_SHIFT,
+    "alt": MOD_ALT, "alt_l": MOD_ALT, "alt_r": MOD_ALT, "alt_gr": MOD_ALT,
+    "cmd": MOD_CMD, "cmd_l": MOD_CMD, "cmd_r": MOD_CMD,
+}
+_MOD_ORDER = ((MOD_CTRL, "ctrl"), (MOD_SHIFT, "shift"), (MOD_ALT, "alt"), (MOD_CMD, "cmd"))
+_KEY_ALIASES = {"control": "ctrl", "win": "cmd", "super": "cmd", "option": "alt",
+                "return": "enter", "escape": "esc", "pageup": "page_up", "pagedown": "page_down"}
+
+def hotkey_name(k) -> str:
+    """Normalized name of a pynput key for hotkey matching."""
+    vk = getattr(k, "vk", None)
+    char = getattr(k, "char", None)
+    if vk is not None and (char is None or not char.isprintable()) and (0x30 <= vk <= 0x39 or 0x41 <= vk <= 0x5A):
+        #Windows reports ctrl+letter as a control character; the virtual key still names the letter
+        return chr(vk).lower()
+    name = key_to_str(k)
+    return _KEY_ALIASES.get(name, name)
+
+def parse_hotkey(s: str):
+    """'ctrl+shift+f7' -> (modifier mask, 'f7'); None for an empty or modifier-only string."""
+    mods = 0
+    key = None
+    for part in (s or "").lower().replace(" ", "").split("+"):
+        if not part:
+            continue
+        part = _KEY_ALIASES.get(part, part)
+        bit = MODIFIER_BITS.get(part)
+        if bit:
+            mods |= bit
+        elif key is None:
+            key = part
+        else:
+            raise ValueError(f"Hotkey {s!r} has more than one non-modifier key")
+    return (mods, key) if key else None
+
+def format_hotkey(mods: int, key: str) -> str:
+    return "+".join([name for bit, name in _MOD_ORDER if mods & bit] + [key])
+
+class HotkeyDispatcher:
+    """Global-hotkey matcher for the always-on keyboard listener.
+
+    set_bindings() builds a {(modifier mask, key name): action} table once per change;
+    on_press() is a cached name lookup plus one dict hit per keystroke."""
+
+    _NAME_CACHE_MAX = 512
+
+    def __init__(self):
+        self.table = {}
+        self.bindings = {}
+        self._names = {}
+        self._held = {}         #held modifier key name -> bit
+        self.mods = 0
+
+    def set_bindings(self, bindings: dict) -> bool:
+        """bindings: {action: hotkey string}. Returns False (and keeps the table) if nothing changed."""
+        if bindings == self.bindings:
+            return False
+        table = {}
+        for action, text in bindings.items():
+            try:
+                parsed = parse_hotkey(text)
+            except ValueError as e:
+                print(f"[WARN] {e}")
+                continue
+            if parsed is not None:
+                table.setdefault(parsed, action)
+        self.table = table
+        self.bindings = dict(bindings)
+        return True
+
+    def name(self, k) -> str:
+        """Cached hotkey_name(k)."""
+        try:
+            name = self._names.get(k)
+        except TypeError:
+            return hotkey_name(k)
+        if name is None:
+            name = hotkey_name(k)
+            if len(self._names) >= self._NAME_CACHE_MAX:
+                self._names.clear()
+            self._names[k] = name
+        return name
+
+    def on_press(self, k):
+        """Action name for this keystroke, or None. Tracks modifier state."""
+        name = self.name(k)
+        bit = MODIFIER_BITS.get(name)
+        if bit:
+            self._held[name] = bit
+            self.mods |= bit
+            return None
+        return self.table.get((self.mods, name))
+
+    def on_release(self, k):
+        name = self.name(k)
+        if self._held.pop(name, None):
+            mods = 0
+            for bit in self._held.values():
+                mods |= bit
+            self.mods = mods
+
+# -----------------------------
+# Settings
+# -----------------------------
+def hotkey_bindings(cfg: ActionConfig) -> dict:
+    """{action: hotkey string} for HotkeyDispatcher.set_bindings."""
+    bindings = {action: getattr(cfg, key) for key, action, _, _ in HOTKEY_SLOTS}
+    for name, text in cfg.library_hotkeys:
+        bindings[LIBRARY_ACTION + name] = text
+    return bindings
+
+def interval_from_settings(d: dict) -> float:
+    #Sum all 4 boxes; any can be 0
+    h = max(0, int(d.get("int_hours", 0)))
+    m = max(0, int(d.get("int_minutes", 0)))
+    s = max(0, int(d.get("int_seconds", 0)))
+    ms = max(0, int(d.get("int_millis", 50)))
+    total = (h * 3600.0) + (m * 60.0) + s + (ms / 1000.0)
+    #Safety minimum sleep
+    return max(0.0005, total)
+
+def config_from_settings(d: dict, base: ActionConfig = None) -> ActionConfig:
+    """Build an ActionConfig from a settings.json-style dict; bad or missing fields keep base's value."""
+    base = base or ActionConfig()
+    g = d.get
+
+    def num(key, fallback):
+        try:
+            return int(g(key, fallback))
+        except Exception:
+            return fallback
+
+    try:
+        interval_s = interval_from_settings(d)
+    except Exception:
+        interval_s = base.interval_s
+    spam_key = str(g("spam_key", base.spam_key)).strip().lower()
+    policy = g("catchup_policy", base.catchup_policy)
+    try:
+        speed = float(g("playback_speed", base.playback_speed))
+    except Exception:
+        speed = base.playback_speed
+    dist, path = g("nudge_dist", base.nudge_dist), g("nudge_path", base.nudge_path)
+    key_repeat = g("key_repeat", base.key_repeat)
+    lib_keys = g("library_hotkeys")
+    if isinstance(lib_keys, dict):
+        lib_keys = tuple(sorted((str(n), str(k).strip().lower()) for n, k in lib_keys.items() if k))
+    else:
+        lib_keys = base.library_hotkeys
+    return ActionConfig(
+        mode=g("mode", base.mode),
+        spam_key=spam_key,
+        spam_key_obj=str_to_key(spam_key),
+        click_button=resolve_button(g("click_button", "left")),
+        click_count=2 if g("click_type") == "double" else 1,
+        target_fixed=(g("target_mode") == "fixed"),
+        fixed_x=num("fixed_x", base.fixed_x),
+        fixed_y=num("fixed_y", base.fixed_y),
+        nudge_on=(g("nudge_mode") == "on"),
+        nudge_x=num("nudge_x", base.nudge_x),
+        nudge_y=num("nudge_y", base.nudge_y),
+        nudge_random=bool(g("nudge_random", base.nudge_random)),
+        nudge_dist=dist if dist in NUDGE_DISTS else base.nudge_dist,
+        nudge_path=path if path in NUDGE_PATHS else base.nudge_path,
+        nudge_move_s=max(0, num("nudge_move_ms", int(base.nudge_move_s * 1000))) / 1000.0,
+        nudge_rate_hz=clamp(num("nudge_rate_hz", int(base.nudge_rate_hz)), 10, 2000),
+        interval_s=interval_s,
+        catchup_policy=policy if policy in CATCHUP_POLICIES else "skip",
+        **{key: str(g(key, getattr(base, key))).strip().lower() for key, _, _, _ in HOTKEY_SLOTS},
+        repeat_count=max(0, num("repeat_count", base.repeat_count)),
+        lateness_s=max(0, num("playback_lateness_ms", int(base.lateness_s * 1000))) / 1000.0,
+        batch_window_s=max(0, num("batch_window_ms", int(base.batch_window_s * 1000))) / 1000.0,
+        playback_speed=speed if speed > 0 else base.playback_speed,
+        trim_gaps_s=max(0, num("trim_gaps_ms", int(base.trim_gaps_s * 1000))) / 1000.0,
+        max_speed=bool(g("max_speed", base.max_speed)),
+        key_repeat=key_repeat if key_repeat in KEY_REPEAT_MODES else base.key_repeat,
+        key_repeat_delay_s=max(0, num("key_repeat_delay_ms", int(base.key_repeat_delay_s * 1000))) / 1000.0,
+        key_repeat_hz=clamp(num("key_repeat_hz", int(base.key_repeat_hz)), 1, 100),
+        record_to_disk=bool(g("record_to_disk", base.record_to_disk)),
+        simplify_paths=bool(g("simplify_paths", base.simplify_paths)),
+        simplify_px=max(0, num("simplify_px", base.simplify_px)),
+        simplify_ms=max(0, num("simplify_ms", base.simplify_ms)),
+        library_hotkeys=lib_keys,
+    )
+
+class SettingsStore:
+    """settings.json reader/writer.
+
+    Writes go to a temp file that replaces settings.json in one rename (the previous
+    file is kept as settings.json.bak), and only when the serialized text changed.
+    schedule() hands the dict to a background thread that writes the latest one once
+    changes stop for delay_s; load() falls back to the .bak copy if settings.json is
+    missing or unreadable."""
+
+    def __init__(self, path=None, delay_s: float = 1.0):
+        self.path = Path(path) if path is not None else get_settings_path()
+        self.backup_path = self.path.with_name(self.path.name + ".bak")
+        self.delay_s = delay_s
+        self._last_text = None
+        self._primary_ok = True     #False: don't rotate a corrupt settings.json into .bak
+        self._pending = None
+        self._pending_lock = threading.Lock()
+        self._lock = threading.Lock()       #held while writing
+        self._wake = threading.Event()
+        self._closing = threading.Event()
+        self._thread = None
+
+    def load(self) -> dict:
+        for path in (self.path, self.backup_path):
+            if not path.exists():
+                continue
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    text = f.read()
+                data = json.loads(text)
+                if not isinstance(data, dict):
+                    raise ValueError("not a JSON object")
+            except Exception as e:
+                print(f"[WARN] Failed to load settings from {path}: {e}")
+                if path == self.path:
+                    self._primary_ok = False
+                continue
+            if path == self.path:
+                self._last_text = text
+            return data
+        return {}
+
+    def save(self, data: dict) -> bool:
+        """Write now (if changed). Returns True if the file was written."""
+        try:
+            text = json.dumps(data, ensure_ascii=False, indent=2)
+        except Exception as e:
+            print(f"[WARN] Failed to serialize settings: {e}")
+            return False
+        with self._lock:
+            if text == self._last_text:
+                return False
+            try:
+                self._write(text)
+            except Exception as e:
+                print(f"[WARN] Failed to save settings to {self.path}: {e}")
+                return False
+            self._last_text = text
+            return True
+
+    def _write(self, text: str):
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        if self._primary_ok and self.path.exists():
+            os.replace(self.path, self.backup_path)
+        os.replace(tmp, self.path)
+        self._primary_ok = True
+
+    def schedule(self, data: dict):
+        """Queue data for the background writer; only the newest queued dict is written."""
+        with self._pending_lock:
+            self._pending = data
+        self._wake.set()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._writer_loop, daemon=True)
+            self._thread.start()
+
+    def _writer_loop(self):
+        while not self._closing.is_set():
+            self._wake.wait()
+            #Coalesce: keep waiting while changes keep coming
+            while not self._closing.is_set():
+                self._wake.clear()
+                if not self._wake.wait(self.delay_s):
+                    break
+            with self._pending_lock:
+                data, self._pending = self._pending, None
+            if data is not None:
+                self.save(data)
+
+    def flush(self, data: dict = None):
+        """Stop the background writer and write data (or whatever is still queued)."""
+        self._closing.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        with self._pending_lock:
+            if data is None:
+                data = self._pending
+            self._pending = None
+        if data is not None:
+            self.save(data)
+
+def load_settings_file() -> dict:
+    return SettingsStore().load()
+
+def save_settings_file(data: dict):
+    SettingsStore().save(data)
+
+# -----------------------------
+# Macro Library
+# -----------------------------
+#A folder of macro files plus index.json (name, duration, event count, content hash,
+#mtime/size and meta per file), so listing hundreds of macros only stats them.
+#Decoded events are cached on disk as raw column arrays (.cache/<hash>.evs, read back
+#without parsing), and parsed macros with their compiled plans are kept in an
+#in-memory LRU capped at cache_bytes (estimated).
+LIBRARY_DIR = "library"
+LIBRARY_INDEX = "index.json"
+LIBRARY_CACHE_DIR = ".cache"
+LIBRARY_EXTS = (MACRO_EXT, ".json")
+LIBRARY_ACTION = "library:"     #hotkey action prefix, followed by the macro name
+EVS_MAGIC = b"MTEVS\x00\x00\x01"
+EVS_HEADER = struct.Struct("<QI")   #event count, key-table length
+PLAN_STEP_BYTES = 240           #rough memory per compiled step (tuples + resolved key objects)
+_EVS_COLUMNS = ("types", "times", "xs", "ys", "buttons", "dxs", "dys", "key_ids")
+
+def get_library_dir() -> Path:
+    return get_config_dir() / LIBRARY_DIR
+
+def file_hash(path) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def write_event_cache(path, store: EventStore):
+    """Dump a store's columns as-is (native byte order; the cache never leaves this machine)."""
+    keys = json.dumps(store.keys, ensure_ascii=False).encode("utf-8")
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(EVS_MAGIC + EVS_HEADER.pack(len(store), len(keys)) + keys)
+        for name in _EVS_COLUMNS:
+            getattr(store, name).tofile(f)
+    os.replace(tmp, path)
+
+def read_event_cache(path) -> EventStore:
+    with open(path, "rb") as f:
+        data = memoryview(f.read())
+    if bytes(data[:len(EVS_MAGIC)]) != EVS_MAGIC:
+        raise ValueError("Not an event cache file.")
+    n, key_len = EVS_HEADER.unpack_from(data, len(EVS_MAGIC))
+    pos = len(EVS_MAGIC) + EVS_HEADER.size
+    store = EventStore()
+    store.keys = json.loads(bytes(data[pos:pos + key_len]).decode("utf-8"))
+    store._key_index = {k: i for i, k in enumerate(store.keys)}
+    pos += key_len
+    for name in _EVS_COLUMNS:
+        col = getattr(store, name)
+        end = pos + n * col.itemsize
+        if end > len(data):
+            raise ValueError("Truncated event cache.")
+        col.frombytes(data[pos:end])
+        pos = end
+    return store
+
+class MacroLibrary:
+    """Macro folder with an index, an on-disk decoded-events cache and an in-memory LRU.
+
+    Macros are looked up by name (file stem) or file name. get() stats the file and
+    re-indexes it if it changed, so edits made outside the app are picked up."""
+
+    def __init__(self, root=None, cache_bytes: int = 64 << 20):
+        self.root = Path(root) if root else get_library_dir()
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.cache_dir = self.root / LIBRARY_CACHE_DIR
+        self.index_path = self.root / LIBRARY_INDEX
+        self.cache_bytes = cache_bytes
+        self.index = {}         #file name -> entry dict
+        self._names = {}        #macro name -> file name
+        self._lru = OrderedDict()   #content hash -> (events, plan, estimated bytes)
+        self._lru_bytes = 0
+        self.hits = self.misses = 0
+        self._lock = threading.RLock()
+        self._load_index()
+        self.refresh()
+
+    #Index
+    def _load_index(self):
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            entries = data.get("macros") if isinstance(data, dict) else None
+            if isinstance(entries, dict):
+                self.index = entries
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"[WARN] Rebuilding macro index {self.index_path}: {e}")
+
+    def _save_index(self):
+        tmp = self.index_path.with_name(self.index_path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "macros": self.index}, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, self.index_path)
+
+    def _index_file(self, path: Path, st) -> dict:
+        digest = file_hash(path)
+        old = self.index.get(path.name)
+        if old is not None and old.get("hash") == digest:
+            entry = dict(old, mtime=st.st_mtime, size=st.st_size)
+        elif is_macro_v2(path) and not is_unfinished_log(path):
+            #v2 headers carry the count and duration; no need to decode anything
+            mac = MappedMacro(path)
+            try:
+                entry = {"events": len(mac), "duration": mac.duration(), "meta": mac.meta}
+            finally:
+                mac.close()
+        else:
+            #v1 JSON (or an unfinished log) has to be parsed; keep the result in the disk cache
+            events, meta = load_macro_file(path)
+            store = self._to_store(events)
+            self._write_cache(digest, store)
+            entry = {"events": len(store), "duration": store.duration(), "meta": meta}
+        entry.update(name=path.stem, hash=digest, mtime=st.st_mtime, size=st.st_size)
+        return entry
+
+    def refresh(self) -> int:
+        """Sync the index with the folder; only new or changed files are read. Returns that count."""
+        with self._lock:
+            seen = {}
+            changed = 0
+            for path in sorted(self.root.iterdir()):
+                if path.suffix.lower() not in LIBRARY_EXTS or path.name == LIBRARY_INDEX or not path.is_file():
+                    continue
+                st = path.stat()
+                entry = self.index.get(path.name)
+                if entry is None or entry.get("mtime") != st.st_mtime or entry.get("size") != st.st_size:
+                    try:
+                        entry = self._index_file(path, st)
+                    except Exception as e:
+                        print(f"[WARN] Skipping macro {path}: {e}")
+                        continue
+                    changed += 1
+                seen[path.name] = entry
+            dirty = changed or seen.keys() != self.index.keys()
+            self.index = seen
+            self._rebuild_names()
+            if dirty:
+                self._save_index()
+                self._prune_cache()
+            return changed
+
+    def _rebuild_names(self):
+        names = {}
+        #v2 wins when name.mtm and name.json both exist
+        for fname in sorted(self.index, key=lambda n: not n.lower().endswith(MACRO_EXT)):
+            names.setdefault(self.index[fname]["name"], fname)
+        self._names = names
+
+    def _prune_cache(self):
+        if not self.cache_dir.is_dir():
+            return
+        live = {e["hash"] for e in self.index.values()}
+        for p in self.cache_dir.glob("*.evs"):
+            if p.stem not in live:
+                try:
+                    p.unlink()
+                except OSError:
+                    pass
+
+    def entries(self) -> list:
+        """Index entries sorted by name."""
+        with self._lock:
+            return sorted((dict(e, file=f) for f, e in self.index.items()), key=lambda e: e["name"].lower())
+
+    def names(self) -> list:
+        with self._lock:
+            return sorted(self._names, key=str.lower)
+
+    def _resolve(self, name: str) -> str:
+        fname = self._names.get(name)
+        if fname is None and name in self.index:
+            fname = name
+        if fname is None:
+            raise ValueError(f"No macro named {name!r} in {self.root}")
+        return fname
+
+    #Loading
+    @staticmethod
+    def _to_store(events) -> EventStore:
+        if isinstance(events, MappedMacro):
+            try:
+                return EventStore.from_rows(events, events.keys)
+            finally:
+                events.close()
+        return events
+
+    def _cache_path(self, digest: str) -> Path:
+        return self.cache_dir / f"{digest}.evs"
+
+    def _write_cache(self, digest: str, store: EventStore):
+        try:
+            self.cache_dir.mkdir(exist_ok=True)
+            write_event_cache(self._cache_path(digest), store)
+        except OSError as e:
+            print(f"[WARN] Could not write macro cache: {e}")
+
+    def _read(self, fname: str, entry: dict) -> EventStore:
+        digest = entry["hash"]
+        try:
+            return read_event_cache(self._cache_path(digest))
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"[WARN] Ignoring bad macro cache for {fname}: {e}")
+        events, _ = load_macro_file(self.root / fname)
+        store = self._to_store(events)
+        self._write_cache(digest, store)
+        return store
+
+    def get(self, name: str):
+        """(events, compiled PlaybackPlan, index entry) for a macro. Treat both as read-only."""
+        with self._lock:
+            fname = self._resolve(name)
+            path = self.root / fname
+            st = path.stat()
+            entry = self.index[fname]
+            if entry.get("mtime") != st.st_mtime or entry.get("size") != st.st_size:
+                entry = self.index[fname] = self._index_file(path, st)
+                self._save_index()
+            digest = entry["hash"]
+            hit = self._lru.get(digest)
+            if hit is not None:
+                self._lru.move_to_end(digest)
+                self.hits += 1
+                return hit[0], hit[1], entry
+            self.misses += 1
+            events = self._read(fname, entry)
+            plan = compile_plan(events)
+            self._remember(digest, events, plan)
+            return events, plan, entry
+
+    def _remember(self, digest: str, events: EventStore, plan: PlaybackPlan):
+        size = events.nbytes() + len(plan) * PLAN_STEP_BYTES
+        if size > self.cache_bytes:
+            return
+        self._lru[digest] = (events, plan, size)
+        self._lru_bytes += size
+        while self._lru_bytes > self.cache_bytes:
+            _, (_, _, old) = self._lru.popitem(last=False)
+            self._lru_bytes -= old
+
+    def set_cache_bytes(self, cache_bytes: int):
+        with self._lock:
+            self.cache_bytes = max(0, int(cache_bytes))
+            while self._lru and self._lru_bytes > self.cache_bytes:
+                _, (_, _, old) = self._lru.popitem(last=False)
+                self._lru_bytes -= old
+
+    def cache_report(self) -> str:
+        with self._lock:
+            return (f"{len(self._lru)} cached ({self._lru_bytes / (1 << 20):.1f}/{self.cache_bytes / (1 << 20):.0f} MB), "
+                    f"{self.hits} hits, {self.misses} misses")
+
+    #Adding macros
+    def save(self, name: str, events, meta: dict) -> dict:
+        """Write events into the library as name.mtm; returns the new index entry."""
+        name = (name or "").strip()
+        if not name or any(c in name for c in '\\/:*?"<>|') or name.startswith("."):
+            raise ValueError(f"Bad macro name {name!r}")
+        path = self.root / f"{name}{MACRO_EXT}"
+        save_macro_file(path, events, meta)
+        return self._add_path(path)
+
+    def add(self, src, name: str = None) -> dict:
+        """Copy a macro file into the library (keeping its format); returns the new index entry."""
+        src = Path(src)
+        suffix = src.suffix.lower()
+        if suffix not in LIBRARY_EXTS:
+            raise ValueError(f"Not a macro file: {src}")
+        path = self.root / f"{name or src.stem}{suffix}"
+        if path.resolve() != src.resolve():
+            shutil.copyfile(src, path)
+        return self._add_path(path)
+
+    def _add_path(self, path: Path) -> dict:
+        with self._lock:
+            entry = self.index[path.name] = self._index_file(path, path.stat())
+            self._rebuild_names()
+            self._save_index()
+            return dict(entry, file=path.name)
+
+    def remove(self, name: str):
+        with self._lock:
+            fname = self._resolve(name)
+            entry = self.index.pop(fname)
+            (self.root / fname).unlink(missing_ok=True)
+            self._rebuild_names()
+            self._save_index()
+            if not any(e["hash"] == entry["hash"] for e in self.index.values()):
+                hit = self._lru.pop(entry["hash"], None)
+                if hit is not None:
+                    self._lru_bytes -= hit[2]
+                self._cache_path(entry["hash"]).unlink(missing_ok=True)
+
+def library_from_settings(d: dict) -> MacroLibrary:
+    root = str(d.get("library_dir") or "").strip() or None
+    try:
+        cache_mb = max(0, int(d.get("library_cache_mb", 64)))
+    except Exception:
+        cache_mb = 64
+    return MacroLibrary(root, cache_mb << 20)
+
+# -----------------------------
+# Engine
+# -----------------------------
+class MacroEngine:
+    """Recording, playback and the auto-action loop, with no UI attached.
+
+    Frontends set `config` (an ActionConfig) and get progress through the
+    on_status(str) and on_active(bool) callbacks, which run on worker threads."""
+
+    def __init__(self, config: ActionConfig = None, kctl=None, mctl=None, on_status=None, on_active=None,
+                 backend: str = "auto", injector=None, library: MacroLibrary = None):
+        explicit = kctl is not None and mctl is not None
+        if not explicit:
+            default_k, default_m = make_controllers(backend)
+            kctl = kctl if kctl is not None else default_k
+            mctl = mctl if mctl is not None else default_m
+        if injector is None:
+            #Controllers passed in explicitly are used as-is (one call per op)
+            injector = ControllerInjector(kctl, mctl) if explicit else make_injector(backend, kctl, mctl)
+        self.backend = backend
+        self.kctl = kctl
+        self.mctl = mctl
+        self.injector = injector
+        self.config = config or ActionConfig()
+        self.on_status = on_status or (lambda msg: None)
+        self.on_active = on_active or (lambda active: None)
+
+        #Run flags
+        self.running_event = threading.Event()
+        self.playback_stop = threading.Event()
+        self.recording = False
+
+        #Recording data
+        self.record_events = EventStore()
+        self.record_start_time = 0.0
+        self._rec_log = None
+        self._rec_listeners = ()
+        self._recorder = None
+
+        #Loaded script (a Program), played instead of record_events when set
+        self.script = None
+
+        #Compiled plan for record_events: (events object, event count, plan), and retimed
+        #plans (speed/trim/key repeat settings) by id of the compiled plan: (plan, timing, retimed)
+        self._compiled = None
+        self._retime_cache = {}
+        #(store, px, ms) of the last simplify() result, so saving right after recording doesn't redo it
+        self._simplified = None
+
+        #Named macros (load_from_library); frontends set this
+        self.library = library
+        self._action_sched = None
+        self._playback_thread = None
+
+        #Counters for the current/last run (replaced at the start of each run)
+        self.telemetry = Telemetry()
+
+        #Several auto-actions at once, all on one dispatch thread
+        self.jobs = JobScheduler(self.injector.send)
+
+        #Out-of-process mode (use_worker): runs are forwarded to an InjectionWorker
+        self.worker = None
+        self._remote_jobs = False
+
+        #Calibrate the wait primitive now rather than on the first run
+        get_waiter()
+
+    def set_timer(self, backend: str = "auto", spin_us: float = -1) -> PreciseWaiter:
+        """Switch the wait backend / spin budget (here and in the worker process) and recalibrate."""
+        waiter = configure_waiter(backend, spin_us)
+        self._send("timer", (backend, spin_us))
+        return waiter
+
+    #Worker process
+    def use_worker(self, enabled: bool):
+        """Run playback, the action loop and jobs in a child process, or back in this one."""
+        if enabled == (self.worker is not None):
+            return
+        self.stop_playback()
+        if self.running_event.is_set():
+            self.stop_action()
+        self.stop_jobs()
+        if enabled:
+            self.worker = InjectionWorker(self.backend, lambda msg: self.on_status(msg),
+                                          lambda active: self.on_active(active),
+                                          self._worker_state, self._worker_exited)
+            w = get_waiter()
+            self.worker.send("timer", (w.backend, -1 if w.auto_spin else w.spin_s * 1e6))
+        else:
+            worker, self.worker = self.worker, None
+            worker.close()
+
+    def _send(self, cmd: str, arg=None) -> bool:
+        """Send to the worker, if any; False if there is none or it just died (see _worker_exited)."""
+        worker = self.worker
+        return worker is not None and worker.send(cmd, arg)
+
+    def _worker_state(self, action: bool, jobs: bool):
+        """InjectionWorker callback: the child's action loop or jobs started/stopped."""
+        was = self.running_event.is_set() or self._remote_jobs
+        if action:
+            self.running_event.set()
+        else:
+            self.running_event.clear()
+        self._remote_jobs = jobs
+        if was and not (action or jobs):
+            self.on_active(False)
+
+    def _worker_exited(self, worker):
+        """InjectionWorker callback: the child died or its pipe broke. Drop it and reset run state."""
+        if self.worker is not worker:
+            return
+        self.worker = None
+        self.running_event.clear()
+        self._remote_jobs = False
+        self.on_active(False)
+        self.on_status("Status: worker process exited (running in this process from now on)")
+
+    def sync_config(self):
+        """Forward the current config to the worker (for edits made while it runs)."""
+        self._send("config", self.config)
+
+    def jobs_changed(self):
+        """Forward the job list to the worker if its jobs are running."""
+        if self._remote_jobs:
+            self._send("jobs", [job_to_dict(job) for _, job in self.jobs.jobs()])
+
+    @property
+    def jobs_running(self) -> bool:
+        return self._remote_jobs if self.worker is not None else self.jobs.running
+
+    #Auto action
+    def start_action(self) -> bool:
+        if self.running_event.is_set():
+            return False
+        self.running_event.set()
+        worker = self.worker
+        if worker is not None:
+            self.sync_config()
+            if not worker.send("start_action"):
+                return False
+            self.telemetry = worker.telemetry
+        else:
+            t = threading.Thread(target=self.run_action_loop, daemon=True)
+            t.start()
+        self.on_active(True)
+        return True
+
+    def stop_action(self):
+        self.running_event.clear()
+        self._send("stop_action")
+        self.on_active(False)
+
+    def _stream_path(self, points, dt: float, stopped) -> bool:
+        """Send path samples dt apart (skipping repeats); False if stopped part way."""
+        send = self.injector.send
+        start = time.perf_counter()
+        last = None
+        for i, (x, y) in enumerate(points):
+            if (x, y) == last:
+                continue
+            if i and not sleep_until(start + i * dt, stopped):
+                return False
+            try:
+                send(((OP_MOVE, x, y),))
+            except Exception:
+                pass
+            last = (x, y)
+        #The click goes out one sample after the last move instead of after a fixed settle sleep
+        return sleep_until(start + len(points) * dt, stopped)
+
+    def run_action_loop(self, max_ticks: int = 0):
+        """Blocking action loop; runs until running_event is cleared (or max_ticks actions)."""
+        cfg = self.config
+        sched = DeadlineScheduler(cfg.interval_s, policy=cfg.catchup_policy)
+        self._action_sched = sched
+        tel = self.telemetry = Telemetry("action", sched.target_rate)
+        clock = sched.clock
+        last_report = sched.started
+        mode_label = "Key" if cfg.mode == "key" else "Mouse"
+        stopped = lambda: not self.running_event.is_set()
+
+        send = self.injector.send
+        human, human_cfg, last_xy = None, None, None
+
+        while sched.wait(stopped):
+            #One attribute read per tick; frontends swap in a new snapshot on edits
+            cfg = self.config
+            #The whole tick goes out as one batch (one SendInput/XTest flush on native backends)
+            if cfg.mode == "key":
+                k = cfg.spam_key_obj
+                if k is None:
+                    ops = ((OP_TYPE, cfg.spam_key[:1]),) if cfg.spam_key else ()
+                else:
+                    ops = ((OP_PRESS, k), (OP_RELEASE, k))
+
+            else:
+                if cfg.target_fixed:
+                    base_x, base_y = cfg.fixed_x, cfg.fixed_y
+                else:
+                    try:
+                        base_x, base_y = self.mctl.position
+                    except Exception:
+                        base_x, base_y = 0, 0
+                click = (OP_CLICK, cfg.click_button, cfg.click_count)
+                if cfg.nudge_on:
+                    if cfg is not human_cfg:
+                        human, human_cfg = humanizer_for(cfg), cfg
+                    dx, dy = human.offset()
+                    nx, ny = base_x + dx, base_y + dy
+                    if human.streams():
+                        #Start where the last click left the cursor (fixed target) or where it is now
+                        sx, sy = last_xy if cfg.target_fixed and last_xy else (base_x, base_y)
+                        path = human.path(sx, sy, nx, ny, max_s=cfg.interval_s / 2)
+                        if not self._stream_path(path, human.sample_s, stopped):
+                            break
+                        ops = (click,)
+                    else:
+                        ops = ((OP_MOVE, nx, ny), click)
+                    last_xy = (nx, ny)
+                else:
+                    ops = ((OP_MOVE, base_x, base_y), click)
+
+            c0 = clock()
+            try:
+                send(ops)
+            except Exception:
+                pass
+            call_s = clock() - c0
+
+            tel.record("key" if cfg.mode == "key" else "click", sched.late, call_s)
+            tel.missed = sched.missed
+
+            if max_ticks and sched.ticks >= max_ticks:
+                self.running_event.clear()
+                break
+
+            #Pick up interval edits while running, and report the achieved rate about once a second
+            sched.set_interval(cfg.interval_s)
+            now = sched.clock()
+            if now - last_report >= 1.0 and self.running_event.is_set():
+                last_report = now
+                self.on_status(f"Status: RUNNING ({mode_label}) {sched.rate_report()}")
+
+        tel.target_rate = sched.target_rate
+        tel.finish()
+        if sched.ticks:
+            self.on_status(f"Status: IDLE (last run {sched.rate_report()})")
+
+    #Jobs
+    def start_jobs(self) -> bool:
+        """Start every job on the scheduler thread (catch-up policy/batch window from config)."""
+        jobs = self.jobs.jobs()
+        if not jobs or self.jobs_running:
+            return False
+        worker = self.worker
+        if worker is not None:
+            self._remote_jobs = True
+            self.sync_config()
+            self.jobs_changed()
+            if not worker.send("start_jobs"):
+                return False
+            self.telemetry = worker.telemetry
+            self.on_active(True)
+            return True
+        cfg = self.config
+        self.jobs.policy = cfg.catchup_policy
+        self.jobs.window_s = cfg.batch_window_s
+        self.telemetry = Telemetry("jobs", sum(1.0 / job.interval_s for _, job in jobs))
+        self.jobs.start(self.telemetry)
+        self.on_status(f"Status: RUNNING {len(jobs)} job(s)")
+        self.on_active(True)
+        return True
+
+    def stop_jobs(self):
+        if not self.jobs_running:
+            return
+        if self.worker is not None:
+            self._remote_jobs = False
+            self._send("stop_jobs")
+        else:
+            self.jobs.stop()
+        self.on_active(False)
+        self.on_status("Status: IDLE")
+
+    #Recording
+    def start_recording(self, log_path=None):
+        """Start the recording hooks. With log_path (or config.record_to_disk), events stream to a v2 log."""
+        if self.recording:
+            return
+        require_pynput()
+        cfg = self.config
+        if log_path is None and cfg.record_to_disk:
+            #Long sessions: events go straight to an append-only log in the config dir
+            log_dir = get_config_dir() / "recordings"
+            log_dir.mkdir(parents=True, exist_ok=True)
+            log_path = log_dir / f"rec-{datetime.now().strftime('%Y%m%d-%H%M%S')}{MACRO_EXT}"
+        if log_path is not None:
+            self._rec_log = MacroLogWriter(log_path, {"repeat_suggestion": cfg.repeat_count})
+            self._set_record_events(EventStore())
+            rec = self._rec_log
+        else:
+            self._set_record_events(EventStore())
+            rec = self.record_events
+        self.playback_stop.clear()
+        self.recording = True
+        self.record_start_time = time.perf_counter()
+        self.telemetry = Telemetry("record")
+        self.on_status("Status: RECORDING… (F8 to stop)")
+        clock = time.perf_counter
+
+        #Hooks only timestamp and hand raw fields to the recorder thread (see HookRing)
+        recorder = self._recorder = HookRecorder(rec, self.record_start_time, hotkey_bindings(cfg), self.telemetry)
+        recorder.start()
+        kring, mring = recorder.keyboard, recorder.mouse
+
+        #Keyboard
+        def on_press(k):
+            if self.recording:
+                kring.push(EV_KEY_DOWN, clock(), obj=k)
+
+        def on_release(k):
+            if self.recording:
+                kring.push(EV_KEY_UP, clock(), obj=k)
+
+        #Mouse
+        def on_move(x, y):
+            if self.recording:
+                mring.push(EV_MOVE, clock(), x, y)
+
+        def on_click(x, y, btn, pressed):
+            if self.recording:
+                mring.push(EV_CLICK_DOWN if pressed else EV_CLICK_UP, clock(), x, y, btn)
+
+        def on_scroll(x, y, dx, dy):
+            if self.recording:
+                mring.push(EV_SCROLL, clock(), x, y, None, dx, dy)
+
+        k_listener = keyboard.Listener(on_press=on_press, on_release=on_release)
+        m_listener = mouse.Listener(on_move=on_move, on_click=on_click, on_scroll=on_scroll)
+        k_listener.start()
+        m_listener.start()
+        self._rec_listeners = (k_listener, m_listener)
+
+    def stop_recording(self, simplify: bool = True) -> str:
+        """Stop the hooks; returns a status line. Raises if a streamed log can't be finalized.
+        simplify=False leaves the simplify pass (if configured) to the caller, e.g. off the UI thread."""
+        if not self.recording:
+            return ""
+        self.recording = False
+        for listener in self._rec_listeners:
+            try:
+                listener.stop()
+            except Exception:
+                pass
+        self._rec_listeners = ()
+        dropped = 0
+        if self._recorder is not None:
+            recorder, self._recorder = self._recorder, None
+            recorder.stop()
+            dropped = recorder.dropped
+        self.telemetry.finish()
+        lost = f", {dropped} dropped (hook buffer full)" if dropped else ""
+        if self.telemetry.key_repeats:
+            lost += f", {self.telemetry.key_repeats} key repeats folded"
+        if self._rec_log is not None:
+            log, self._rec_log = self._rec_log, None
+            log.close()
+            self._set_record_events(MappedMacro(log.path))
+            return f"Status: Recorded {len(self.record_events)} events{lost} → {log.path}"
+        n = len(self.record_events)
+        note = self.simplify() if simplify and self.config.simplify_paths else ""
+        return f"Status: Recorded {n} events ({self.record_events.nbytes() // 1024} KB){lost}{note}"
+
+    def clear_recording(self):
+        self._set_record_events(EventStore())
+
+    def simplify(self) -> str:
+        """Simplify the current recording's mouse paths (and fold key auto-repeat) in place; returns a short report."""
+        events = self.record_events
+        simplified, note = self.simplified(events)
+        self.replace_recording(events, simplified)
+        return note
+
+    def simplified(self, events):
+        """(simplified copy of events, short report). Reads only its argument, so it can run on
+        a background thread; hand the result to replace_recording() afterwards."""
+        cfg = self.config
+        done = self._simplified
+        if done is not None and done[0] is events and done[1:] == (cfg.simplify_px, cfg.simplify_ms):
+            return events, ""
+        if isinstance(events, MappedMacro):
+            events = EventStore.from_rows(events, events.keys)
+        events, repeats = collapse_key_repeats(events)
+        simplified, before, after = simplify_mouse_paths(events, cfg.simplify_px, cfg.simplify_ms)
+        self._simplified = (simplified, cfg.simplify_px, cfg.simplify_ms)
+        note = f", {repeats} key repeats folded" if repeats else ""
+        if not before:
+            return simplified, note
+        return simplified, f", moves {before} → {after} ({100.0 * (before - after) / before:.0f}% fewer){note}"
+
+    def replace_recording(self, old, new) -> bool:
+        """Swap new in for the recording, unless it is no longer old (replaced while new was made)."""
+        if self.record_events is not old or self.recording:
+            return False
+        if new is not old:
+            self._set_record_events(new)
+        return True
+
+    #Save / Load Macros
+    def save_macro(self, path, simplify: bool = True) -> str:
+        """Save the current recording (format from the extension); returns a status line."""
+        note = self.simplify() if simplify and self.config.simplify_paths else ""
+        self._release_file(path)
+        save_macro_file(path, self.record_events, {"repeat_suggestion": self.config.repeat_count})
+        return f"Status: Saved macro → {path}{note}"
+
+    def save_to_library(self, name: str, simplify: bool = True) -> str:
+        """Save the current recording into the library as name; returns a status line."""
+        if self.library is None:
+            raise RuntimeError("No macro library set up.")
+        note = self.simplify() if simplify and self.config.simplify_paths else ""
+        self._release_file(self.library.root / f"{name.strip()}{MACRO_EXT}")
+        entry = self.library.save(name, self.record_events, {"repeat_suggestion": self.config.repeat_count})
+        return f"Status: Saved macro → library '{entry['name']}'{note}"
+
+    def _release_file(self, path):
+        #Can't overwrite a file we're still reading from; pull it into memory first
+        events = self.record_events
+        if isinstance(events, MappedMacro) and os.path.abspath(events.path) == os.path.abspath(path):
+            self._set_record_events(EventStore.from_rows(events, events.keys))
+
+    def load_macro(self, path, recover: bool = False) -> dict:
+        """Load a v1/v2 macro or a script; returns its meta dict. An unfinished log loads
+        read-only unless recover is set, which finalizes it in place first."""
+        if str(path).lower().endswith(SCRIPT_EXT):
+            program = load_script(path, self.library)
+            self.load_program(program)
+            return {}
+        if recover and is_unfinished_log(path):
+            recover_macro_log(path)
+        events, meta = load_macro_file(path)
+        self._set_record_events(events)
+        return meta
+
+    def load_from_library(self, name: str) -> dict:
+        """Load a library macro (and its already-compiled plan); returns its meta dict."""
+        if self.library is None:
+            raise RuntimeError("No macro library set up.")
+        if self.recording:
+            #The recorder keeps appending to the current store; swapping it out would lose the take
+            raise RuntimeError("Stop recording before loading a macro.")
+        events, plan, entry = self.library.get(name)
+        self._set_record_events(events, plan)
+        return entry.get("meta") or {}
+
+    def load_program(self, program: Program):
+        """Play program (a script, or one compiled elsewhere) instead of a recording."""
+        self._set_record_events(EventStore())
+        self.script = program
+
+    def _set_record_events(self, events, plan: PlaybackPlan = None):
+        old = self.record_events
+        self.record_events = events
+        if self._simplified is not None and self._simplified[0] is not events:
+            self._simplified = None
+        self._compiled = (events, len(events), plan) if plan is not None else None
+        self._retime_cache.clear()
+        self.script = None
+        if isinstance(old, MappedMacro) and old is not events:
+            old.close()
+
+    #Playback
+    def play(self) -> bool:
+        """Start playback on a worker thread (stops the auto action first)."""
+        if not self.record_events and self.script is None:
+            return False
+        if self.running_event.is_set():
+            self.stop_action()
+        self.stop_jobs()
+        self.playback_stop.clear()
+        worker = self.worker
+        if worker is not None:
+            #The child retimes and repeats per the config sent along
+            source = self.script if self.script is not None else self._base_plan()
+            program = source if self.script is not None else program_for_plan(source)
+            self.sync_config()
+            if not worker.play(source, program):
+                return False
+            self.telemetry = worker.telemetry
+            return True
+        t = threading.Thread(target=self.playback_worker, daemon=True)
+        self._playback_thread = t
+        t.start()
+        return True
+
+    def stop_playback(self):
+        self.playback_stop.set()
+        self._send("stop_play")
+
+    def wait_playback(self, timeout: float = None):
+        t = self._playback_thread
+        if t is not None:
+            t.join(timeout)
+
+    def playback_worker(self):
+        self.on_status("Status: PLAYBACK…")
+        self.on_active(True)
+        tel = self.telemetry = Telemetry("playback")
+        vm = None
+        try:
+            cfg = self.config
+            vm = MacroVM(self.injector.send, tel, cfg, self.playback_stop.is_set, self._retimed)
+            #A recording (here, or sent to a worker process as a one-plan program) has a known size
+            plan = self._base_plan() if self.script is None else plan_of(self.script)
+            if plan is not None:
+                plan = self._retimed(plan)
+                if plan.span > 0:
+                    tel.target_rate = len(plan) / plan.span
+                tel.set_extent(len(plan), plan.span, cfg.repeat_count)
+            vm.run(self.get_program())
+        finally:
+            tel.finish()
+            max_late, dropped = (vm.max_late, vm.dropped) if vm is not None else (0.0, 0)
+            self.on_status(f"Status: IDLE (last playback: max late {max_late * 1000:.1f} ms, {dropped} moves coalesced)")
+            self.on_active(False)
+
+    #Several macros at once
+    def make_track(self, source, offset_s: float = 0.0, speed: float = 1.0, repeats: int = 1,
+                   from_library: bool = False) -> Track:
+        """Track for a macro file (v1/v2) or, with from_library, a library macro name."""
+        if speed <= 0:
+            raise ValueError("speed must be > 0")
+        if from_library:
+            if self.library is None:
+                raise RuntimeError("No macro library set up.")
+            _, plan, entry = self.library.get(source)
+            name = entry["name"]
+        else:
+            if str(source).lower().endswith(SCRIPT_EXT):
+                raise ValueError("scripts can't be played as tracks; use 'call' inside the script")
+            events, _ = load_macro_file(source)
+            try:
+                plan = compile_plan(events)
+            finally:
+                if isinstance(events, MappedMacro):
+                    events.close()
+            name = Path(source).stem
+        return Track(plan, max(0.0, offset_s), speed, max(0, repeats), name)
+
+    def play_tracks(self, tracks) -> bool:
+        """Play several Tracks at once on one timeline from one thread (stops the auto action first)."""
+        tracks = list(tracks)
+        if not tracks:
+            return False
+        if self.running_event.is_set():
+            self.stop_action()
+        self.stop_jobs()
+        self.playback_stop.clear()
+        worker = self.worker
+        if worker is not None:
+            self.sync_config()
+            if not worker.send("play_tracks", tracks):
+                return False
+            self.telemetry = worker.telemetry
+            return True
+        t = threading.Thread(target=self.tracks_worker, args=(tracks,), daemon=True)
+        self._playback_thread = t
+        t.start()
+        return True
+
+    def tracks_worker(self, tracks):
+        self.on_status(f"Status: PLAYBACK ({len(tracks)} macros)…")
+        self.on_active(True)
+        tel = self.telemetry = Telemetry("playback")
+        vm = None
+        try:
+            cfg = self.config
+            repeat = key_repeat_timing(cfg)
+            tracks = [retime_track(t, repeat) for t in tracks]
+            end = max(t.end_s() for t in tracks)
+            if end < float("inf"):
+                tel.total = sum(len(t.plan) * t.repeats for t in tracks)
+                tel.duration_s = end
+                if end > 0:
+                    tel.target_rate = tel.total / end
+            vm = MacroVM(self.injector.send, tel, cfg, self.playback_stop.is_set)
+            vm.run_tracks(tracks)
+        finally:
+            tel.finish()
+            max_late, dropped = (vm.max_late, vm.dropped) if vm is not None else (0.0, 0)
+            self.on_status(f"Status: IDLE (last playback: max late {max_late * 1000:.1f} ms, {dropped} moves coalesced)")
+            self.on_active(False)
+
+    def get_program(self) -> Program:
+        """What play() runs: the loaded script or the recording, repeated per config.repeat_count."""
+        body = self.script if self.script is not None else program_for_plan(self._base_plan())
+        return repeat_program(body, self.config.repeat_count)
+
+    def get_plan(self) -> PlaybackPlan:
+        """Compiled (and retimed) plan for the current recording, rebuilt only when it or the speed settings changed."""
+        return self._retimed(self._base_plan())
+
+    def _base_plan(self) -> PlaybackPlan:
+        events = self.record_events
+        compiled = self._compiled
+        if compiled is not None and compiled[0] is events and compiled[1] == len(events):
+            return compiled[2]
+        plan = compile_plan(events)
+        self._compiled = (events, len(events), plan)
+        return plan
+
+    def _retimed(self, plan: PlaybackPlan) -> PlaybackPlan:
+        cfg = self.config
+        repeat = key_repeat_timing(cfg)
+        timing = (cfg.playback_speed, cfg.trim_gaps_s, cfg.max_speed, repeat)
+        cache = self._retime_cache
+        hit = cache.get(id(plan))
+        if hit is not None and hit[0] is plan and hit[1] == timing:
+            return hit[2]
+        out = retime_plan(plan, *timing[:3])
+        if repeat is not None:
+            out = expand_key_repeat(out, *repeat)
+        if len(cache) >= 32:
+            cache.clear()
+        cache[id(plan)] = (plan, timing, out)
+        return out
+
+    #Cleanup
+    def shutdown(self):
+        self.running_event.clear()
+        self.playback_stop.set()
+        self.jobs.stop()
+        if self.recording:
+            self.stop_recording()
+        if self.worker is not None:
+            worker, self.worker = self.worker, None
+            worker.close()
+
+# -----------------------------
+# Injection Worker
+# -----------------------------
+#Out-of-process mode: playback, the action loop and jobs run in a child process with its
+#own interpreter, GIL and controllers, so Tk redraws, settings saves and the recording
+#hooks in the parent can't delay them. The parent sends (command, arg) tuples over a Pipe
+#(ActionConfig snapshots, compiled Programs, Tracks, job dicts); the child sends back status
+#lines, active flags, telemetry snapshots (every WORKER_TELEMETRY_S while busy) and a state
+#message whenever its action loop or jobs start or stop, so the parent's flags follow the child.
+WORKER_TELEMETRY_S = 0.25
+WORKER_PROGRAMS = 8     #compiled programs kept on both sides, so replays don't re-send them
+
+class RemoteTelemetry:
+    """Telemetry stand-in holding the latest snapshot from the worker process."""
+
+    def __init__(self):
+        self._snap = Telemetry().snapshot()
+
+    def update(self, snap: dict):
+        self._snap = snap
+
+    def snapshot(self) -> dict:
+        return dict(self._snap)
+
+    def progress(self) -> dict:
+        return self._snap["progress"]
+
+    def export(self, path):
+        export_snapshot(self.snapshot(), path)
+
+def _worker_main(conn, backend: str):
+    lock = threading.Lock()
+
+    def post(kind, arg):
+        #Status/active callbacks come from the engine's worker threads
+        with lock:
+            try:
+                conn.send((kind, arg))
+            except (OSError, EOFError):
+                pass
+
+    engine = MacroEngine(backend=backend, on_status=lambda msg: post("status", msg),
+                         on_active=lambda active: post("active", active))
+    programs = OrderedDict()
+    last_tel = None
+    was_running = False
+    seq = 0
+    last_state = (False, False)
+    while True:
+        try:
+            msg = conn.recv() if conn.poll(WORKER_TELEMETRY_S) else None
+        except (EOFError, OSError):
+            break
+        if msg is not None:
+            seq += 1
+            cmd, arg = msg
+            if cmd == "shutdown":
+                break
+            try:
+                if cmd == "config":
+                    engine.config = arg
+                elif cmd == "program":
+                    token, program = arg
+                    programs[token] = program
+                    if len(programs) > WORKER_PROGRAMS:
+                        programs.popitem(last=False)
+                elif cmd == "play":
+                    engine.stop_playback()
+                    engine.wait_playback(1.0)
+                    programs.move_to_end(arg)
+                    engine.load_program(programs[arg])
+                    engine.play()
+                elif cmd == "play_tracks":
+                    engine.stop_playback()
+                    engine.wait_playback(1.0)
+                    engine.play_tracks(arg)
+                elif cmd == "stop_play":
+                    engine.stop_playback()
+                elif cmd == "start_action":
+                    engine.start_action()
+                elif cmd == "stop_action":
+                    engine.stop_action()
+                elif cmd == "jobs":
+                    engine.jobs.set_jobs([job_from_dict(d) for d in arg])
+                elif cmd == "start_jobs":
+                    engine.start_jobs()
+                elif cmd == "stop_jobs":
+                    engine.stop_jobs()
+                elif cmd == "timer":
+                    configure_waiter(*arg)
+            except Exception as e:
+                post("status", f"Status: worker error ({e})")
+        #Tagged with the commands handled so far; the parent ignores it if it has sent more since
+        state = (engine.running_event.is_set(), engine.jobs_running)
+        if state != last_state:
+            post("state", (seq,) + state)
+            last_state = state
+        tel = engine.telemetry
+        running = tel.ended is None and tel.kind != "idle"
+        if tel is not last_tel or running or was_running:
+            post("telemetry", tel.snapshot())
+            last_tel = tel
+            was_running = running
+    engine.shutdown()
+
+class InjectionWorker:
+    """Parent-side handle on the worker process (see _worker_main)."""
+
+    def __init__(self, backend: str = "auto", on_status=None, on_active=None, on_state=None, on_exit=None):
+        self.on_status = on_status or (lambda msg: None)
+        self.on_active = on_active or (lambda active: None)
+        self.on_state = on_state or (lambda action, jobs: None)
+        self.on_exit = on_exit or (lambda worker: None)
+        self.telemetry = RemoteTelemetry()
+        #Spawn, not fork: the parent has Tk and listener threads that must not be copied
+        ctx = multiprocessing.get_context("spawn")
+        self._conn, child = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child, backend), daemon=True)
+        self.process.start()
+        child.close()
+        self._lock = threading.Lock()
+        self._programs = OrderedDict()      #token -> program source, mirrors the child's cache
+        self._sent = 0
+        self._closing = False
+        self._exited = False
+        self._reader = threading.Thread(target=self._read_loop, daemon=True)
+        self._reader.start()
+
+    def send(self, cmd: str, arg=None) -> bool:
+        """False (after on_exit) if the pipe is broken, instead of raising."""
+        try:
+            with self._lock:
+                self._conn.send((cmd, arg))
+                self._sent += 1
+        except (OSError, EOFError, ValueError):
+            self._exit()
+            return False
+        return True
+
+    def play(self, source, program: Program):
+        """Play program; source (the script or compiled plan it came from) keys the cache.
+        False if the worker is gone."""
+        token = id(source)
+        cached = self._programs.get(token)
+        if cached is not source:
+            if not self.send("program", (token, program)):
+                return False
+            self._programs[token] = source
+            if len(self._programs) > WORKER_PROGRAMS:
+                self._programs.popitem(last=False)
+        self._programs.move_to_end(token)
+        return self.send("play", token)
+
+    def _read_loop(self):
+        while True:
+            try:
+                kind, arg = self._conn.recv()
+            except (EOFError, OSError):
+                break
+            if kind == "telemetry":
+                self.telemetry.update(arg)
+            elif kind == "status":
+                self.on_status(arg)
+            elif kind == "active":
+                self.on_active(arg)
+            elif kind == "state":
+                seq, action, jobs = arg
+                if seq == self._sent:
+                    self.on_state(action, jobs)
+        self._exit()
+
+    def _exit(self):
+        #Once, from the reader at EOF or from a failed send; not for an orderly close()
+        with self._lock:
+            if self._exited or self._closing:
+                return
+            self._exited = True
+        self.on_exit(self)
+
+    def close(self, timeout: float = 2.0):
+        self._closing = True
+        self.send("shutdown")
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+        self._conn.close()
@@ -0,0 +1,1186 @@
+import sys
+import time
+import threading
+from collections import deque
+from tkinter import Tk, Toplevel, StringVar, IntVar, DoubleVar, BooleanVar, ttk, messagebox, filedialog, simpledialog
+
+from macro_engine import (
+    PYNPUT_ERROR, CATCHUP_POLICIES, MACRO_EXT, HOTKEY_SLOTS, MODIFIER_BITS, keyboard, mouse, key_to_str,
+    HotkeyDispatcher, hotkey_bindings, hotkey_name, format_hotkey,
+    MacroEngine, MappedMacro, config_from_settings, format_telemetry, format_progress, job_from_dict, job_to_dict,
+    SettingsStore, LIBRARY_ACTION, library_from_settings, SCRIPT_EXT, WAIT_BACKENDS, NUDGE_DISTS, NUDGE_PATHS,
+    KEY_REPEAT_MODES, is_unfinished_log,
+)
+
+#The UI pump redraws status/progress about 30 times a second; the stats panel re-reads
+#the engine's full telemetry snapshot every STATS_REFRESH_MS
+UI_FRAME_MS = 33
+STATS_REFRESH_MS = 500
+
+# -----------------------------
+# Main App
+# -----------------------------
+class MacroTool:
+    def __init__(self, root: Tk):
+        self.root = root
+
+        #The taskbar/window title reflects Active/Idle
+        self._active = False
+        self._title_active = None
+        self._apply_active_title()
+
+        #Other threads (engine workers, hotkey listener) never touch Tk: they leave the latest
+        #status/active flag in these slots, or queue a call, and the UI pump picks them up
+        self._status_msg = "Status: IDLE"
+        self._ui_calls = deque()
+        self._frame = 0
+
+        #Hotkey work that can block (library loads, waiting for threads to stop) runs on this
+        #thread; the keyboard hook callback only queues it (slow hooks get unhooked on Windows)
+        self._hotkey_jobs = deque()
+        self._hotkey_wake = threading.Event()
+        threading.Thread(target=self._hotkey_worker, daemon=True).start()
+
+        self.root.attributes("-topmost", True)
+
+        #State
+        self.mode = StringVar(value="key")           # 'key' or 'mouse'
+        self.spam_key = StringVar(value="r")
+        self.status = StringVar(value="Status: IDLE")
+        self.stats_text = StringVar(value="No runs yet")
+        self.progress_text = StringVar(value="")
+
+        #Mouse click settings
+        self.click_button = StringVar(value="left")  #left/right
+        self.click_type = StringVar(value="single")  #single/double
+        self.target_mode = StringVar(value="cursor") #cursor/fixed
+        self.fixed_x = IntVar(value=0)
+        self.fixed_y = IntVar(value=0)
+
+        #Nudge settings
+        self.nudge_mode = StringVar(value="off")     #'off' | 'on'
+        self.nudge_x = IntVar(value=0)
+        self.nudge_y = IntVar(value=0)
+        self.nudge_random = BooleanVar(value=False)  #"Humanized Mouse Clicks"
+        self.nudge_dist = StringVar(value="uniform") #see NUDGE_DISTS
+        self.nudge_path = StringVar(value="jump")    #see NUDGE_PATHS
+        self.nudge_move_ms = IntVar(value=30)
+        self.nudge_rate_hz = IntVar(value=500)
+
+        #Interval (four boxes, all active at once)
+        self.int_hours = IntVar(value=0)
+        self.int_minutes = IntVar(value=0)
+        self.int_seconds = IntVar(value=0)
+        self.int_millis = IntVar(value=50)
+
+        #What to do when the action falls behind its interval (see CATCHUP_POLICIES)
+        self.catchup_policy = StringVar(value="skip")
+
+        #Wait primitive (see PreciseWaiter): backend and spin budget (-1 = calibrated)
+        self.wait_backend = StringVar(value="auto")
+        self.spin_us = IntVar(value=-1)
+        self._timer_after_id = None
+
+        #Global hotkeys (keys or chords like ctrl+shift+f7), one per HOTKEY_SLOTS entry
+        self.hotkey_vars = {key: StringVar(value=default) for key, _, _, default in HOTKEY_SLOTS}
+        self.hotkeys = HotkeyDispatcher()
+
+        #Recording / playback / action loop live in the engine
+        self.engine = MacroEngine(on_status=self.set_status, on_active=self._set_active)
+
+        #Mouse path simplification (after recording and on save)
+        self.simplify_paths = BooleanVar(value=False)
+        self.simplify_px = IntVar(value=2)
+        self.simplify_ms = IntVar(value=10)
+
+        #Run playback/actions/jobs in a separate process (InjectionWorker)
+        self.out_of_process = BooleanVar(value=False)
+
+        #Stream recordings to an on-disk log instead of memory
+        self.record_to_disk = BooleanVar(value=False)
+
+        #Repeat count for playback (0 = infinite)
+        self.repeat_count = IntVar(value=1)
+
+        #Playback lateness budget (ms); overdue 'move' events beyond it are coalesced
+        self.playback_lateness_ms = IntVar(value=20)
+
+        #Playback events due within this many ms of each other are injected as one batch
+        self.batch_window_ms = IntVar(value=1)
+
+        #Time compression: speed multiplier, idle-gap cap (0 = off), or no gaps at all
+        self.playback_speed = DoubleVar(value=1.0)
+        self.trim_gaps_ms = IntVar(value=0)
+        self.max_speed = BooleanVar(value=False)
+
+        #Auto-repeat for held keys on playback (see KEY_REPEAT_MODES); delay/rate apply to "custom"
+        self.key_repeat = StringVar(value="off")
+        self.key_repeat_delay_ms = IntVar(value=500)
+        self.key_repeat_hz = IntVar(value=30)
+
+        #Macro library: folder ("" = default, in the config dir), LRU size and per-macro hotkeys
+        self.library_dir = ""
+        self.library_cache_mb = IntVar(value=64)
+        self.library_hotkeys = {}       #macro name -> hotkey string
+
+        #Autosave debounce id
+        self._save_after_id = None
+        #Disk writes happen on the store's thread, only when something changed
+        self.settings_store = SettingsStore()
+
+        #For “capture next key” when clicking the Key box
+        self.capturing_spam_key = False
+
+        #UI
+        self.build_ui()
+
+        #Load persisted settings
+        self.load_settings()
+
+        #Library index (only changed files are read)
+        self._open_library()
+
+        #Saved wait backend / spin budget (the default one is calibrated by the engine)
+        if self.wait_backend.get() != "auto" or self.spin_us.get() >= 0:
+            self._apply_timer()
+
+        #Child process for playback/actions if enabled
+        self._apply_out_of_process()
+
+        #Snapshot of the settings for worker/listener threads (see ActionConfig)
+        self._refresh_config()
+
+        #Hotkeys
+        self.start_global_listeners()
+
+        #Auto-save bindings
+        self.attach_autosave_traces()
+        self.root.bind("<Configure>", self._on_configure)
+
+        #Status, progress and stats panel
+        self._ui_frame()
+
+    #Active/Idle Title
+    def _apply_active_title(self):
+        self._title_active = self._active
+        self.root.title("Active" if self._active else "Idle")
+
+    def _set_active(self, active: bool):
+        #Any thread; the UI pump updates the title
+        self._active = active
+
+    def set_status(self, msg: str):
+        #Any thread; the UI pump shows the latest message
+        self._status_msg = msg
+
+    #UI
+    def build_ui(self):
+        frm = ttk.Frame(self.root, padding=10)
+        frm.grid(row=0, column=0, sticky="nsew")
+        self.root.columnconfigure(0, weight=1)
+        self.root.rowconfigure(0, weight=1)
+
+        #Mode selector
+        mode_box = ttk.LabelFrame(frm, text="Mode")
+        mode_box.grid(row=0, column=0, sticky="ew", padx=5, pady=5)
+        ttk.Radiobutton(mode_box, text="Key Masher", variable=self.mode, value="key").grid(row=0, column=0, padx=5, pady=5)
+        ttk.Radiobutton(mode_box, text="Auto Clicker", variable=self.mode, value="mouse").grid(row=0, column=1, padx=5, pady=5)
+
+        #Key masher settings
+        key_box = ttk.LabelFrame(frm, text="Key Settings")
+        key_box.grid(row=1, column=0, sticky="ew", padx=5, pady=5)
+        ttk.Label(key_box, text="Key to spam:").grid(row=0, column=0, sticky="w", padx=5, pady=5)
+
+        self.spam_key_entry = ttk.Entry(key_box, textvariable=self.spam_key, width=12)
+        self.spam_key_entry.grid(row=0, column=1, sticky="w", padx=5, pady=5)
+        #When the entry gets focus, capture next key pressed globally
+        self.spam_key_entry.bind("<FocusIn>", lambda e: self._begin_capture_spam_key())
+        #If user types manually, still autosave
+        self.spam_key_entry.bind("<KeyRelease>", lambda e: self._schedule_save())
+
+        ttk.Label(key_box, text="(click box, then press a key — e.g., Space, Enter, F7)").grid(row=0, column=2, sticky="w", padx=5)
+
+        #Mouse clicker settings
+        mouse_box = ttk.LabelFrame(frm, text="Mouse Settings")
+        mouse_box.grid(row=2, column=0, sticky="ew", padx=5, pady=5)
+        ttk.Label(mouse_box, text="Button:").grid(row=0, column=0, sticky="w", padx=5, pady=5)
+        ttk.Combobox(mouse_box, values=["left", "right"], textvariable=self.click_button, width=8, state="readonly").grid(row=0, column=1, padx=5, pady=5)
+        ttk.Label(mouse_box, text="Click:").grid(row=0, column=2, sticky="w", padx=5, pady=5)
+        ttk.Combobox(mouse_box, values=["single", "double"], textvariable=self.click_type, width=8, state="readonly").grid(row=0, column=3, padx=5, pady=5)
+
+        ttk.Label(mouse_box, text="Target:").grid(row=1, column=0, sticky="w", padx=5, pady=5)
+        ttk.Radiobutton(mouse_box, text="Current Cursor", variable=self.target_mode, value="cursor").grid(row=1, column=1, padx=5, pady=5, sticky="w")
+        ttk.Radiobutton(mouse_box, text="Fixed Position", variable=self.target_mode, value="fixed").grid(row=1, column=2, padx=5, pady=5, sticky="w")
+
+        ttk.Label(mouse_box, text="X:").grid(row=2, column=0, sticky="e", padx=5, pady=5)
+        ttk.Entry(mouse_box, textvariable=self.fixed_x, width=8).grid(row=2, column=1, sticky="w", padx=5, pady=5)
+        ttk.Label(mouse_box, text="Y:").grid(row=2, column=2, sticky="e", padx=5, pady=5)
+        ttk.Entry(mouse_box, textvariable=self.fixed_y, width=8).grid(row=2, column=3, sticky="w", padx=5, pady=5)
+        ttk.Button(mouse_box, text="Select Position", command=self.select_position).grid(row=2, column=4, padx=10, pady=5)
+
+        #Nudge UI (Off/On + Humanized)
+        nudge_box = ttk.LabelFrame(frm, text="Nudge Before Click")
+        nudge_box.grid(row=3, column=0, sticky="ew", padx=5, pady=5)
+        ttk.Radiobutton(nudge_box, text="Off", variable=self.nudge_mode, value="off", command=self._update_nudge_state)\
+            .grid(row=0, column=0, padx=5, pady=5, sticky="w")
+        ttk.Radiobutton(nudge_box, text="On", variable=self.nudge_mode, value="on", command=self._update_nudge_state)\
+            .grid(row=0, column=1, padx=5, pady=5, sticky="w")
+
+        ttk.Label(nudge_box, text="ΔX:").grid(row=1, column=0, sticky="e", padx=5, pady=5)
+        self.nudge_x_entry = ttk.Entry(nudge_box, textvariable=self.nudge_x, width=8)
+        self.nudge_x_entry.grid(row=1, column=1, sticky="w", padx=5, pady=5)
+        ttk.Label(nudge_box, text="ΔY:").grid(row=1, column=2, sticky="e", padx=5, pady=5)
+        self.nudge_y_entry = ttk.Entry(nudge_box, textvariable=self.nudge_y, width=8)
+        self.nudge_y_entry.grid(row=1, column=3, sticky="w", padx=5, pady=5)
+
+        self.humanized_chk = ttk.Checkbutton(nudge_box, text="Humanized Mouse Clicks", variable=self.nudge_random)
+        self.humanized_chk.grid(row=1, column=4, padx=10, pady=5)
+
+        ttk.Label(nudge_box, text="Offsets:").grid(row=2, column=0, sticky="e", padx=5, pady=5)
+        self.nudge_dist_combo = ttk.Combobox(nudge_box, values=list(NUDGE_DISTS), textvariable=self.nudge_dist, width=8, state="readonly")
+        self.nudge_dist_combo.grid(row=2, column=1, sticky="w", padx=5, pady=5)
+        ttk.Label(nudge_box, text="Path:").grid(row=2, column=2, sticky="e", padx=5, pady=5)
+        self.nudge_path_combo = ttk.Combobox(nudge_box, values=list(NUDGE_PATHS), textvariable=self.nudge_path, width=8, state="readonly")
+        self.nudge_path_combo.grid(row=2, column=3, sticky="w", padx=5, pady=5)
+        ttk.Label(nudge_box, text="Move ms:").grid(row=2, column=4, sticky="e", padx=5, pady=5)
+        self.nudge_move_spin = ttk.Spinbox(nudge_box, from_=0, to=2000, textvariable=self.nudge_move_ms, width=6)
+        self.nudge_move_spin.grid(row=2, column=5, sticky="w", padx=5, pady=5)
+        ttk.Label(nudge_box, text="Rate Hz:").grid(row=2, column=6, sticky="e", padx=5, pady=5)
+        self.nudge_rate_spin = ttk.Spinbox(nudge_box, from_=10, to=2000, textvariable=self.nudge_rate_hz, width=6)
+        self.nudge_rate_spin.grid(row=2, column=7, sticky="w", padx=5, pady=5)
+
+        #Interval (4 boxes)
+        interval_box = ttk.LabelFrame(frm, text="Interval (sum of all fields)")
+        interval_box.grid(row=4, column=0, sticky="ew", padx=5, pady=5)
+        ttk.Label(interval_box, text="Hours:").grid(row=0, column=0, padx=5, pady=5, sticky="e")
+        ttk.Spinbox(interval_box, from_=0, to=999999, textvariable=self.int_hours, width=8).grid(row=0, column=1, padx=5, pady=5)
+        ttk.Label(interval_box, text="Minutes:").grid(row=0, column=2, padx=5, pady=5, sticky="e")
+        ttk.Spinbox(interval_box, from_=0, to=999999, textvariable=self.int_minutes, width=8).grid(row=0, column=3, padx=5, pady=5)
+        ttk.Label(interval_box, text="Seconds:").grid(row=0, column=4, padx=5, pady=5, sticky="e")
+        ttk.Spinbox(interval_box, from_=0, to=999999, textvariable=self.int_seconds, width=8).grid(row=0, column=5, padx=5, pady=5)
+        ttk.Label(interval_box, text="Milliseconds:").grid(row=0, column=6, padx=5, pady=5, sticky="e")
+        ttk.Spinbox(interval_box, from_=0, to=999999, textvariable=self.int_millis, width=10).grid(row=0, column=7, padx=5, pady=5)
+        ttk.Label(interval_box, text="If behind:").grid(row=1, column=0, padx=5, pady=5, sticky="e")
+        ttk.Combobox(interval_box, values=list(CATCHUP_POLICIES), textvariable=self.catchup_policy, width=8, state="readonly").grid(row=1, column=1, padx=5, pady=5)
+        ttk.Label(interval_box, text="(skip = drop missed ticks, burst = catch up, shift = restart timing)").grid(row=1, column=2, columnspan=6, padx=5, pady=5, sticky="w")
+        ttk.Label(interval_box, text="Timer:").grid(row=2, column=0, padx=5, pady=5, sticky="e")
+        ttk.Combobox(interval_box, values=list(WAIT_BACKENDS), textvariable=self.wait_backend, width=10, state="readonly").grid(row=2, column=1, padx=5, pady=5)
+        ttk.Label(interval_box, text="Spin (µs):").grid(row=2, column=2, padx=5, pady=5, sticky="e")
+        ttk.Spinbox(interval_box, from_=-1, to=5000, increment=50, textvariable=self.spin_us, width=8).grid(row=2, column=3, padx=5, pady=5)
+        ttk.Label(interval_box, text="(-1 = calibrate; accuracy shows under Live Stats)").grid(row=2, column=4, columnspan=4, padx=5, pady=5, sticky="w")
+
+        #Controls
+        ctl_box = ttk.LabelFrame(frm, text="Controls")
+        ctl_box.grid(row=5, column=0, sticky="ew", padx=5, pady=5)
+        ttk.Button(ctl_box, text="Start", command=self.start_action).grid(row=0, column=0, padx=5, pady=5)
+        ttk.Button(ctl_box, text="Stop", command=self.stop_action).grid(row=0, column=1, padx=5, pady=5)
+        ttk.Button(ctl_box, text="Hotkey Settings", command=self.open_hotkey_settings).grid(row=0, column=2, padx=5, pady=5)
+        ttk.Checkbutton(ctl_box, text="Separate process", variable=self.out_of_process,
+                        command=self._apply_out_of_process).grid(row=0, column=3, padx=5, pady=5)
+        ttk.Label(ctl_box, textvariable=self.status).grid(row=0, column=4, padx=10, pady=5, sticky="w")
+
+        #Recorder
+        rec_box = ttk.LabelFrame(frm, text="Recorder")
+        rec_box.grid(row=6, column=0, sticky="ew", padx=5, pady=5)
+        ttk.Button(rec_box, text="Start Recording (F8)", command=self.toggle_recording).grid(row=0, column=0, padx=5, pady=5)
+        ttk.Button(rec_box, text="Play (F9)", command=self.play_recording).grid(row=0, column=1, padx=5, pady=5)
+        ttk.Button(rec_box, text="Clear", command=self.clear_recording).grid(row=0, column=2, padx=5, pady=5)
+        ttk.Label(rec_box, text="Repeat (0 = infinite):").grid(row=0, column=3, padx=5, pady=5)
+        ttk.Spinbox(rec_box, from_=0, to=999999, textvariable=self.repeat_count, width=8).grid(row=0, column=4, padx=5, pady=5)
+        ttk.Label(rec_box, text="Max lateness (ms):").grid(row=1, column=3, padx=5, pady=5)
+        ttk.Spinbox(rec_box, from_=0, to=60000, textvariable=self.playback_lateness_ms, width=8).grid(row=1, column=4, padx=5, pady=5)
+        ttk.Label(rec_box, text="Batch window (ms):").grid(row=3, column=3, padx=5, pady=5)
+
+        #Time compression (applied when the plan is compiled)
+        ttk.Label(rec_box, text="Speed ×:").grid(row=3, column=0, padx=5, pady=5, sticky="e")
+        ttk.Spinbox(rec_box, from_=0.1, to=1000, increment=0.5, textvariable=self.playback_speed, width=6).grid(row=3, column=1, padx=5, pady=5, sticky="w")
+        ttk.Checkbutton(rec_box, text="Max speed", variable=self.max_speed).grid(row=3, column=2, padx=5, pady=5)
+        ttk.Label(rec_box, text="Trim gaps over (ms):").grid(row=4, column=0, padx=5, pady=5, sticky="e")
+        ttk.Spinbox(rec_box, from_=0, to=600000, increment=100, textvariable=self.trim_gaps_ms, width=8).grid(row=4, column=1, padx=5, pady=5, sticky="w")
+        ttk.Label(rec_box, text="(0 = keep gaps)").grid(row=4, column=2, padx=5, pady=5, sticky="w")
+        ttk.Label(rec_box, text="Key repeat:").grid(row=5, column=0, padx=5, pady=5, sticky="e")
+        ttk.Combobox(rec_box, values=list(KEY_REPEAT_MODES), textvariable=self.key_repeat, width=6, state="readonly").grid(row=5, column=1, padx=5, pady=5, sticky="w")
+        ttk.Label(rec_box, text="Delay (ms):").grid(row=5, column=2, padx=5, pady=5, sticky="e")
+        ttk.Spinbox(rec_box, from_=0, to=5000, increment=50, textvariable=self.key_repeat_delay_ms, width=6).grid(row=5, column=3, padx=5, pady=5, sticky="w")
+        ttk.Label(rec_box, text="Rate (Hz):").grid(row=5, column=4, padx=5, pady=5, sticky="e")
+        ttk.Spinbox(rec_box, from_=1, to=100, textvariable=self.key_repeat_hz, width=6).grid(row=5, column=5, padx=5, pady=5, sticky="w")
+        ttk.Spinbox(rec_box, from_=0, to=100, textvariable=self.batch_window_ms, width=8).grid(row=3, column=4, padx=5, pady=5)
+
+        #Save / Load macros
+        ttk.Button(rec_box, text="Save Macro", command=self.save_macro).grid(row=1, column=0, padx=5, pady=5)
+        ttk.Button(rec_box, text="Load Macro", command=self.load_macro).grid(row=1, column=1, padx=5, pady=5)
+        ttk.Checkbutton(rec_box, text="Stream to disk", variable=self.record_to_disk).grid(row=1, column=2, padx=5, pady=5)
+
+        #Path simplification
+        ttk.Checkbutton(rec_box, text="Simplify mouse paths", variable=self.simplify_paths).grid(row=2, column=0, columnspan=2, sticky="w", padx=5, pady=5)
+        ttk.Label(rec_box, text="Tolerance (px):").grid(row=2, column=2, padx=5, pady=5, sticky="e")
+        ttk.Spinbox(rec_box, from_=0, to=100, textvariable=self.simplify_px, width=6).grid(row=2, column=3, padx=5, pady=5, sticky="w")
+        ttk.Label(rec_box, text="(ms):").grid(row=2, column=4, padx=5, pady=5, sticky="e")
+        ttk.Spinbox(rec_box, from_=0, to=1000, textvariable=self.simplify_ms, width=6).grid(row=2, column=5, padx=5, pady=5, sticky="w")
+
+        #Jobs (several actions at once, each at its own interval)
+        jobs_box = ttk.LabelFrame(frm, text="Jobs (run together)")
+        jobs_box.grid(row=7, column=0, sticky="ew", padx=5, pady=5)
+        self.jobs_tree = ttk.Treeview(jobs_box, columns=("action", "interval"), show="headings", height=4)
+        self.jobs_tree.heading("action", text="Action")
+        self.jobs_tree.heading("interval", text="Interval (ms)")
+        self.jobs_tree.column("interval", width=100, anchor="e")
+        self.jobs_tree.grid(row=0, column=0, rowspan=2, sticky="ew", padx=5, pady=5)
+        ttk.Button(jobs_box, text="Add Current", command=self.add_job).grid(row=0, column=1, padx=5, pady=5)
+        ttk.Button(jobs_box, text="Remove", command=self.remove_job).grid(row=1, column=1, padx=5, pady=5)
+        ttk.Button(jobs_box, text="Start Jobs", command=self.start_jobs).grid(row=0, column=2, padx=5, pady=5)
+        ttk.Button(jobs_box, text="Stop Jobs", command=self.stop_jobs).grid(row=1, column=2, padx=5, pady=5)
+        jobs_box.columnconfigure(0, weight=1)
+
+        #Macro library (named macros, switchable by hotkey)
+        lib_box = ttk.LabelFrame(frm, text="Macro Library")
+        lib_box.grid(row=8, column=0, sticky="ew", padx=5, pady=5)
+        self.library_tree = ttk.Treeview(lib_box, columns=("name", "events", "duration", "hotkey"), show="headings", height=5)
+        for col, text, width in (("name", "Name", 180), ("events", "Events", 70), ("duration", "Seconds", 70), ("hotkey", "Hotkey", 100)):
+            self.library_tree.heading(col, text=text)
+            self.library_tree.column(col, width=width, anchor="w" if col in ("name", "hotkey") else "e")
+        self.library_tree.grid(row=0, column=0, rowspan=4, sticky="ew", padx=5, pady=5)
+        self.library_tree.bind("<Double-1>", lambda e: self.load_library_macro())
+        ttk.Button(lib_box, text="Load", command=self.load_library_macro).grid(row=0, column=1, padx=5, pady=2)
+        ttk.Button(lib_box, text="Save Current…", command=self.save_to_library).grid(row=1, column=1, padx=5, pady=2)
+        ttk.Button(lib_box, text="Remove", command=self.remove_library_macro).grid(row=2, column=1, padx=5, pady=2)
+        ttk.Button(lib_box, text="Refresh", command=self.refresh_library).grid(row=3, column=1, padx=5, pady=2)
+        ttk.Button(lib_box, text="Hotkey…", command=self.bind_library_hotkey).grid(row=0, column=2, padx=5, pady=2)
+        ttk.Button(lib_box, text="Unbind", command=self.unbind_library_hotkey).grid(row=1, column=2, padx=5, pady=2)
+        ttk.Button(lib_box, text="Folder…", command=self.choose_library_dir).grid(row=2, column=2, padx=5, pady=2)
+        ttk.Button(lib_box, text="Play Together…", command=self.play_library_together).grid(row=0, column=3, padx=5, pady=2)
+        cache_row = ttk.Frame(lib_box)
+        cache_row.grid(row=3, column=2, padx=5, pady=2)
+        ttk.Label(cache_row, text="Cache (MB):").grid(row=0, column=0)
+        ttk.Spinbox(cache_row, from_=0, to=4096, textvariable=self.library_cache_mb, width=5).grid(row=0, column=1, padx=(3, 0))
+        lib_box.columnconfigure(0, weight=1)
+
+        #Live stats (telemetry of the current/last run)
+        stats_box = ttk.LabelFrame(frm, text="Live Stats")
+        stats_box.grid(row=9, column=0, sticky="ew", padx=5, pady=5)
+        ttk.Label(stats_box, textvariable=self.progress_text).grid(row=0, column=0, sticky="w", padx=5, pady=(5, 0))
+        self.progress_bar = ttk.Progressbar(stats_box, maximum=1000)
+        self.progress_bar.grid(row=1, column=0, sticky="ew", padx=5, pady=2)
+        ttk.Label(stats_box, textvariable=self.stats_text, font=("TkFixedFont", 8), justify="left").grid(row=2, column=0, sticky="w", padx=5, pady=5)
+        ttk.Button(stats_box, text="Export Stats…", command=self.export_stats).grid(row=0, column=1, sticky="ne", padx=10, pady=5)
+        stats_box.columnconfigure(0, weight=1)
+
+        #Footer + "Not Working?"
+        footer = ttk.Frame(frm)
+        footer.grid(row=10, column=0, sticky="ew", padx=5, pady=(0,5))
+        ttk.Label(footer, text="Defaults:F7=Start/Stop | F8=Record | F9=Play  •  Changeable Via Hotkey Settings • Made by Berchia").grid(row=0, column=0, sticky="w")
+        ttk.Button(footer, text="Not Working?", command=self.show_not_working_help).grid(row=0, column=1, padx=10)
+
+        #Initialize nudge control state
+        self._update_nudge_state()
+
+    #Global Hotkeys & Key Capture
+    def start_global_listeners(self):
+        def on_press(k):
+            try:
+                name = key_to_str(k)
+                if not name:
+                    return
+
+                #If we're capturing the next key for "Key to spam", take it & stop
+                if self.capturing_spam_key:
+                    # Normalize names (e.g., 'return' -> 'enter')
+                    if name == "return":
+                        name = "enter"
+                    self.capturing_spam_key = False
+                    self._ui_calls.append(lambda: self._set_spam_key(name))
+                    return
+
+                #Otherwise, handle hotkeys
+                action = self.hotkeys.on_press(k)
+                if action is None:
+                    return
+                handler = handlers.get(action)
+                if action in ("stop_play", "stop_all"):
+                    #Stopping playback is just an event; anything that joins threads goes to the hotkey worker
+                    self.engine.stop_playback()
+                    if action == "stop_all":
+                        self._queue_hotkey_job(handler)
+                elif handler is not None:
+                    self._ui_calls.append(handler)
+                elif action.startswith(LIBRARY_ACTION):
+                    name = action[len(LIBRARY_ACTION):]
+                    self._queue_hotkey_job(lambda: self.play_library_macro(name))
+            except Exception:
+                pass
+
+        def on_release(k):
+            try:
+                self.hotkeys.on_release(k)
+            except Exception:
+                pass
+
+        handlers = {
+            "action": self.toggle_action_quick,
+            "record": self.toggle_recording,
+            "play": self.play_recording,
+            "stop_play": self.engine.stop_playback,
+            "jobs": self.toggle_jobs,
+            "stop_all": self.stop_everything,
+        }
+        self.k_listener = keyboard.Listener(on_press=on_press, on_release=on_release)
+        self.k_listener.daemon = True
+        self.k_listener.start()
+
+    def _queue_hotkey_job(self, job):
+        self._hotkey_jobs.append(job)
+        self._hotkey_wake.set()
+
+    def _hotkey_worker(self):
+        jobs = self._hotkey_jobs
+        while True:
+            self._hotkey_wake.wait()
+            self._hotkey_wake.clear()
+            while jobs:
+                try:
+                    jobs.popleft()()
+                except Exception:
+                    pass
+
+    def _begin_capture_spam_key(self):
+        self.capturing_spam_key = True
+
+    def _set_spam_key(self, name: str):
+        self.spam_key.set(name)
+        # move focus away so another accidental key doesn't overwrite
+        self.root.focus()
+        self._schedule_save()
+
+    #Select Position
+    def select_position(self):
+        self.set_status("Status: Click anywhere to select position…")
+        picked = []
+
+        def on_click(x, y, button, pressed):
+            if pressed:
+                picked.append((x, y))
+                return False  # stop listener
+
+        listener = mouse.Listener(on_click=on_click)
+        listener.start()
+        listener.join(timeout=10.0)
+        if picked:
+            x, y = picked[0]
+            self.fixed_x.set(int(x))
+            self.fixed_y.set(int(y))
+            #Auto-switch to Fixed
+            self.target_mode.set("fixed")
+            self.set_status(f"Status: Fixed position set to ({x}, {y})")
+            self._schedule_save()
+        else:
+            self.set_status("Status: IDLE")
+
+    #Start/Stop Action
+    def start_action(self):
+        if not self.engine.start_action():
+            return
+        self.set_status(f"Status: RUNNING ({'Key' if self.engine.config.mode=='key' else 'Mouse'})")
+
+    def stop_action(self):
+        self.engine.stop_action()
+        self.set_status("Status: IDLE")
+
+    def toggle_action_quick(self):
+        if self.engine.running_event.is_set():
+            self.stop_action()
+        else:
+            self.start_action()
+
+    #Jobs
+    def add_job(self):
+        #A job from the current Key/Mouse settings and interval
+        try:
+            cfg = self.engine.config
+            job = job_from_dict({
+                "mode": self.mode.get(), "key": self.spam_key.get(),
+                "button": self.click_button.get(), "double": self.click_type.get() == "double",
+                "target": self.target_mode.get(), "x": int(self.fixed_x.get()), "y": int(self.fixed_y.get()),
+                "interval_ms": cfg.interval_s * 1000.0,
+            })
+        except Exception as e:
+            messagebox.showerror("Add Job", f"Could not add job:\n{e}")
+            return
+        self.engine.jobs.add(job)
+        self.engine.jobs_changed()
+        self._refresh_jobs()
+        self._schedule_save()
+
+    def remove_job(self):
+        for iid in self.jobs_tree.selection():
+            self.engine.jobs.remove(int(iid))
+        self.engine.jobs_changed()
+        self._refresh_jobs()
+        self._schedule_save()
+
+    def _refresh_jobs(self):
+        self.jobs_tree.delete(*self.jobs_tree.get_children())
+        for job_id, job in self.engine.jobs.jobs():
+            self.jobs_tree.insert("", "end", iid=str(job_id), values=(job.describe(), f"{job.interval_s * 1000:g}"))
+
+    def start_jobs(self):
+        if not self.engine.start_jobs():
+            if not self.engine.jobs.jobs():
+                messagebox.showinfo("No jobs", "Add a job first (it uses the current Key/Mouse settings and interval).")
+
+    def stop_jobs(self):
+        self.engine.stop_jobs()
+
+    def toggle_jobs(self):
+        if self.engine.jobs_running:
+            self.stop_jobs()
+        else:
+            self.start_jobs()
+
+    def stop_everything(self):
+        self.stop_action()
+        self.stop_jobs()
+        self.engine.stop_playback()
+
+    #Nudge helpers 
+    def _update_nudge_state(self):
+        enabled = (self.nudge_mode.get() == "on")
+        state = "normal" if enabled else "disabled"
+        self.nudge_x_entry.configure(state=state)
+        self.nudge_y_entry.configure(state=state)
+        self.humanized_chk.configure(state=state)
+        combo_state = "readonly" if enabled else "disabled"
+        self.nudge_dist_combo.configure(state=combo_state)
+        self.nudge_path_combo.configure(state=combo_state)
+        self.nudge_move_spin.configure(state=state)
+        self.nudge_rate_spin.configure(state=state)
+        self._schedule_save()
+
+    #Config snapshot (Tk thread only)
+    def _refresh_config(self):
+        try:
+            data = self.to_settings_dict()
+        except Exception:
+            #A half-typed Spinbox raises TclError; keep the last good snapshot
+            return
+        self.engine.config = config_from_settings(data, self.engine.config)
+        self.engine.sync_config()
+        self.hotkeys.set_bindings(hotkey_bindings(self.engine.config))
+
+    def _apply_out_of_process(self):
+        try:
+            self.engine.use_worker(bool(self.out_of_process.get()))
+        except Exception as e:
+            self.out_of_process.set(False)
+            messagebox.showerror("Separate Process", f"Could not start the worker process:\n{e}")
+        self._schedule_save()
+
+    def _schedule_timer_update(self):
+        #Recalibrating takes a few hundred ms; wait until the Spinbox stops changing
+        if self._timer_after_id is not None:
+            self.root.after_cancel(self._timer_after_id)
+        self._timer_after_id = self.root.after(600, self._apply_timer)
+
+    def _apply_timer(self):
+        self._timer_after_id = None
+        try:
+            spin_us = int(self.spin_us.get())
+        except Exception:
+            return
+        waiter = self.engine.set_timer(self.wait_backend.get(), spin_us)
+        self.set_status(f"Status: {waiter.describe()}")
+        self._schedule_save()
+
+    #Recording
+    def toggle_recording(self):
+        if self.engine.recording:
+            self.stop_recording()
+        else:
+            self.start_recording()
+
+    def start_recording(self):
+        if self.engine.recording:
+            return
+        try:
+            self.engine.start_recording()
+        except Exception as e:
+            messagebox.showerror("Record Failed", f"Could not start recording:\n{e}")
+
+    def stop_recording(self):
+        try:
+            msg = self.engine.stop_recording(simplify=False)
+        except Exception as e:
+            messagebox.showerror("Record Failed", f"Could not finish recording log:\n{e}")
+            return
+        if not msg:
+            return
+        self.set_status(msg)
+        if not isinstance(self.engine.record_events, MappedMacro):
+            self._simplify_then(lambda note: self.set_status(msg + note))
+
+    def _simplify_then(self, done):
+        """Run the simplify pass (if enabled) off the Tk thread; done(report) then runs on the UI pump."""
+        engine = self.engine
+        if not engine.config.simplify_paths:
+            done("")
+            return
+        events = engine.record_events
+        self.set_status("Status: Simplifying mouse paths…")
+
+        def work():
+            try:
+                simplified, note = engine.simplified(events)
+            except Exception as e:
+                err = e
+                self._ui_calls.append(lambda: messagebox.showerror("Simplify Failed", f"Could not simplify the recording:\n{err}"))
+                return
+
+            def finish():
+                #No report if a new recording or a load replaced this one meanwhile
+                done(note if engine.replace_recording(events, simplified) else "")
+            self._ui_calls.append(finish)
+
+        threading.Thread(target=work, daemon=True).start()
+
+    def clear_recording(self):
+        self.engine.clear_recording()
+        self.set_status("Status: Recording cleared")
+
+    #Save / Load Macros
+    def save_macro(self):
+        if not self.engine.record_events:
+            messagebox.showinfo("Nothing to save", "No recorded events to save.")
+            return
+        path = filedialog.asksaveasfilename(
+            title="Save Macro",
+            defaultextension=MACRO_EXT,
+            filetypes=[("Macro (binary v2)", f"*{MACRO_EXT}"), ("Macro JSON (v1)", "*.json"), ("All files", "*.*")]
+        )
+        if not path:
+            return
+
+        def save(note):
+            try:
+                self.set_status(self.engine.save_macro(path, simplify=False) + note)
+            except Exception as e:
+                messagebox.showerror("Save Failed", f"Could not save macro:\n{e}")
+        self._simplify_then(save)
+
+    def load_macro(self):
+        path = filedialog.askopenfilename(
+            title="Load Macro",
+            filetypes=[("Macros", f"*{MACRO_EXT} *.json *{SCRIPT_EXT}"), ("Macro scripts", f"*{SCRIPT_EXT}"), ("All files", "*.*")]
+        )
+        if not path:
+            return
+        try:
+            recover = is_unfinished_log(path) and messagebox.askyesno(
+                "Unfinished Recording",
+                "This recording log was never finished (the recorder crashed or is still writing).\n\n"
+                "Finalize it in place? Only do this if nothing is recording to it.\n"
+                "Choose No to load it read-only up to the last complete event.")
+            meta = self.engine.load_macro(path, recover=recover)
+            rep = meta.get("repeat_suggestion")
+            if isinstance(rep, int) and rep > 0:
+                self.repeat_count.set(rep)
+            if self.engine.script is not None:
+                self.set_status(f"Status: Loaded script ({len(self.engine.script)} instructions)")
+                return
+            note = ", recovered log" if meta.get("recovered") else ", unfinished log" if meta.get("unfinished") else ""
+            self.set_status(f"Status: Loaded macro ({len(self.engine.record_events)} events{note})")
+        except Exception as e:
+            messagebox.showerror("Load Failed", f"Could not load macro:\n{e}")
+
+    #Macro Library
+    def _open_library(self):
+        try:
+            self.engine.library = library_from_settings(self.to_settings_dict())
+        except Exception as e:
+            self.engine.library = None
+            self.set_status(f"Status: Macro library unavailable ({e})")
+        self._refresh_library_tree()
+
+    def _refresh_library_tree(self):
+        self.library_tree.delete(*self.library_tree.get_children())
+        lib = self.engine.library
+        if lib is None:
+            return
+        for e in lib.entries():
+            hk = self.library_hotkeys.get(e["name"], "")
+            self.library_tree.insert("", "end", iid=e["file"], values=(e["name"], e["events"], f"{e['duration']:.1f}", hk))
+
+    def _selected_library_name(self):
+        sel = self.library_tree.selection()
+        if not sel:
+            messagebox.showinfo("Macro Library", "Select a macro in the library first.")
+            return None
+        return self.library_tree.set(sel[0], "name")
+
+    def refresh_library(self):
+        lib = self.engine.library
+        if lib is None:
+            self._open_library()
+            return
+        changed = lib.refresh()
+        self._refresh_library_tree()
+        self.set_status(f"Status: Library refreshed ({changed} changed; {lib.cache_report()})")
+
+    def load_library_macro(self):
+        name = self._selected_library_name()
+        if name is None:
+            return
+        t0 = time.perf_counter()
+        try:
+            meta = self.engine.load_from_library(name)
+        except Exception as e:
+            messagebox.showerror("Load Failed", f"Could not load macro:\n{e}")
+            return
+        ms = (time.perf_counter() - t0) * 1000
+        rep = meta.get("repeat_suggestion")
+        if isinstance(rep, int) and rep > 0:
+            self.repeat_count.set(rep)
+        self.set_status(f"Status: Loaded '{name}' ({len(self.engine.record_events)} events, {ms:.1f} ms)")
+
+    def play_library_macro(self, name: str):
+        #Hotkey path (hotkey worker thread): switch to the macro and play it; no dialogs, no Tk variables
+        if self.engine.recording:
+            self.engine.on_status(f"Status: RECORDING… (stop recording before playing '{name}')")
+            return
+        self.engine.stop_playback()
+        self.engine.wait_playback(1.0)
+        try:
+            self.engine.load_from_library(name)
+        except Exception as e:
+            self.engine.on_status(f"Status: Could not load '{name}' ({e})")
+            return
+        self.engine.play()
+
+    def play_library_together(self):
+        #Selected macros on one timeline, each from its own start offset (speed/repeat from the Recorder box)
+        names = [self.library_tree.set(iid, "name") for iid in self.library_tree.selection()]
+        if len(names) < 2:
+            messagebox.showinfo("Play Together", "Select two or more macros in the library (Ctrl+click).")
+            return
+        text = simpledialog.askstring("Play Together", "Start offset (ms) for each macro, in order:\n" + ", ".join(names),
+                                      initialvalue=", ".join("0" for _ in names), parent=self.root)
+        if text is None:
+            return
+        try:
+            offsets = [float(v) / 1000.0 for v in text.replace(",", " ").split()]
+            if len(offsets) != len(names):
+                raise ValueError(f"expected {len(names)} offsets, got {len(offsets)}")
+            speed, repeats = float(self.playback_speed.get()), int(self.repeat_count.get())
+            tracks = [self.engine.make_track(n, off, speed, repeats, from_library=True) for n, off in zip(names, offsets)]
+        except Exception as e:
+            messagebox.showerror("Play Together", f"Could not start playback:\n{e}")
+            return
+        self.engine.play_tracks(tracks)
+
+    def save_to_library(self):
+        if self.engine.library is None:
+            messagebox.showinfo("Macro Library", "The macro library folder could not be opened.")
+            return
+        if not self.engine.record_events:
+            messagebox.showinfo("Nothing to save", "No recorded events to save.")
+            return
+        name = simpledialog.askstring("Save to Library", "Macro name:", parent=self.root)
+        if not name:
+            return
+
+        def save(note):
+            try:
+                self.set_status(self.engine.save_to_library(name, simplify=False) + note)
+            except Exception as e:
+                messagebox.showerror("Save Failed", f"Could not save macro:\n{e}")
+                return
+            self._refresh_library_tree()
+        self._simplify_then(save)
+
+    def remove_library_macro(self):
+        name = self._selected_library_name()
+        if name is None or not messagebox.askyesno("Remove Macro", f"Delete '{name}' from the library folder?"):
+            return
+        try:
+            self.engine.library.remove(name)
+        except Exception as e:
+            messagebox.showerror("Remove Failed", f"Could not remove macro:\n{e}")
+            return
+        if self.library_hotkeys.pop(name, None):
+            self._on_setting_changed()
+        self._refresh_library_tree()
+
+    def bind_library_hotkey(self):
+        name = self._selected_library_name()
+        if name is None:
+            return
+        var = StringVar(value=self.library_hotkeys.get(name, ""))
+        self.capture_hotkey(var)
+        if var.get():
+            self.library_hotkeys[name] = var.get()
+            self._on_setting_changed()
+            self._refresh_library_tree()
+
+    def unbind_library_hotkey(self):
+        name = self._selected_library_name()
+        if name is not None and self.library_hotkeys.pop(name, None):
+            self._on_setting_changed()
+            self._refresh_library_tree()
+
+    def choose_library_dir(self):
+        path = filedialog.askdirectory(title="Macro Library Folder", mustexist=False)
+        if not path:
+            return
+        self.library_dir = path
+        self._open_library()
+        self._schedule_save()
+
+    def _on_library_cache_changed(self):
+        lib = self.engine.library
+        if lib is not None:
+            try:
+                lib.set_cache_bytes(max(0, int(self.library_cache_mb.get())) << 20)
+            except Exception:
+                pass
+        self._schedule_save()
+
+    #Playback
+    def play_recording(self):
+        if not self.engine.record_events and self.engine.script is None:
+            messagebox.showinfo("Nothing to play", "No recorded events. Click 'Start Recording' first or Load a macro.")
+            return
+        self.engine.play()
+
+    #UI pump (Tk thread, every UI_FRAME_MS)
+    def _ui_frame(self):
+        calls = self._ui_calls
+        while calls:
+            try:
+                calls.popleft()()
+            except Exception:
+                pass
+        if self.status.get() != self._status_msg:
+            self.status.set(self._status_msg)
+        if self._title_active != self._active:
+            self._apply_active_title()
+        try:
+            tel = self.engine.telemetry
+            self._render_progress(tel.progress())
+            self._frame += 1
+            if self._frame * UI_FRAME_MS >= STATS_REFRESH_MS:
+                self._frame = 0
+                self.stats_text.set(format_telemetry(tel.snapshot()))
+        except Exception:
+            pass
+        self.root.after(UI_FRAME_MS, self._ui_frame)
+
+    def _render_progress(self, p: dict):
+        text = format_progress(p)
+        if text != self.progress_text.get():
+            self.progress_text.set(text)
+        value = 1000 * p["done"] // p["total"] if p["total"] else 0
+        if value != self.progress_bar["value"]:
+            self.progress_bar["value"] = min(value, 1000)
+
+    def export_stats(self):
+        path = filedialog.asksaveasfilename(
+            title="Export Stats",
+            defaultextension=".json",
+            filetypes=[("JSON", "*.json"), ("CSV", "*.csv"), ("All files", "*.*")]
+        )
+        if not path:
+            return
+        try:
+            self.engine.telemetry.export(path)
+            self.set_status(f"Status: Stats exported → {path}")
+        except Exception as e:
+            messagebox.showerror("Export Failed", f"Could not export stats:\n{e}")
+
+    #Hotkey Settings
+    def open_hotkey_settings(self):
+        dlg = Toplevel(self.root)
+        dlg.title("Hotkey Settings")
+        dlg.grab_set()
+        dlg.attributes("-topmost", True)
+        pad = {"padx": 8, "pady": 6}
+
+        ttk.Label(dlg, text="Set hotkeys (e.g., f7, a, space, ctrl+shift+f7); leave empty for none").grid(row=0, column=0, columnspan=3, **pad)
+
+        rows = [(f"{label}:", self.hotkey_vars[key]) for key, _, label, _ in HOTKEY_SLOTS]
+        for i, (label, var) in enumerate(rows, start=1):
+            ttk.Label(dlg, text=label).grid(row=i, column=0, sticky="e", **pad)
+            ent = ttk.Entry(dlg, textvariable=var, width=18)
+            ent.grid(row=i, column=1, **pad)
+            ttk.Button(dlg, text="Bind…", command=lambda v=var: self.capture_hotkey(v)).grid(row=i, column=2, **pad)
+
+        ttk.Button(dlg, text="Close", command=dlg.destroy).grid(row=len(rows)+1, column=0, columnspan=3, **pad)
+
+    def capture_hotkey(self, target_var: StringVar):
+        messagebox.showinfo("Capture Hotkey", "Press the key (or chord, e.g. Ctrl+Shift+F7) you want to assign…")
+        captured = []
+        held = {}
+        def on_press(k):
+            name = hotkey_name(k)
+            bit = MODIFIER_BITS.get(name)
+            if bit:
+                held[name] = bit
+                return None
+            if name:
+                mods = 0
+                for b in held.values():
+                    mods |= b
+                captured.append(format_hotkey(mods, name))
+            return False
+
+        def on_release(k):
+            held.pop(hotkey_name(k), None)
+
+        listener = keyboard.Listener(on_press=on_press, on_release=on_release)
+        listener.start()
+        listener.join(timeout=5.0)
+        if captured:
+            target_var.set(captured[0])
+            self._schedule_save()
+
+    #Help Popup
+    def show_not_working_help(self):
+        messagebox.showinfo(
+            "Troubleshooting",
+            "Admin rights: Global keyboard/mouse hooks sometimes need elevated permissions on Windows.\n"
+            "If hotkeys or recording don’t work, right-click the EXE → Run as administrator."
+        )
+
+    #Settings Persistence
+    def to_settings_dict(self) -> dict:
+        return {
+            "geometry": self.root.geometry(),
+            "mode": self.mode.get(),
+            "spam_key": self.spam_key.get(),
+            "click_button": self.click_button.get(),
+            "click_type": self.click_type.get(),
+            "target_mode": self.target_mode.get(),
+            "fixed_x": int(self.fixed_x.get()),
+            "fixed_y": int(self.fixed_y.get()),
+            "nudge_mode": self.nudge_mode.get(),
+            "nudge_x": int(self.nudge_x.get()),
+            "nudge_y": int(self.nudge_y.get()),
+            "nudge_random": bool(self.nudge_random.get()),
+            "nudge_dist": self.nudge_dist.get(),
+            "nudge_path": self.nudge_path.get(),
+            "nudge_move_ms": int(self.nudge_move_ms.get()),
+            "nudge_rate_hz": int(self.nudge_rate_hz.get()),
+            **{key: var.get() for key, var in self.hotkey_vars.items()},
+            "repeat_count": int(self.repeat_count.get()),
+            "record_to_disk": bool(self.record_to_disk.get()),
+            "out_of_process": bool(self.out_of_process.get()),
+            "simplify_paths": bool(self.simplify_paths.get()),
+            "simplify_px": int(self.simplify_px.get()),
+            "simplify_ms": int(self.simplify_ms.get()),
+            "playback_lateness_ms": int(self.playback_lateness_ms.get()),
+            "batch_window_ms": int(self.batch_window_ms.get()),
+            "playback_speed": float(self.playback_speed.get()),
+            "trim_gaps_ms": int(self.trim_gaps_ms.get()),
+            "max_speed": bool(self.max_speed.get()),
+            "key_repeat": self.key_repeat.get(),
+            "key_repeat_delay_ms": int(self.key_repeat_delay_ms.get()),
+            "key_repeat_hz": int(self.key_repeat_hz.get()),
+            # interval 4-box
+            "int_hours": int(self.int_hours.get()),
+            "int_minutes": int(self.int_minutes.get()),
+            "int_seconds": int(self.int_seconds.get()),
+            "int_millis": int(self.int_millis.get()),
+            "catchup_policy": self.catchup_policy.get(),
+            "wait_backend": self.wait_backend.get(),
+            "spin_us": int(self.spin_us.get()),
+            "jobs": [job_to_dict(job) for _, job in self.engine.jobs.jobs()],
+            "library_dir": self.library_dir,
+            "library_cache_mb": int(self.library_cache_mb.get()),
+            "library_hotkeys": dict(self.library_hotkeys),
+        }
+
+    def apply_settings(self, d: dict):
+        g = lambda k, default=None: d.get(k, default)
+        geom = g("geometry")
+        if isinstance(geom, str) and "x" in geom:
+            try: self.root.geometry(geom)
+            except Exception: pass
+
+        self.mode.set(g("mode", self.mode.get()))
+        self.spam_key.set(g("spam_key", self.spam_key.get()))
+        self.click_button.set(g("click_button", self.click_button.get()))
+        self.click_type.set(g("click_type", self.click_type.get()))
+        self.target_mode.set(g("target_mode", self.target_mode.get()))
+        try:
+            self.fixed_x.set(int(g("fixed_x", self.fixed_x.get())))
+            self.fixed_y.set(int(g("fixed_y", self.fixed_y.get())))
+        except Exception:
+            pass
+
+        self.nudge_mode.set(g("nudge_mode", self.nudge_mode.get()))
+        try:
+            self.nudge_x.set(int(g("nudge_x", self.nudge_x.get())))
+            self.nudge_y.set(int(g("nudge_y", self.nudge_y.get())))
+        except Exception:
+            pass
+        self.nudge_random.set(bool(g("nudge_random", self.nudge_random.get())))
+        if g("nudge_dist") in NUDGE_DISTS:
+            self.nudge_dist.set(g("nudge_dist"))
+        if g("nudge_path") in NUDGE_PATHS:
+            self.nudge_path.set(g("nudge_path"))
+        try:
+            self.nudge_move_ms.set(int(g("nudge_move_ms", self.nudge_move_ms.get())))
+            self.nudge_rate_hz.set(int(g("nudge_rate_hz", self.nudge_rate_hz.get())))
+        except Exception:
+            pass
+        self.record_to_disk.set(bool(g("record_to_disk", self.record_to_disk.get())))
+        self.out_of_process.set(bool(g("out_of_process", self.out_of_process.get())))
+        self.simplify_paths.set(bool(g("simplify_paths", self.simplify_paths.get())))
+        self.max_speed.set(bool(g("max_speed", self.max_speed.get())))
+        try:
+            self.simplify_px.set(int(g("simplify_px", self.simplify_px.get())))
+            self.simplify_ms.set(int(g("simplify_ms", self.simplify_ms.get())))
+        except Exception:
+            pass
+
+        for key, var in self.hotkey_vars.items():
+            var.set(g(key, var.get()))
+        try:
+            self.repeat_count.set(int(g("repeat_count", self.repeat_count.get())))
+            self.playback_lateness_ms.set(int(g("playback_lateness_ms", self.playback_lateness_ms.get())))
+            self.batch_window_ms.set(int(g("batch_window_ms", self.batch_window_ms.get())))
+            self.playback_speed.set(float(g("playback_speed", self.playback_speed.get())))
+            self.trim_gaps_ms.set(int(g("trim_gaps_ms", self.trim_gaps_ms.get())))
+            self.key_repeat_delay_ms.set(int(g("key_repeat_delay_ms", self.key_repeat_delay_ms.get())))
+            self.key_repeat_hz.set(int(g("key_repeat_hz", self.key_repeat_hz.get())))
+        except Exception:
+            pass
+        if g("key_repeat") in KEY_REPEAT_MODES:
+            self.key_repeat.set(g("key_repeat"))
+
+        #Interval 4-box
+        try:
+            self.int_hours.set(int(g("int_hours", self.int_hours.get())))
+            self.int_minutes.set(int(g("int_minutes", self.int_minutes.get())))
+            self.int_seconds.set(int(g("int_seconds", self.int_seconds.get())))
+            self.int_millis.set(int(g("int_millis", self.int_millis.get())))
+        except Exception:
+            pass
+
+        self.library_dir = str(g("library_dir", self.library_dir) or "")
+        try:
+            self.library_cache_mb.set(int(g("library_cache_mb", self.library_cache_mb.get())))
+        except Exception:
+            pass
+        lib_keys = g("library_hotkeys")
+        if isinstance(lib_keys, dict):
+            self.library_hotkeys = {str(n): str(k) for n, k in lib_keys.items() if k}
+
+        policy = g("catchup_policy", self.catchup_policy.get())
+        if policy in CATCHUP_POLICIES:
+            self.catchup_policy.set(policy)
+        backend = g("wait_backend", self.wait_backend.get())
+        if backend in WAIT_BACKENDS:
+            self.wait_backend.set(backend)
+        try:
+            self.spin_us.set(int(g("spin_us", self.spin_us.get())))
+        except Exception:
+            pass
+
+        jobs = []
+        for jd in g("jobs") or []:
+            try:
+                jobs.append(job_from_dict(jd))
+            except Exception as e:
+                print(f"[WARN] Skipping bad job {jd!r}: {e}")
+        self.engine.jobs.set_jobs(jobs)
+        self._refresh_jobs()
+
+        self._update_nudge_state()
+
+    def save_settings(self):
+        self._save_after_id = None
+        try:
+            self.settings_store.schedule(self.to_settings_dict())
+        except Exception:
+            pass
+
+    def load_settings(self):
+        data = self.settings_store.load()
+        if data:
+            self.apply_settings(data)
+
+    #Autosave wiring (traces + geometry debounce)
+    def attach_autosave_traces(self):
+        vars_to_trace = [
+            self.mode, self.spam_key,
+            self.click_button, self.click_type, self.target_mode,
+            self.nudge_mode, self.nudge_x, self.nudge_y, self.nudge_random, self.record_to_disk,
+            self.nudge_dist, self.nudge_path, self.nudge_move_ms, self.nudge_rate_hz,
+            self.simplify_paths, self.simplify_px, self.simplify_ms,
+            *self.hotkey_vars.values(),
+            self.repeat_count, self.playback_lateness_ms, self.batch_window_ms, self.fixed_x, self.fixed_y,
+            self.playback_speed, self.trim_gaps_ms, self.max_speed,
+            self.key_repeat, self.key_repeat_delay_ms, self.key_repeat_hz,
+            self.int_hours, self.int_minutes, self.int_seconds, self.int_millis,
+            self.catchup_policy
+        ]
+        for v in vars_to_trace:
+            try:
+                v.trace_add("write", lambda *args: self._on_setting_changed())
+            except Exception:
+                pass
+        self.library_cache_mb.trace_add("write", lambda *args: self._on_library_cache_changed())
+        for v in (self.wait_backend, self.spin_us):
+            v.trace_add("write", lambda *args: self._schedule_timer_update())
+
+    def _on_setting_changed(self):
+        self._refresh_config()
+        self._schedule_save()
+
+    def _on_configure(self, event):
+        #<Configure> on the root also fires for every child widget; only a move/resize matters
+        if event.widget is self.root:
+            self._schedule_save()
+
+    def _schedule_save(self, delay_ms: int = 250):
+        if self._save_after_id is not None:
+            try:
+                self.root.after_cancel(self._save_after_id)
+            except Exception:
+                pass
+        self._save_after_id = self.root.after(delay_ms, self.save_settings)
+
+    #Cleanup
+    def on_close(self):
+        try:
+            self.engine.shutdown()
+        except Exception:
+            pass
+        try:
+            self.k_listener.stop()
+        except Exception:
+            pass
+        try:
+            data = self.to_settings_dict()
+        except Exception:
+            data = None
+        self.settings_store.flush(data)
+        self.root.destroy()
+
+# -----------------------------
+# Run
+# -----------------------------
+def main():
+    if PYNPUT_ERROR is not None:
+        print("The 'pynput' package is required. Install with: pip install pynput")
+        sys.exit(1)
+    root = Tk()
+    style = ttk.Style()
+    try:
+        style.theme_use("clam")
+    except Exception:
+        pass
+    app = MacroTool(root)
+    root.protocol("WM_DELETE_WINDOW", app.on_close)
+    root.mainloop()
+
+if __name__ == "__main__":
+    main()